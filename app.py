@@ -1,10 +1,44 @@
+import os
+import tempfile
+import uuid
+from functools import wraps
+from io import BytesIO
+
 import streamlit as st
 import matplotlib.pyplot as plt
-import matplotlib.patches as patches
 import numpy as np
 import pandas as pd
-from io import BytesIO
-import math
+
+from warehouse import WarehouseCalculator, bulk
+from warehouse.cache import CachedCalculator, shared_cache, shared_stats
+from warehouse.distances import site_distances
+from warehouse.jobs import CANCELLED, FAILED, RUNNING, current_job, shared_runner
+from warehouse.optimizer import LayoutOptimizer
+from warehouse.packing import PALLET_TYPES, PalletPacker, default_mix
+from warehouse.phasing import GrowthPlanner, growth_forecast
+from warehouse.picking import BATCHING_RULES, ORDER_COLUMNS, ROUTING_POLICIES, TWO_OPT_MAX_STOPS, PickingPlanner
+from warehouse.plan import LOD_RACK_THRESHOLD, plan_layout, render_plan, render_plan_plotly, render_zones
+from warehouse.portfolio import SitePortfolio
+from warehouse.profiling import Profiler, timer
+from warehouse.report import render_report
+from warehouse.risk import UNCERTAINTIES, RiskAnalysis
+from warehouse.simulation import ForkliftSimulation
+from warehouse.slotting import SKU_COLUMNS, SlottingEngine
+from warehouse.store import METRICS as STORED_METRICS, OPERATORS, ScenarioStore
+
+
+def report_error(message):
+    """Erreurs de calcul : affichées dans la page, ou notées sur la tâche en arrière-plan qui
+    les rencontre (son fil n'a pas de page où écrire) et affichées avec son résultat"""
+    job = current_job()
+    if job is not None:
+        job.log_error(message)
+    else:
+        st.error(message)
+
+
+# Erreurs de calcul affichées dans la page
+WarehouseCalculator.error_handler = report_error
 
 # Configuration de la page
 st.set_page_config(
@@ -318,192 +352,131 @@ if 'warehouse_data' not in st.session_state:
         'calculations': {},
         'warnings': [],
         'optimizations': [],
-        'params': {}
+        'params': {},
+        'optimizer': {},
+        'simulation': {},
+        'slotting': {},
+        'picking': {},
+        'risk': {},
+        'phasing': {},
+        'report': {}
     }
 
-# ============================================================================
-# FONCTIONS DE CALCUL PROFESSIONNELLES
-# ============================================================================
-class WarehouseCalculator:
-    """Classe principale de calcul pour le dimensionnement d'entrepôt"""
-    
-    # Normes de référence
-    NORMS = {
-        'min_aisle_width_forklift': 3.5,  # Largeur minimale allée pour chariot élévateur (m)
-        'min_aisle_width_pallet': 2.5,    # Largeur minimale pour transpalette (m)
-        'clearance_height': 0.5,          # Dégagement minimum sous poutre (m)
-        'fire_aisle_width': 1.2,          # Largeur allée d'évacuation (m)
-        'max_rack_height': 15.0,         # Hauteur maximale recommandée (m)
-        'min_turning_radius': 2.0,        # Rayon de braquage minimum (m)
-        'load_per_m2': 1500.0,            # Charge au sol maximale (kg/m²)
-        'lighting_level': 300.0,          # Niveau d'éclairage minimum (lux)
-        'min_door_width': 2.4,            # Largeur minimale porte (m)
-        'safety_margin': 0.3,             # Marge de sécurité autour racks (%)
-    }
-    
-    @staticmethod
-    def calculate_storage_capacity(params):
-        """Calcule la capacité de stockage selon les normes ISO"""
-        try:
-            # Nombre de racks possibles
-            usable_length = params['length'] - params['main_aisle_width'] - 4.0  # 2m de chaque côté
-            racks_per_row = max(1, int(usable_length / (params['rack_depth'] + 1.0)))
-            
-            usable_width = params['width'] - 2.0  # 1m de chaque côté
-            rows_per_side = max(1, int(usable_width / (params['rack_width'] + 1.0)))
-            
-            total_racks = racks_per_row * rows_per_side * 2  # Deux côtés
-            
-            # Capacité par rack
-            levels = min(params.get('max_levels', 3), 
-                        int(params['clear_height'] / (params['pallet_height'] + 0.3)))
-            positions_per_level = 2  # Avant/arrière
-            
-            total_positions = total_racks * levels * positions_per_level
-            total_pallets = int(total_positions * params.get('filling_rate', 85) / 100.0)
-            
-            # Surface utile
-            storage_area = total_racks * params['rack_width'] * params['rack_depth']
-            total_area = params['length'] * params['width']
-            storage_ratio = (storage_area / total_area) * 100.0 if total_area > 0 else 0.0
-            
-            return {
-                'total_racks': total_racks,
-                'racks_per_row': racks_per_row,
-                'rows_per_side': rows_per_side,
-                'levels': levels,
-                'total_positions': total_positions,
-                'total_pallets': total_pallets,
-                'storage_area': round(storage_area, 1),
-                'total_area': total_area,
-                'storage_ratio': round(storage_ratio, 1),
-                'volume_capacity': round(total_pallets * params.get('pallet_volume', 1.0), 1)
-            }
-        except Exception as e:
-            st.error(f"Erreur dans le calcul de capacité: {e}")
-            return {}
-    
-    @staticmethod
-    def calculate_circulation(params, capacity):
-        """Calcule les paramètres de circulation"""
-        try:
-            # Distance moyenne de parcours
-            avg_distance = (params['length'] + params['width']) / 2.0
-            
-            # Temps de cycle
-            travel_speed = params.get('equipment_speed', 10.0) * 1000.0 / 3600.0  # m/s
-            travel_time = avg_distance / travel_speed if travel_speed > 0 else 0
-            handling_time = 120.0 if params.get('equipment_type') == 'forklift' else 90.0  # secondes
-            
-            cycle_time = travel_time * 2.0 + handling_time / 60.0  # minutes
-            
-            # Débit
-            pallets_per_hour = 60.0 / cycle_time if cycle_time > 0 else 0
-            daily_capacity = pallets_per_hour * params.get('operating_hours', 16.0)
-            
-            # Nombre d'équipements nécessaires
-            daily_throughput = capacity.get('total_pallets', 0) / params.get('stock_rotation', 30.0)
-            required_equipment = max(1, math.ceil(daily_throughput / daily_capacity)) if daily_capacity > 0 else 1
-            
-            return {
-                'avg_distance': round(avg_distance, 1),
-                'cycle_time': round(cycle_time, 1),
-                'pallets_per_hour': round(pallets_per_hour, 1),
-                'daily_capacity': int(daily_capacity),
-                'daily_throughput': int(daily_throughput),
-                'required_equipment': required_equipment
-            }
-        except Exception as e:
-            st.error(f"Erreur dans le calcul de circulation: {e}")
-            return {}
-    
-    @staticmethod
-    def calculate_costs(params, capacity, circulation):
-        """Calcule les coûts d'investissement et d'exploitation"""
-        try:
-            # Coût des racks (€/emplacement)
-            rack_cost_per_position = 180.0
-            rack_cost = capacity.get('total_positions', 0) * rack_cost_per_position
-            
-            # Coût de la surface (€/m²)
-            area_cost_per_m2 = 250.0
-            area_cost = params['length'] * params['width'] * area_cost_per_m2
-            
-            # Coût des équipements
-            equipment_costs = {
-                'forklift': 45000.0,
-                'reach_truck': 55000.0,
-                'pallet_truck': 8000.0,
-                'automated': 120000.0
-            }
-            equipment_cost = equipment_costs.get(params.get('equipment_type', 'forklift'), 30000.0) * circulation.get('required_equipment', 1)
-            
-            # Coût installation
-            installation_cost = (rack_cost + area_cost + equipment_cost) * 0.15
-            
-            # Coût total
-            total_investment = rack_cost + area_cost + equipment_cost + installation_cost
-            
-            # Coûts annuels
-            annual_maintenance = total_investment * 0.03
-            annual_personnel = circulation.get('required_equipment', 1) * 2.0 * 35000.0  # 2 opérateurs par équipement
-            annual_energy = params['length'] * params['width'] * 15.0  # €/m²/an
-            
-            total_annual_cost = annual_maintenance + annual_personnel + annual_energy
-            
-            cost_per_pallet = total_annual_cost / capacity.get('total_pallets', 1) if capacity.get('total_pallets', 0) > 0 else 0
-            
-            return {
-                'rack_cost': round(rack_cost / 1000.0, 1),
-                'area_cost': round(area_cost / 1000.0, 1),
-                'equipment_cost': round(equipment_cost / 1000.0, 1),
-                'installation_cost': round(installation_cost / 1000.0, 1),
-                'total_investment': round(total_investment / 1000.0, 1),
-                'annual_maintenance': round(annual_maintenance / 1000.0, 1),
-                'annual_personnel': round(annual_personnel / 1000.0, 1),
-                'annual_energy': round(annual_energy / 1000.0, 1),
-                'total_annual_cost': round(total_annual_cost / 1000.0, 1),
-                'cost_per_pallet': round(cost_per_pallet, 2)
-            }
-        except Exception as e:
-            st.error(f"Erreur dans le calcul des coûts: {e}")
-            return {}
-    
-    @staticmethod
-    def check_norms_compliance(params, capacity):
-        """Vérifie la conformité aux normes et retourne les alertes"""
-        warnings = []
-        optimizations = []
-        
-        try:
-            # Vérification hauteur
-            if params['clear_height'] - params.get('max_rack_height', 6.0) < WarehouseCalculator.NORMS['clearance_height']:
-                warnings.append(f"⚠️ **Hauteur insuffisante** : Dégagement sous poutre inférieur à {WarehouseCalculator.NORMS['clearance_height']}m")
-            
-            # Vérification largeur allée
-            min_aisle = WarehouseCalculator.NORMS['min_aisle_width_forklift'] if params.get('equipment_type') == 'forklift' else WarehouseCalculator.NORMS['min_aisle_width_pallet']
-            if params.get('main_aisle_width', 3.5) < min_aisle:
-                warnings.append(f"⚠️ **Allée trop étroite** : {params.get('main_aisle_width', 3.5)}m < {min_aisle}m minimum pour {params.get('equipment_type', 'forklift')}")
-            
-            # Vérification charge au sol
-            estimated_load = (capacity.get('total_pallets', 0) * params.get('pallet_weight', 800.0)) / params.get('total_area', 1.0)
-            if estimated_load > WarehouseCalculator.NORMS['load_per_m2']:
-                warnings.append(f"⚠️ **Charge au sol excessive** : {estimated_load:.0f} kg/m² > {WarehouseCalculator.NORMS['load_per_m2']} kg/m² maximum")
-            
-            # Optimisations
-            storage_ratio = capacity.get('storage_ratio', 0.0)
-            if storage_ratio > 70.0:
-                optimizations.append("✅ **Excellent ratio de stockage** (>70%)")
-            else:
-                optimizations.append("💡 **Optimisation possible** : Augmenter le nombre de niveaux pour améliorer le ratio de stockage")
-            
-            if params.get('stock_rotation', 30.0) < 15.0:
-                optimizations.append("🚀 **Rotation rapide** : Considérer une zone de préparation de commandes dédiée")
-            
-        except Exception as e:
-            warnings.append(f"Erreur dans la vérification des normes: {e}")
-        
-        return warnings, optimizations
+# Caches partagés par toutes les sessions du serveur : durée de vie et taille bornées,
+# résultats copiés à la lecture (une session ne voit jamais les modifications d'une autre)
+SHARED_CACHE_TTL = float(os.environ.get('WAREHOUSE_CACHE_TTL', 3600))
+ADMIN_TOKEN = os.environ.get('WAREHOUSE_ADMIN')
+
+# Cache des calculs (indexé sur les paramètres lus par chaque calcul)
+if 'calculation_cache' not in st.session_state:
+    st.session_state.calculation_cache = shared_cache('calculations', maxsize=4096, ttl=SHARED_CACHE_TTL,
+                                                      max_bytes=64 << 20)
+
+# Portefeuille de sites (étape 8), conservé lors de la réinitialisation du projet
+if 'portfolio' not in st.session_state:
+    st.session_state.portfolio = SitePortfolio()
+
+# Base de scénarios SQLite (fichier WAREHOUSE_DB), persistante entre les sessions
+if 'scenario_store' not in st.session_state:
+    st.session_state.scenario_store = ScenarioStore()
+
+# Images du plan d'implantation déjà rendues, par implantation
+if 'plan_cache' not in st.session_state:
+    st.session_state.plan_cache = shared_cache('plans', maxsize=256, ttl=SHARED_CACHE_TTL, max_bytes=256 << 20)
+
+# Profilage des pages : actif par défaut avec WAREHOUSE_PROFILE, journal JSON dans WAREHOUSE_PROFILE_LOG
+if 'profiler' not in st.session_state:
+    st.session_state.profiler = Profiler(enabled=bool(os.environ.get('WAREHOUSE_PROFILE')),
+                                         log_path=os.environ.get('WAREHOUSE_PROFILE_LOG'))
+
+# Tâches en arrière-plan : propriétaire = identifiant de l'onglet, gardé dans l'adresse
+# (?tab=...) pour retrouver ses tâches après un rechargement de la page
+if 'job_owner' not in st.session_state:
+    st.session_state.job_owner = st.query_params.get('tab') or uuid.uuid4().hex[:12]
+    st.query_params['tab'] = st.session_state.job_owner
+JOBS = shared_runner()
+JOB_POLL_SECONDS = 1.0
+
+
+def profiled_page(page):
+    """Chaque exécution de la page, complète ou limitée au fragment, est mesurée par le profileur"""
+    @wraps(page)
+    def run():
+        with st.session_state.profiler.run(page.__name__):
+            page()
+    return run
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_status(job_id):
+    """Progression d'une tâche, interrogée chaque seconde ; la page est relancée à la fin de la tâche"""
+    job = JOBS.get(job_id)
+    if job is None or job.done:
+        st.rerun()
+    col_bar, col_cancel = st.columns([5, 1])
+    with col_bar:
+        st.progress(job.progress, text=f"⏳ {job.label} : {job.message or 'en cours'} ({job.elapsed:.0f} s)")
+        for message in job.errors:
+            st.caption(f"⚠️ {message}")
+    with col_cancel:
+        if st.button("⏹️ Annuler", key=f"cancel_{job_id}", use_container_width=True):
+            job.cancel()
+
+
+def job_result(kind):
+    """Résultat de la dernière tâche `kind` de l'onglet, rendu une seule fois quand elle est terminée
+    
+    Tant que la tâche tourne, sa progression est affichée et None est retourné.
+    """
+    job = JOBS.latest(st.session_state.job_owner, kind)
+    if job is None:
+        return None
+    if not job.done:
+        job_status(job.id)
+        return None
+    JOBS.forget(job.id)
+    for message in job.errors:
+        st.error(message)
+    if job.status == FAILED:
+        st.error(f"{job.label} impossible : {job.error}")
+    elif job.status == CANCELLED:
+        st.warning(f"{job.label} annulée.")
+    else:
+        return job.result
+    return None
+
+
+def jobs_panel(polling):
+    """Tâches de l'onglet (barre latérale) ; en suivi, la page est relancée quand la dernière se termine"""
+    jobs = JOBS.jobs(st.session_state.job_owner)
+    if polling and all(job.done for job in jobs):
+        st.rerun()
+    for job in jobs:
+        state = {RUNNING: f"⏳ {100 * job.progress:.0f}%", FAILED: "❌ échec", CANCELLED: "⏹️ annulée"}.get(
+            job.status, "✅ terminée" if job.done else "🕒 en attente")
+        errors = f", ⚠️ {len(job.errors)} erreur(s)" if job.errors else ""
+        st.caption(f"{job.label} — {state} ({job.elapsed:.0f} s{errors})")
+
+
+# Libellés des équipements de manutention
+EQUIPMENT_LABELS = {
+    "forklift": "🔸 Chariot élévateur",
+    "reach_truck": "🔸 Chariot à mât rétractable",
+    "pallet_truck": "🔸 Transpalette électrique",
+    "automated": "🤖 Système automatisé"
+}
+
+# Modèles de distance de parcours (temps de cycle)
+DISTANCE_MODELS = {
+    "graph": "🧭 Graphe des allées (plus courts chemins)",
+    "mean": "📏 Estimation (longueur + largeur) / 2"
+}
+
+# Modèles d'implantation (calcul de capacité)
+LAYOUT_MODELS = {
+    "aisles": "🧱 Allées multiples et zones (allées secondaires, poteaux)",
+    "central": "↔️ Allée centrale unique (simplifié)"
+}
 
 # ============================================================================
 # SIDEBAR - NAVIGATION ET CONFIGURATION GLOBALE
@@ -517,7 +490,8 @@ with st.sidebar:
     
     # Sélecteur d'étape
     step_options = ["🏢 1. BÂTIMENT", "📦 2. STOCKAGE", "🚚 3. CIRCULATION", 
-                   "📊 4. RÉSULTATS", "🎨 5. VISUALISATION"]
+                   "📊 4. RÉSULTATS", "🎨 5. VISUALISATION", "🧭 6. OPTIMISATION",
+                   "📦 7. TRAITEMENT PAR LOTS", "🗂️ 8. PORTEFEUILLE DE SITES"]
     
     step_index = st.session_state.warehouse_data['step'] - 1
     step = st.radio(
@@ -551,14 +525,67 @@ with st.sidebar:
             'calculations': {}, 
             'warnings': [], 
             'optimizations': [],
-            'params': {}
+            'params': {},
+            'optimizer': {},
+            'simulation': {},
+            'slotting': {},
+            'picking': {},
+            'risk': {},
+            'phasing': {},
+            'report': {}
         }
         st.rerun()
+    
+    # Administration : caches partagés, visible avec ?admin=<WAREHOUSE_ADMIN> dans l'adresse
+    if ADMIN_TOKEN and st.query_params.get('admin') == ADMIN_TOKEN:
+        with st.expander("🛠️ Caches partagés"):
+            cache_table = pd.DataFrame.from_dict(shared_stats(), orient='index')
+            cache_table['bytes'] = (cache_table['bytes'] / 2 ** 20).round(1)
+            st.dataframe(cache_table.rename(columns={'size': 'entrées', 'bytes': 'Mio', 'hits': 'succès',
+                                                     'misses': 'calculs', 'waits': 'attentes',
+                                                     'evictions': 'évictions', 'expirations': 'expirées',
+                                                     'hit_rate': 'réutilisation (%)'})
+                         [['entrées', 'Mio', 'succès', 'calculs', 'attentes', 'évictions', 'expirées',
+                           'réutilisation (%)']], use_container_width=True)
+            if st.button("🧹 Vider les caches partagés", use_container_width=True):
+                for name in cache_table.index:
+                    shared_cache(name).clear()
+                st.rerun()
+        with st.expander("⏳ Tâches en arrière-plan"):
+            st.dataframe(pd.DataFrame([JOBS.stats()]).rename(index={0: 'tâches'}), use_container_width=True)
+    
+    # Tâches en arrière-plan de l'onglet, suivies tant qu'une tâche tourne
+    owner_jobs = JOBS.jobs(st.session_state.job_owner)
+    if owner_jobs:
+        st.markdown("### ⏳ TÂCHES EN ARRIÈRE-PLAN")
+        polling = not all(job.done for job in owner_jobs)
+        st.fragment(jobs_panel, run_every=JOB_POLL_SECONDS if polling else None)(polling)
+    
+    # Profilage : temps par étape des dernières exécutions de page (actualisé à chaque exécution complète)
+    profiler = st.session_state.profiler
+    profiler.enabled = st.checkbox("⏱️ Profilage des pages", value=bool(os.environ.get('WAREHOUSE_PROFILE')),
+                                   key="profiling")
+    if profiler.enabled:
+        with st.expander("⏱️ Temps d'exécution", expanded=True):
+            last = profiler.last()
+            if last is None:
+                st.caption("Aucune exécution mesurée : modifiez un paramètre de la page.")
+            else:
+                st.caption(f"Dernière exécution : {last['label']}, {last['total_ms']:.0f} ms")
+                stages = pd.DataFrame.from_dict(last['stages'], orient='index', columns=['calls', 'ms'])
+                st.dataframe(stages.sort_values('ms', ascending=False).rename(columns={'calls': 'appels'}),
+                             use_container_width=True)
+                history = pd.DataFrame([{'page': r['label'], 'ms': r['total_ms']} for r in profiler.runs])
+                st.bar_chart(history['ms'].tail(20), height=120)
+            if st.button("🔄 Actualiser", use_container_width=True):
+                st.rerun()
 
 # ============================================================================
 # ÉTAPE 1 : PARAMÈTRES DU BÂTIMENT
 # ============================================================================
-if st.session_state.warehouse_data['step'] == 1:
+@st.fragment
+@profiled_page
+def building_page():
     st.markdown('<div class="section-header">🏢 ÉTAPE 1 : DIMENSIONS DU BÂTIMENT</div>', unsafe_allow_html=True)
     
     col1, col2 = st.columns([2, 1])
@@ -650,7 +677,9 @@ if st.session_state.warehouse_data['step'] == 1:
 # ============================================================================
 # ÉTAPE 2 : PARAMÈTRES DE STOCKAGE
 # ============================================================================
-elif st.session_state.warehouse_data['step'] == 2:
+@st.fragment
+@profiled_page
+def storage_page():
     st.markdown('<div class="section-header">📦 ÉTAPE 2 : PARAMÈTRES DE STOCKAGE</div>', unsafe_allow_html=True)
     
     col1, col2 = st.columns([2, 1])
@@ -673,6 +702,19 @@ elif st.session_state.warehouse_data['step'] == 2:
                 pallet_height = st.number_input("**Hauteur palette (m)**", 
                                               min_value=0.5, max_value=2.5, value=1.2, step=0.1,
                                               help="Hauteur moyenne des charges")
+            
+            # Mix de palettes rangé dans les alvéoles (une ligne par type, part en % du stock)
+            st.markdown("**Mix de palettes**")
+            mix_df = st.data_editor(
+                pd.DataFrame(default_mix({'pallet_type': pallet_type, 'pallet_height': pallet_height})),
+                num_rows="dynamic", use_container_width=True, hide_index=True,
+                column_config={
+                    'pallet_type': st.column_config.SelectboxColumn("Type", options=list(PALLET_TYPES), required=True),
+                    'share': st.column_config.NumberColumn("Part (%)", min_value=0.0, max_value=100.0, step=5.0),
+                    'height': st.column_config.NumberColumn("Hauteur (m)", min_value=0.5, max_value=2.5, step=0.1),
+                })
+            pallet_mix = [row for row in mix_df.dropna(subset=['pallet_type', 'share']).to_dict('records')
+                          if row['share'] > 0]
         
         with tab2:
             c1, c2, c3 = st.columns(3)
@@ -728,13 +770,16 @@ elif st.session_state.warehouse_data['step'] == 2:
         'max_levels': int(max_levels),
         'flow_type': flow_type,
         'special_conditions': special_conditions,
+        'pallet_mix': pallet_mix or default_mix({'pallet_type': pallet_type, 'pallet_height': pallet_height}),
         'pallet_volume': 1.0  # Valeur par défaut
     })
 
 # ============================================================================
 # ÉTAPE 3 : PARAMÈTRES DE CIRCULATION
 # ============================================================================
-elif st.session_state.warehouse_data['step'] == 3:
+@st.fragment
+@profiled_page
+def circulation_page():
     st.markdown('<div class="section-header">🚚 ÉTAPE 3 : CIRCULATION ET ÉQUIPEMENTS</div>', unsafe_allow_html=True)
     
     col1, col2 = st.columns([2, 1])
@@ -748,12 +793,7 @@ elif st.session_state.warehouse_data['step'] == 3:
             equipment_type = st.selectbox(
                 "**Type d'équipement principal**",
                 ["forklift", "reach_truck", "pallet_truck", "automated"],
-                format_func=lambda x: {
-                    "forklift": "🔸 Chariot élévateur",
-                    "reach_truck": "🔸 Chariot à mât rétractable",
-                    "pallet_truck": "🔸 Transpalette électrique",
-                    "automated": "🤖 Système automatisé"
-                }[x]
+                format_func=lambda x: EQUIPMENT_LABELS[x]
             )
             
             c1, c2 = st.columns(2)
@@ -773,10 +813,19 @@ elif st.session_state.warehouse_data['step'] == 3:
                                                  help="Largeur des allées de circulation")
             with c2:
                 secondary_aisle_width = st.number_input("**Largeur allée secondaire (m)**", 
-                                                      min_value=1.5, max_value=3.0, value=2.0, step=0.1,
+                                                      min_value=1.5, max_value=6.0, value=2.0, step=0.1,
                                                       help="Largeur des allées entre racks")
             
             operating_hours = st.slider("**Heures d'exploitation/jour**", 8, 24, 16, step=1)
+            
+            distance_model = st.selectbox("**Modèle de distance**", list(DISTANCE_MODELS),
+                                          format_func=lambda x: DISTANCE_MODELS[x],
+                                          help="Distance moyenne de parcours utilisée pour le temps de cycle")
+            
+            layout_model = st.selectbox("**Modèle d'implantation**", list(LAYOUT_MODELS),
+                                        format_func=lambda x: LAYOUT_MODELS[x],
+                                        help="Rangées séparées par des allées secondaires, calées sur les poteaux, "
+                                             "avec une zone par condition spéciale de l'étape 2")
     
     with col2:
         st.markdown("### 📋 Spécifications techniques")
@@ -802,6 +851,8 @@ elif st.session_state.warehouse_data['step'] == 3:
         'main_aisle_width': float(main_aisle_width),
         'secondary_aisle_width': float(secondary_aisle_width),
         'operating_hours': float(operating_hours),
+        'distance_model': distance_model,
+        'layout_model': layout_model,
         'safety_margin': float(safety_margin),
         'lighting_type': lighting_type,
         'security_systems': security_systems
@@ -810,18 +861,26 @@ elif st.session_state.warehouse_data['step'] == 3:
 # ============================================================================
 # ÉTAPE 4 : CALCULS ET RÉSULTATS
 # ============================================================================
-elif st.session_state.warehouse_data['step'] == 4:
+@st.fragment
+@profiled_page
+def results_page():
     st.markdown('<div class="section-header">📊 ÉTAPE 4 : RÉSULTATS ET ANALYSE</div>', unsafe_allow_html=True)
     
     # Bouton de calcul
     if st.button("🚀 Lancer les calculs de dimensionnement", type="primary", use_container_width=True):
         with st.spinner("🔬 Calculs en cours avec vérification des normes..."):
-            calculator = WarehouseCalculator()
+            calculator = CachedCalculator(st.session_state.calculation_cache)
             params = st.session_state.warehouse_data['params']
             
             # Calculs
-            capacity = calculator.calculate_storage_capacity(params)
-            circulation = calculator.calculate_circulation(params, capacity)
+            if params.get('layout_model', 'aisles') == 'aisles':
+                capacity = calculator.generate_layout(params)
+            else:
+                capacity = calculator.calculate_storage_capacity(params)
+            distances = None
+            if capacity and params.get('distance_model', 'graph') == 'graph':
+                distances = site_distances(params, capacity)
+            circulation = calculator.calculate_circulation(params, capacity, distances)
             costs = calculator.calculate_costs(params, capacity, circulation)
             warnings, optimizations = calculator.check_norms_compliance(params, capacity)
             
@@ -829,10 +888,22 @@ elif st.session_state.warehouse_data['step'] == 4:
             st.session_state.warehouse_data['calculations'] = {
                 'capacity': capacity,
                 'circulation': circulation,
-                'costs': costs
+                'costs': costs,
+                'distances': {
+                    'model': 'aisles' if 'zones' in capacity else 'central',
+                    'docks': distances.docks,
+                    'locations': distances.locations,
+                    'nearest_mean': round(float(distances.nearest.mean()), 1),
+                } if distances is not None else {}
             }
             st.session_state.warehouse_data['warnings'] = warnings
             st.session_state.warehouse_data['optimizations'] = optimizations
+            st.session_state.warehouse_data['simulation'] = {}
+            st.session_state.warehouse_data['slotting'] = {}
+            st.session_state.warehouse_data['picking'] = {}
+            st.session_state.warehouse_data['risk'] = {}
+            st.session_state.warehouse_data['phasing'] = {}
+            st.session_state.warehouse_data['report'] = {}
         
         st.success("✅ Calculs terminés avec succès !")
         st.rerun()
@@ -841,6 +912,10 @@ elif st.session_state.warehouse_data['step'] == 4:
     if st.session_state.warehouse_data['calculations']:
         calc = st.session_state.warehouse_data['calculations']
         
+        cache_stats = st.session_state.calculation_cache.stats()
+        st.caption(f"🗄️ Cache de calcul partagé : {cache_stats['hits']} résultats réutilisés, "
+                   f"{cache_stats['misses']} calculés ({cache_stats['hit_rate']:.0f}% de réutilisation)")
+        
         # Tableau de bord des métriques
         st.markdown("### 📈 TABLEAU DE BORD DES PERFORMANCES")
         
@@ -851,7 +926,9 @@ elif st.session_state.warehouse_data['step'] == 4:
             <div class="metric-card">
                 <h4>🏗️ Racks installés</h4>
                 <h1 style="color:#3498db;">{calc['capacity'].get('total_racks', 0)}</h1>
-                <p>{calc['capacity'].get('racks_per_row', 0)} × {calc['capacity'].get('rows_per_side', 0)} × 2 côtés</p>
+                <p>{f"{len(calc['capacity']['zones'])} zones, {calc['capacity'].get('secondary_aisles', 0)} allées secondaires"
+                    if 'zones' in calc['capacity'] else
+                    f"{calc['capacity'].get('racks_per_row', 0)} × {calc['capacity'].get('rows_per_side', 0)} × 2 côtés"}</p>
             </div>
             """, unsafe_allow_html=True)
         
@@ -882,10 +959,22 @@ elif st.session_state.warehouse_data['step'] == 4:
             </div>
             """, unsafe_allow_html=True)
         
+        # Enregistrement du scénario dans la base persistante
+        s1, s2 = st.columns([3, 1])
+        with s1:
+            scenario_name = st.text_input("**Nom du scénario**", project_name, label_visibility="collapsed")
+        with s2:
+            if st.button("💾 Enregistrer le scénario", use_container_width=True):
+                scenario_id = st.session_state.scenario_store.save(
+                    scenario_name, st.session_state.warehouse_data['params'], calc,
+                    st.session_state.warehouse_data['warnings'])
+                st.success(f"Scénario n°{scenario_id} enregistré")
+        
         # Détails des calculs
         st.markdown("### 📋 RAPPORT DÉTAILLÉ")
         
-        tab1, tab2, tab3 = st.tabs(["Capacité", "Circulation", "Coûts"])
+        tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["Capacité", "Circulation", "Coûts", "Slotting ABC",
+                                                            "Préparation", "Risques", "Croissance"])
         
         with tab1:
             col1, col2 = st.columns(2)
@@ -918,7 +1007,45 @@ elif st.session_state.warehouse_data['step'] == 4:
                 
                 ax.pie(values, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
                 ax.axis('equal')
-                st.pyplot(fig)
+                with timer('st.pyplot'):
+                    st.pyplot(fig)
+            
+            if 'zones' in calc['capacity']:
+                st.markdown("#### 🧱 Implantation par zones")
+                zones_df = pd.DataFrame(calc['capacity']['zones'])[
+                    ['name', 'rack_type', 'x0', 'x1', 'lines', 'aisles', 'racks', 'levels', 'pallets', 'racks_lost_to_posts']]
+                zones_df.columns = ['Zone', 'Type de rack', 'Début (m)', 'Fin (m)', 'Lignes de racks',
+                                    'Allées secondaires', 'Racks', 'Niveaux', 'Palettes', 'Racks retirés (poteaux)']
+                st.dataframe(zones_df, use_container_width=True, hide_index=True)
+                st.caption(f"{calc['capacity'].get('cross_aisles', 0)} allées transversales ; "
+                           f"{calc['capacity'].get('racks_lost_to_posts', 0)} racks retirés au droit des poteaux ; "
+                           f"{calc['capacity'].get('posts_in_aisles', 0)} poteaux dans les allées.")
+                
+                # Emplacements par type de palette et contrôle d'un stock à loger
+                params = st.session_state.warehouse_data['params']
+                packer = PalletPacker(params)
+                by_type = {}
+                for zone in calc['capacity']['zones']:
+                    for pallet, count in zone.get('positions_by_type', {}).items():
+                        by_type[pallet] = by_type.get(pallet, 0) + count
+                st.dataframe(pd.DataFrame({
+                    'Type de palette': packer.types,
+                    'Part du stock': [f"{100 * share:.0f}%" for share in packer.shares],
+                    'Palettes par niveau': packer.slots(),
+                    'Emplacements': [by_type.get(pallet, 0) for pallet in packer.types],
+                }), use_container_width=True, hide_index=True)
+                
+                stock = st.number_input("**Stock à loger (palettes)**", min_value=0, value=0, step=1000,
+                                        help="Palettes réparties selon le mix de l'étape 2")
+                if stock:
+                    counts = np.round(packer.shares * stock).astype(np.int64)
+                    packed = packer.pack(counts)
+                    available = calc['capacity'].get('total_racks', 0)
+                    c1, c2, c3 = st.columns(3)
+                    c1.metric("Travées nécessaires", f"{packed['bays']:,}")
+                    c2.metric("Travées disponibles", f"{available:,}",
+                              delta=f"{available - packed['bays']:+,}")
+                    c3.metric("Palettes hors gabarit", f"{packed['unstorable']:,}")
         
         with tab2:
             col1, col2 = st.columns(2)
@@ -935,6 +1062,16 @@ elif st.session_state.warehouse_data['step'] == 4:
                              f"{calc['circulation'].get('daily_throughput', 0):,} pal/j"]
                 }
                 st.dataframe(pd.DataFrame(circulation_data), use_container_width=True, hide_index=True)
+                
+                graph = calc.get('distances')
+                if graph:
+                    st.caption(f"📐 Distance moyenne quai → emplacement par le graphe des allées du modèle "
+                               f"« {LAYOUT_MODELS[graph.get('model', 'central')]} » "
+                               f"({graph['locations']:,} emplacements, un par rack, × {graph['docks']} quais) ; "
+                               f"{graph['nearest_mean']:.1f} m depuis le quai le plus proche. "
+                               "Simulation, slotting et tournées utilisent le même graphe.")
+                else:
+                    st.caption("📏 Distance moyenne estimée sur les dimensions du bâtiment.")
             
             with col2:
                 st.markdown("#### 📅 Planning de déploiement")
@@ -945,6 +1082,67 @@ elif st.session_state.warehouse_data['step'] == 4:
                     "Statut": ["✅", "🔄", "⏳", "⏳", "⏳", "⏳"]
                 }
                 st.dataframe(pd.DataFrame(timeline_data), use_container_width=True, hide_index=True)
+            
+            st.markdown("#### 🎲 Simulation à événements discrets")
+            st.caption("Les chariots parcourent la grille de racks du plan ; quais et allées de rangée "
+                       "n'admettent qu'un chariot à la fois. Le débit réel tient compte des attentes.")
+            
+            params = st.session_state.warehouse_data['params']
+            c1, c2, c3, c4 = st.columns(4)
+            with c1:
+                sim_vehicles = st.number_input("**Chariots simulés**", min_value=1, max_value=100000,
+                                               value=int(calc['circulation'].get('required_equipment', 1)), step=1)
+            with c2:
+                sim_hours = st.slider("**Durée simulée (h)**", 1, 24, int(params.get('operating_hours', 16)), step=1)
+            with c3:
+                sim_demand = st.slider("**Facteur de demande**", 0.5, 3.0, 1.0, step=0.1,
+                                       help="Multiplie le débit journalier (rotation du stock)")
+            with c4:
+                sim_seed = st.number_input("**Graine aléatoire**", min_value=0, value=0, step=1)
+            
+            if st.button("▶️ Simuler la période", use_container_width=True):
+                # Les tâches reçoivent une copie des paramètres : les étapes 1 à 3 modifient le dictionnaire en place
+                simulation = ForkliftSimulation(dict(params), calc['capacity'], vehicles=sim_vehicles,
+                                                hours=sim_hours, demand_factor=sim_demand, seed=int(sim_seed),
+                                                circulation=calc['circulation'])
+                JOBS.submit(st.session_state.job_owner, 'simulation', "Simulation des opérations",
+                            lambda job: simulation.run(progress=job.report))
+            simulated = job_result('simulation')
+            if simulated is not None:
+                st.session_state.warehouse_data['simulation'] = simulated
+            
+            sim = st.session_state.warehouse_data.get('simulation')
+            if sim:
+                m1, m2, m3, m4 = st.columns(4)
+                with m1:
+                    st.metric("Débit réel", f"{sim['throughput']:,.1f} pal/h",
+                              delta=f"{sim['throughput'] - sim['static_throughput']:,.1f} vs estimation",
+                              delta_color="off")
+                with m2:
+                    st.metric("Utilisation des chariots", f"{sim['utilization']:.1f}%")
+                with m3:
+                    st.metric("Attente moyenne / P95", f"{sim['mean_wait']:.1f} / {sim['p95_wait']:.1f} min")
+                with m4:
+                    st.metric("Missions non terminées", f"{sim['backlog']:,}", delta=f"file max {sim['max_queue']:,}",
+                              delta_color="off")
+                
+                st.caption(f"{sim['missions']:,} missions, {sim['events']:,} événements simulés en {sim['elapsed']:.2f} s — "
+                           f"cycle moyen {sim['mean_cycle']:.1f} min, blocage moyen par mission : "
+                           f"{sim['aisle_blocking']:.0f} s en allée, {sim['dock_blocking']:.0f} s à quai")
+                
+                fig, ax = plt.subplots(figsize=(10, 3.5))
+                hours_axis = np.arange(1, len(sim['hourly_completed']) + 1)
+                ax.bar(hours_axis, sim['hourly_completed'], color='#3498db', alpha=0.8, label='Missions terminées')
+                ax.axhline(sim['demand_per_hour'], color='#e74c3c', linestyle='--', label='Demande horaire')
+                ax2 = ax.twinx()
+                ax2.plot(hours_axis, sim['hourly_queue'], color='#f39c12', marker='o', label="File d'attente")
+                ax.set_xlabel('Heure', fontweight='bold')
+                ax.set_ylabel('Missions / h', fontweight='bold')
+                ax2.set_ylabel("Missions en attente", fontweight='bold')
+                ax.legend(loc='upper left')
+                ax2.legend(loc='upper right')
+                with timer('st.pyplot'):
+                    st.pyplot(fig)
         
         with tab3:
             col1, col2 = st.columns(2)
@@ -970,6 +1168,234 @@ elif st.session_state.warehouse_data['step'] == 4:
                 }
                 st.dataframe(pd.DataFrame(operating_data), use_container_width=True, hide_index=True)
         
+        with tab4:
+            st.markdown("#### 🏷️ Affectation des références aux emplacements")
+            st.caption("Les références les plus prélevées (par palette) sont rangées au plus près des quais, "
+                       "au plus bas niveau. Colonnes : " + ", ".join(f"`{c}` ({label})" for c, label in SKU_COLUMNS.items()))
+            
+            sku_file = st.file_uploader("**Liste des références**", type=['csv', 'parquet'], key="sku_file")
+            if sku_file is not None and st.button("🏷️ Calculer le slotting", use_container_width=True):
+                slot_params, capacity = dict(st.session_state.warehouse_data['params']), calc['capacity']
+                
+                def assign(job):
+                    skus = pd.concat(bulk.read_chunks(sku_file, bulk.detect_format(sku_file.name, bulk.INPUT_FORMATS)),
+                                     ignore_index=True)
+                    job.report(0.3, f"{len(skus):,} références lues")
+                    distances = site_distances(slot_params, capacity)
+                    return SlottingEngine(slot_params, capacity, distances).assign(skus)
+                
+                JOBS.submit(st.session_state.job_owner, 'slotting', "Slotting", assign)
+            slotted = job_result('slotting')
+            if slotted is not None:
+                st.session_state.warehouse_data['slotting'] = slotted
+            
+            slotting = st.session_state.warehouse_data.get('slotting')
+            if slotting:
+                summary = slotting['summary']
+                m1, m2, m3, m4 = st.columns(4)
+                with m1:
+                    st.metric("Références rangées", f"{summary['slotted']:,} / {summary['skus']:,}")
+                with m2:
+                    st.metric("Emplacements utilisés", f"{summary['positions_used']:,} / {summary['positions']:,}")
+                with m3:
+                    st.metric("Parcours par prélèvement", f"{summary['travel_per_pick']:.1f} m",
+                              delta=f"-{summary['gain']:.0f}% vs rangement aléatoire", delta_color="off")
+                with m4:
+                    st.metric("Parcours journalier", f"{summary['daily_travel_km']:,.1f} km")
+                
+                abc = summary['abc_counts']
+                st.caption(f"Classes ABC (80 / 15 / 5 % des prélèvements) : A = {abc['A']:,}, B = {abc['B']:,}, "
+                           f"C = {abc['C']:,} références. Parcours aléatoire : {summary['random_travel_per_pick']:.1f} m.")
+                if summary['unslotted']:
+                    st.warning(f"⚠️ {summary['unslotted']:,} références n'ont pas d'emplacement : capacité insuffisante.")
+                
+                st.dataframe(slotting['skus'].head(500), use_container_width=True, hide_index=True)
+                st.download_button(
+                    label="⬇️ Télécharger l'affectation (CSV)",
+                    data=slotting['skus'].to_csv(index=False).encode('utf-8'),
+                    file_name="slotting_abc.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
+        
+        with tab5:
+            st.markdown("#### 🛒 Tournées de préparation de commandes")
+            st.caption("Les commandes sont regroupées en tournées puis parcourues sur le réseau d'allées du plan. "
+                       "Colonnes : " + ", ".join(f"`{c}` ({label})" for c, label in ORDER_COLUMNS.items())
+                       + ". Sans slotting calculé, les références sont rangées au hasard.")
+            
+            p1, p2 = st.columns(2)
+            with p1:
+                policy = st.selectbox("**Politique de parcours**", options=list(ROUTING_POLICIES.keys()),
+                                      format_func=lambda x: ROUTING_POLICIES[x])
+                batching = st.selectbox("**Regroupement des commandes**", options=list(BATCHING_RULES.keys()),
+                                        index=1, format_func=lambda x: BATCHING_RULES[x])
+                two_opt = st.checkbox("Amélioration 2-opt des tournées", value=False,
+                                      help=f"Tournées de {TWO_OPT_MAX_STOPS} arrêts au plus ; calcul plus long")
+            with p2:
+                orders_per_batch = st.number_input("**Commandes par tournée**", min_value=1, max_value=50, value=8)
+                lines_per_batch = st.number_input("**Lignes par tournée**", min_value=1, max_value=500, value=40)
+            
+            order_file = st.file_uploader("**Lignes de commande de la journée**", type=['csv', 'parquet'], key="order_file")
+            if order_file is not None and st.button("🛒 Calculer les tournées", use_container_width=True):
+                pick_params, capacity = dict(st.session_state.warehouse_data['params']), calc['capacity']
+                slotting = st.session_state.warehouse_data.get('slotting')
+                
+                def plan_tours(job):
+                    order_lines = pd.concat(bulk.read_chunks(order_file, bulk.detect_format(order_file.name,
+                                                                                            bulk.INPUT_FORMATS)),
+                                            ignore_index=True)
+                    job.report(0.1, f"{len(order_lines):,} lignes lues")
+                    planner = PickingPlanner(pick_params, site_distances(pick_params, capacity),
+                                             orders_per_batch, lines_per_batch, batching, policy, two_opt)
+                    return planner.run(order_lines, slotting,
+                                       progress=lambda fraction: job.report(0.1 + 0.9 * fraction,
+                                                                            "Regroupement et parcours des tournées"))
+                
+                JOBS.submit(st.session_state.job_owner, 'picking', "Calcul des tournées", plan_tours)
+            planned = job_result('picking')
+            if planned is not None:
+                st.session_state.warehouse_data['picking'] = planned
+            
+            picking = st.session_state.warehouse_data.get('picking')
+            if picking:
+                summary = picking['summary']
+                m1, m2, m3, m4 = st.columns(4)
+                with m1:
+                    st.metric("Tournées", f"{summary['tours']:,}", delta=f"{summary['orders']:,} commandes", delta_color="off")
+                with m2:
+                    st.metric("Distance parcourue", f"{summary['distance_km']:,.1f} km",
+                              delta=f"{summary['distance_per_line']:.1f} m / ligne", delta_color="off")
+                with m3:
+                    st.metric("Lignes par heure", f"{summary['picks_per_hour']:.0f}")
+                with m4:
+                    st.metric("Préparateurs nécessaires", f"{summary['pickers']}",
+                              delta=f"{summary['picker_hours']:,.0f} h de travail", delta_color="off")
+                
+                st.caption(f"{summary['lines']:,} lignes en {summary['elapsed']:.2f} s. Tournée moyenne : "
+                           f"{summary['mean_tour']:.0f} m. Coût annuel des préparateurs : "
+                           f"{summary['pickers'] * WarehouseCalculator.COSTS['operator_salary'] / 1000.0:,.0f} k€.")
+                if summary['unlocated']:
+                    st.warning(f"⚠️ {summary['unlocated']:,} lignes ignorées : référence sans emplacement.")
+                
+                st.dataframe(picking['tours'].head(500), use_container_width=True, hide_index=True)
+                st.download_button(
+                    label="⬇️ Télécharger les tournées (CSV)",
+                    data=picking['lines'].to_csv(index=False).encode('utf-8'),
+                    file_name="tournees_preparation.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
+        
+        with tab6:
+            st.markdown("#### 🎲 Analyse de risque Monte-Carlo")
+            st.caption("Demande, taux de remplissage, rotation et disponibilité des équipements sont tirés au hasard "
+                       "autour des valeurs saisies ; le dimensionnement calculé est évalué pour chaque tirage.")
+            
+            r1, r2, r3 = st.columns(3)
+            with r1:
+                demand_level = st.slider("**Demande moyenne (% du stock calculé)**", 50, 150,
+                                         int(100 * UNCERTAINTIES['demand_level']), step=5)
+                demand_cv = st.slider("**Variabilité de la demande (%)**", 0, 50,
+                                      int(100 * UNCERTAINTIES['demand_cv']), step=1)
+            with r2:
+                filling_sd = st.slider("**Écart type du remplissage (points)**", 0.0, 15.0,
+                                       UNCERTAINTIES['filling_sd'], step=0.5)
+                rotation_spread = st.slider("**Étendue de la rotation (± %)**", 0, 90,
+                                            int(100 * UNCERTAINTIES['rotation_spread']), step=5)
+            with r3:
+                availability = st.slider("**Disponibilité des équipements (%)**", 50, 100,
+                                         int(100 * UNCERTAINTIES['availability']), step=1)
+                samples = st.number_input("**Tirages**", min_value=1000, max_value=1000000, value=100000, step=10000)
+                seed = st.number_input("**Graine**", min_value=0, value=0, step=1,
+                                       help="Même graine et même nombre de tirages : mêmes résultats")
+            
+            if st.button("🎲 Lancer l'analyse de risque", use_container_width=True):
+                params = st.session_state.warehouse_data['params']
+                analysis = RiskAnalysis(dict(params), calc['capacity'], calc['circulation'],
+                                        demand_level=demand_level / 100.0, demand_cv=demand_cv / 100.0,
+                                        filling_sd=filling_sd, rotation_spread=rotation_spread / 100.0,
+                                        availability=min(availability / 100.0, 0.999))
+                JOBS.submit(st.session_state.job_owner, 'risk', "Analyse de risque",
+                            lambda job: analysis.run(samples, int(seed), progress=job.report))
+            analysed = job_result('risk')
+            if analysed is not None:
+                st.session_state.warehouse_data['risk'] = analysed
+            
+            risk = st.session_state.warehouse_data.get('risk')
+            if risk:
+                summary = risk['summary']
+                m1, m2, m3, m4 = st.columns(4)
+                with m1:
+                    st.metric("Risque de manque de capacité", f"{summary['shortfall_probability']:.1f}%")
+                with m2:
+                    st.metric("Équipements (P50 / P95)", f"{summary['equipment_p50']} / {summary['equipment_p95']}",
+                              delta=f"{summary['equipment_deterministic']} au calcul", delta_color="off")
+                with m3:
+                    st.metric("Calcul dépassé", f"{summary['equipment_exceeded']:.1f}%",
+                              help="Part des tirages demandant plus d'équipements que le calcul déterministe")
+                with m4:
+                    st.metric("Coût par palette (P50 / P95)", f"{summary['cost_p50']:.0f} / {summary['cost_p95']:.0f} €")
+                
+                st.dataframe(risk['percentiles'].round(1), use_container_width=True)
+                st.markdown("**Équipements nécessaires : répartition des tirages**")
+                st.bar_chart(risk['samples']['required_equipment'].value_counts().sort_index().rename("Tirages"))
+                st.caption(f"{summary['samples']:,} tirages (graine {summary['seed']}) en {summary['elapsed']:.2f} s.")
+        
+        with tab7:
+            st.markdown("#### 📈 Plan de croissance pluriannuel")
+            st.caption("Pour chaque scénario de croissance du stock, le plan indique les années où ajouter des niveaux "
+                       "de racks et des équipements au moindre coût actualisé (bâtiment inchangé).")
+            
+            g1, g2, g3 = st.columns(3)
+            with g1:
+                start_stock = st.number_input("**Stock la première année (palettes)**", min_value=1,
+                                              value=max(1, int(calc['capacity'].get('total_pallets', 0) * 0.5)), step=500)
+                horizon = st.slider("**Horizon (années)**", 2, 40, 10, step=1)
+            with g2:
+                growth_rates = st.text_input("**Croissances annuelles (%)**", value="3, 6, 10",
+                                             help="Un scénario par taux, séparés par des virgules")
+                discount_rate = st.slider("**Taux d'actualisation (%)**", 0.0, 15.0, 8.0, step=0.5)
+            with g3:
+                overflow_cost = st.number_input("**Stockage externe (€/palette/an)**", min_value=0.0,
+                                                value=120.0, step=10.0,
+                                                help="Coût des palettes qui ne tiennent pas dans l'entrepôt")
+            
+            if st.button("📈 Calculer les plans de croissance", use_container_width=True):
+                params = st.session_state.warehouse_data['params']
+                try:
+                    rates = [float(x) for x in growth_rates.replace(';', ',').split(',') if x.strip()]
+                    planner = GrowthPlanner(params, CachedCalculator(st.session_state.calculation_cache),
+                                            layout=params.get('layout_model', 'aisles') == 'aisles',
+                                            daily_capacity=calc['circulation'].get('daily_capacity'),
+                                            discount_rate=discount_rate / 100.0, overflow_cost=overflow_cost)
+                    summary, plans = planner.plan_scenarios(
+                        {f"+{rate:g}%/an": growth_forecast(start_stock, rate, horizon) for rate in rates})
+                    st.session_state.warehouse_data['phasing'] = {'summary': summary, 'plans': plans}
+                except ValueError as e:
+                    st.error(f"Plan de croissance impossible : {e}")
+            
+            phasing = st.session_state.warehouse_data.get('phasing')
+            if phasing:
+                overview = phasing['summary'][['npv', 'capex', 'final_levels', 'final_equipment',
+                                               'overflow_years', 'rack_projects']].copy()
+                overview['rack_projects'] = overview['rack_projects'].map(lambda years: ", ".join(map(str, years)) or "—")
+                overview.columns = ['Coût actualisé (k€)', 'Investissements (k€)', 'Niveaux finaux',
+                                    'Équipements finaux', 'Années en débord', 'Chantiers de racks (années)']
+                st.dataframe(overview, use_container_width=True)
+                
+                scenario = st.selectbox("**Détail du scénario**", list(phasing['plans']))
+                years = phasing['plans'][scenario]['years']
+                st.dataframe(years.rename(columns={
+                    'year': 'Année', 'demand': 'Stock', 'levels': 'Niveaux', 'racks': 'Racks',
+                    'positions': 'Emplacements', 'pallets': 'Capacité (pal)', 'overflow': 'Débord (pal)',
+                    'required_equipment': 'Équip. requis', 'equipment': 'Équipements',
+                    'added_levels': 'Niveaux ajoutés', 'added_equipment': 'Équip. ajoutés',
+                    'capex': 'Investissement (k€)', 'opex': 'Exploitation (k€)', 'cost_per_pallet': '€ / palette',
+                }), use_container_width=True, hide_index=True)
+                st.line_chart(years.set_index('year')[['demand', 'pallets']].rename(
+                    columns={'demand': 'Stock prévu', 'pallets': 'Capacité installée'}))
+        
         # Alertes et optimisations
         if st.session_state.warehouse_data['warnings']:
             st.markdown("### ⚠️ ALERTES DE CONFORMITÉ")
@@ -984,7 +1410,9 @@ elif st.session_state.warehouse_data['step'] == 4:
 # ============================================================================
 # ÉTAPE 5 : VISUALISATION ET EXPORT
 # ============================================================================
-elif st.session_state.warehouse_data['step'] == 5:
+@st.fragment
+@profiled_page
+def visualization_page():
     st.markdown('<div class="section-header">🎨 ÉTAPE 5 : VISUALISATION ET RAPPORTS</div>', unsafe_allow_html=True)
     
     # Déclarer les colonnes AVANT de les utiliser
@@ -997,29 +1425,15 @@ elif st.session_state.warehouse_data['step'] == 5:
         params = st.session_state.warehouse_data.get('params', {})
         calc = st.session_state.warehouse_data.get('calculations', {}).get('capacity', {})
         
-        # Correction : Assurer que la longueur est le plus grand côté
-        length = max(params.get('length', 60.0), params.get('width', 40.0))
-        width = min(params.get('length', 60.0), params.get('width', 40.0))
-        
-        rack_width = params.get('rack_width', 1.0)
-        rack_depth = params.get('rack_depth', 1.2)
-        main_aisle_width = params.get('main_aisle_width', 3.5)
-        
-        # Calculer le nombre optimal de racks pour utiliser toute la surface
-        racks_per_row = calc.get('racks_per_row', 0)
-        rows_per_side = calc.get('rows_per_side', 0)
+        # Sans calcul préalable, reprendre la capacité du calculateur (mise en cache entre deux interactions)
+        if not calc and all(k in params for k in WarehouseCalculator.BATCH_REQUIRED):
+            calc = CachedCalculator(st.session_state.calculation_cache).calculate_storage_capacity(params)
         
-        # Si les calculs n'ont pas été faits, estimer basé sur les dimensions
-        if racks_per_row == 0:
-            # Calcul optimisé pour utiliser 85% de la surface
-            usable_length = length - main_aisle_width - 4  # Marges
-            racks_per_row = max(1, int(usable_length / (rack_depth + 0.8)))
-            
-        if rows_per_side == 0:
-            usable_width = width - 4  # Marges
-            rows_per_side = max(1, int(usable_width / (rack_width + 0.8)))
-        
-        total_racks = racks_per_row * rows_per_side * 2
+        layout = plan_layout(params, calc)
+        length, width = layout['length'], layout['width']
+        rack_width, rack_depth = layout['rack_width'], layout['rack_depth']
+        racks_per_row, rows_per_side = layout['racks_per_row'], layout['rows_per_side']
+        total_racks = layout['total_racks']
         
         st.markdown(f"""
         <div class="parameter-card">
@@ -1031,124 +1445,37 @@ elif st.session_state.warehouse_data['step'] == 5:
         </div>
         """, unsafe_allow_html=True)
         
-        # Créer le schéma avec utilisation complète
-        fig, ax = plt.subplots(figsize=(14, 10))
-        
-        # Dessiner le bâtiment
-        ax.add_patch(patches.Rectangle((0, 0), length, width,
-                                       linewidth=3, edgecolor='#2c3e50',
-                                       facecolor='#ecf0f1', alpha=0.3,
-                                       label='Bâtiment'))
-        
-        # Calculer l'espacement optimal pour utiliser toute la largeur
-        total_rack_width = rows_per_side * rack_width
-        available_width = width - 4  # 2m de chaque côté
-        spacing_y = (available_width - total_rack_width) / (rows_per_side + 1) if rows_per_side > 1 else 1.0
-        
-        # Calculer l'espacement optimal pour utiliser toute la longueur
-        total_rack_length = racks_per_row * rack_depth
-        available_length_left = (length - main_aisle_width) / 2 - 2  # Moitié gauche
-        spacing_x = (available_length_left - total_rack_length) / (racks_per_row + 1) if racks_per_row > 1 else 1.0
-        
-        # Racks côté GAUCHE (bleu)
-        for i in range(racks_per_row):
-            for j in range(rows_per_side):
-                x = 2 + i * (rack_depth + spacing_x)
-                y = 2 + j * (rack_width + spacing_y)
-                ax.add_patch(patches.Rectangle((x, y), rack_depth, rack_width,
-                                             facecolor='#3498db', edgecolor='#2980b9',
-                                             alpha=0.8))
-        
-        # Allée centrale
-        alley_start = 2 + racks_per_row * (rack_depth + spacing_x) + spacing_x
-        ax.add_patch(patches.Rectangle((alley_start, 0), main_aisle_width, width,
-                                     facecolor='#95a5a6', alpha=0.5,
-                                     edgecolor='#7f8c8d', linewidth=2,
-                                     label='Allée principale'))
-        
-        # Racks côté DROIT (vert)
-        alley_end = alley_start + main_aisle_width
-        for i in range(racks_per_row):
-            for j in range(rows_per_side):
-                x = alley_end + spacing_x + i * (rack_depth + spacing_x)
-                y = 2 + j * (rack_width + spacing_y)
-                ax.add_patch(patches.Rectangle((x, y), rack_depth, rack_width,
-                                             facecolor='#2ecc71', edgecolor='#27ae60',
-                                             alpha=0.8))
-        
-        # Quais de chargement (côté droit du bâtiment)
-        dock_doors = min(params.get('dock_doors', 4), 6)  # Limiter à 6 pour la visibilité
-        for i in range(dock_doors):
-            quai_width = 4.0
-            quai_height = 3.0
-            quai_x = length - quai_width
-            quai_y = (i + 1) * (width / (dock_doors + 1)) - quai_height/2
-            ax.add_patch(patches.Rectangle((quai_x, quai_y), quai_width, quai_height,
-                                         facecolor='#e74c3c', alpha=0.7,
-                                         edgecolor='#c0392b', linewidth=2,
-                                         label='Quai' if i == 0 else ""))
-        
-        # Zones de circulation et sécurité
-        # Zone de manœuvre devant les quais
-        ax.add_patch(patches.Rectangle((length - quai_width - 8, 0), 8, width,
-                                     facecolor='#f1c40f', alpha=0.2,
-                                     hatch='//', label='Zone manœuvre'))
-        
-        # Sorties de secours
-        exit_width = 2.4
-        ax.add_patch(patches.Rectangle((length/2 - exit_width/2, -0.5), exit_width, 1,
-                                     facecolor='#9b59b6', alpha=0.6,
-                                     label='Sortie secours'))
-        
-        # Configuration du graphique
-        ax.set_xlim(-2, length + 2)
-        ax.set_ylim(-2, width + 2)
-        ax.set_aspect('equal')
-        ax.set_xlabel('LONGUEUR (mètres)', fontweight='bold', fontsize=12)
-        ax.set_ylabel('LARGEUR (mètres)', fontweight='bold', fontsize=12)
-        ax.set_title(f'PLAN D\'IMPLANTATION OPTIMISÉ - {total_racks} RACKS', 
-                    fontsize=16, fontweight='bold', pad=20)
-        
-        # Ajouter les mesures sur le plan
-        # Mesure de longueur totale
-        ax.annotate(f'{length:.0f}m', xy=(length/2, -1.5), 
-                    ha='center', va='center', fontsize=10, fontweight='bold',
-                    color='#2c3e50')
-        
-        # Mesure de largeur totale
-        ax.annotate(f'{width:.0f}m', xy=(-1.5, width/2), 
-                    ha='center', va='center', fontsize=10, fontweight='bold',
-                    color='#2c3e50', rotation=90)
-        
-        # Mesure de l'allée
-        ax.annotate(f'Allée\n{main_aisle_width}m', 
-                    xy=(alley_start + main_aisle_width/2, width/2),
-                    ha='center', va='center', fontsize=9, fontweight='bold',
-                    color='#c0392b', rotation=90,
-                    bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8))
-        
-        # Légende détaillée
-        from matplotlib.patches import Patch
-        legend_elements = [
-            Patch(facecolor='#3498db', edgecolor='#2980b9', alpha=0.8, label='Racks côté gauche'),
-            Patch(facecolor='#2ecc71', edgecolor='#27ae60', alpha=0.8, label='Racks côté droit'),
-            Patch(facecolor='#95a5a6', edgecolor='#7f8c8d', alpha=0.5, label='Allée principale'),
-            Patch(facecolor='#e74c3c', edgecolor='#c0392b', alpha=0.7, label='Quais chargement'),
-            Patch(facecolor='#f1c40f', alpha=0.2, hatch='//', label='Zone de manœuvre'),
-            Patch(facecolor='#9b59b6', alpha=0.6, label='Sortie secours')
-        ]
-        ax.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(1.02, 1),
-                  borderaxespad=0., fontsize=9)
-        
-        # Grille secondaire pour meilleure lisibilité
-        ax.grid(True, which='major', linestyle='-', linewidth=0.5, alpha=0.3, color='gray')
-        ax.grid(True, which='minor', linestyle=':', linewidth=0.3, alpha=0.2, color='gray')
-        ax.minorticks_on()
-        
-        # Ajuster les marges pour la légende
-        plt.tight_layout(rect=[0, 0, 0.85, 1])
-        
-        st.pyplot(fig)
+        plan_modes = ["🖼️ Image", "🧭 Interactif (zoom navigateur)"]
+        if params.get('layout_model', 'aisles') == 'aisles' and all(k in params for k in WarehouseCalculator.BATCH_REQUIRED):
+            plan_modes.append("🧱 Allées multiples et zones")
+        plan_mode = st.radio("**Affichage du plan**", plan_modes, horizontal=True)
+        
+        if plan_mode.startswith("🧱"):
+            # Implantation du générateur multi-allées, celle des flux, du slotting et des tournées
+            image = render_zones(params, st.session_state.plan_cache)
+            with timer('st.image'):
+                st.image(image)
+        elif plan_mode.startswith("🧭"):
+            # Géométrie envoyée une fois au navigateur : zoom et déplacement sans réexécution
+            figure = render_plan_plotly(layout, st.session_state.plan_cache)
+            with timer('st.plotly_chart'):
+                st.plotly_chart(figure, use_container_width=True)
+        else:
+            # Grand entrepôt : plan agrégé par rangée, détail des racks sur la zone zoomée
+            if total_racks > LOD_RACK_THRESHOLD:
+                st.info(f"🔎 {total_racks:,} racks : le plan est simplifié (une bande par rangée). "
+                        "Zoomez sur une zone pour afficher chaque rack.")
+                with st.expander("🔍 Zoom sur une zone du plan"):
+                    zoom_x = st.slider("**Longueur (m)**", 0.0, float(length), (0.0, float(length)), step=1.0)
+                    zoom_y = st.slider("**Largeur (m)**", 0.0, float(width), (0.0, float(width)), step=1.0)
+                if (zoom_x, zoom_y) != ((0.0, float(length)), (0.0, float(width))) and \
+                        zoom_x[1] > zoom_x[0] and zoom_y[1] > zoom_y[0]:
+                    layout['view'] = (*zoom_x, *zoom_y)
+            
+            # Plan construit une seule fois par implantation distincte (image réutilisée pour l'export)
+            image = render_plan(layout, st.session_state.plan_cache)
+            with timer('st.image'):
+                st.image(image)
         
         # Statistiques d'utilisation
         st.markdown("### 📊 STATISTIQUES D'UTILISATION")
@@ -1176,29 +1503,50 @@ elif st.session_state.warehouse_data['step'] == 5:
         
         # Boutons d'export
         if st.button("📊 Générer rapport Excel", use_container_width=True):
+            # Paramètres et résultats de la configuration, dans un vrai classeur XLSX
+            params_df = pd.DataFrame([{k: v for k, v in params.items() if np.isscalar(v)}])
+            if all(k in params_df for k in WarehouseCalculator.BATCH_REQUIRED):
+                params_df = bulk.evaluate(params_df)
+            buffer = BytesIO()
+            with bulk.ResultWriter(buffer, 'xlsx') as writer:
+                writer.write(params_df)
             st.success("Rapport Excel généré avec succès!")
-            
-            # Créer un DataFrame pour l'export
-            import pandas as pd
-            params_df = pd.DataFrame([params])
             st.download_button(
                 label="⬇️ Télécharger Excel",
-                data=params_df.to_csv(index=False).encode('utf-8'),
-                file_name="parametres_entrepot.csv",
-                mime="text/csv",
+                data=buffer.getvalue(),
+                file_name="parametres_entrepot.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 use_container_width=True
             )
         
+        # Rapport PDF construit en arrière-plan, gardé dans le cache partagé des plans (un par scénario)
         if st.button("📄 Générer rapport PDF", use_container_width=True):
-            st.success("Rapport PDF généré avec succès!")
+            calculations = st.session_state.warehouse_data['calculations']
+            if not calculations:
+                st.warning("Lancez d'abord les calculs de l'étape 4.")
+            else:
+                report_args = (dict(params), calculations, list(st.session_state.warehouse_data['warnings']),
+                               dict(layout, view=None))
+                plan_cache = st.session_state.plan_cache
+                JOBS.submit(st.session_state.job_owner, 'report', "Rapport PDF",
+                            lambda job: render_report(*report_args, cache=plan_cache, title=project_name))
+        report = job_result('report')
+        if report is not None:
+            st.session_state.warehouse_data['report'] = {'pdf': report}
+        if st.session_state.warehouse_data.get('report'):
+            st.download_button(
+                label="⬇️ Télécharger le rapport PDF",
+                data=st.session_state.warehouse_data['report']['pdf'],
+                file_name="rapport_entrepot.pdf",
+                mime="application/pdf",
+                use_container_width=True
+            )
         
         # Exporter l'image
         if st.button("🖼️ Exporter l'image", use_container_width=True):
-            buf = BytesIO()
-            fig.savefig(buf, format="png", dpi=150, bbox_inches='tight')
             st.download_button(
                 label="⬇️ Télécharger l'image",
-                data=buf.getvalue(),
+                data=render_plan(layout, st.session_state.plan_cache),
                 file_name="plan_implantation.png",
                 mime="image/png",
                 use_container_width=True
@@ -1224,6 +1572,368 @@ elif st.session_state.warehouse_data['step'] == 5:
         if st.button("🎨 Générer avec IA", use_container_width=True):
             st.info("Copiez le prompt ci-dessus dans Midjourney, DALL-E 3 ou Stable Diffusion")
 
+# ============================================================================
+# ÉTAPE 6 : OPTIMISATION DE LA CONFIGURATION
+# ============================================================================
+@st.fragment
+@profiled_page
+def optimization_page():
+    st.markdown('<div class="section-header">🧭 ÉTAPE 6 : OPTIMISATION DE LA CONFIGURATION</div>', unsafe_allow_html=True)
+    
+    params = st.session_state.warehouse_data['params']
+    
+    if any(k not in params for k in LayoutOptimizer.REQUIRED):
+        st.warning("⚠️ Renseignez d'abord le bâtiment (étape 1) et les unités de charge (étape 2) avant d'optimiser.")
+    else:
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            st.markdown("### 🎛️ Espace de recherche")
+            
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                rack_width_range = st.slider("**Largeur rack (m)**", 0.8, 3.0, (0.8, 3.0), step=0.1)
+            with c2:
+                rack_depth_range = st.slider("**Profondeur rack (m)**", 0.8, 3.0, (0.8, 3.0), step=0.1)
+            with c3:
+                aisle_range = st.slider("**Largeur allée principale (m)**", 2.0, 6.0, (2.0, 6.0), step=0.1)
+            
+            c1, c2 = st.columns(2)
+            with c1:
+                levels_range = st.slider("**Nombre de niveaux**", 1, 10, (1, 10), step=1)
+            with c2:
+                equipment_types = st.multiselect("**Équipements envisagés**",
+                                                 list(EQUIPMENT_LABELS),
+                                                 default=list(EQUIPMENT_LABELS),
+                                                 format_func=lambda x: EQUIPMENT_LABELS[x])
+        
+        with col2:
+            st.markdown("### ⏱️ Recherche")
+            time_budget = st.slider("**Temps maximal (s)**", 1, 60, 10, step=1)
+            grid_step = st.select_slider("**Pas de la grille initiale (m)**", [0.2, 0.5, 1.0], value=0.5)
+            
+            st.markdown("""
+            <div class="parameter-card">
+                <h4 style="margin-top:0;">🧮 Méthode</h4>
+                <p>Grille grossière puis raffinement au pas de 0,1 m autour du front de Pareto.
+                Les points donnant les mêmes nombres de racks, de rangées et de niveaux sont
+                équivalents : une seule configuration par classe est évaluée.</p>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        if st.button("🔍 Lancer l'optimisation", type="primary", use_container_width=True):
+            if not equipment_types:
+                st.error("Sélectionnez au moins un équipement.")
+            else:
+                search_space = {
+                    'rack_width': rack_width_range,
+                    'rack_depth': rack_depth_range,
+                    'main_aisle_width': aisle_range,
+                    'max_levels': levels_range,
+                    'equipment_type': tuple(equipment_types),
+                }
+                job_params = dict(params)
+                JOBS.submit(st.session_state.job_owner, 'optimizer', "Optimisation",
+                            lambda job: LayoutOptimizer.optimize(job_params, search_space=search_space,
+                                                                 time_budget=float(time_budget),
+                                                                 grid_step=grid_step, progress=job.report))
+        optimized = job_result('optimizer')
+        if optimized is not None:
+            st.session_state.warehouse_data['optimizer'] = optimized
+        
+        result = st.session_state.warehouse_data.get('optimizer')
+        if result:
+            front = result['front']
+            
+            col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
+            with col_stat1:
+                st.metric("Configurations évaluées", f"{result['classes_evaluated']:,}")
+            with col_stat2:
+                st.metric("Points équivalents écartés", f"{result['points_skipped']:,}")
+            with col_stat3:
+                st.metric("Temps de recherche", f"{result['elapsed']:.2f} s")
+            with col_stat4:
+                st.metric("Solutions Pareto", len(front))
+            
+            if not result['complete']:
+                st.info("⏱️ Temps imparti atteint : le front présenté couvre les configurations explorées.")
+            
+            if front.empty:
+                st.markdown('<div class="warning-box">⚠️ <strong>Aucune configuration conforme</strong> dans cet espace de recherche '
+                            '(hauteur sous poutre, largeur d\'allée ou charge au sol).</div>', unsafe_allow_html=True)
+            else:
+                col1, col2 = st.columns([1, 1])
+                
+                with col1:
+                    st.markdown("#### 📈 Front de Pareto")
+                    evaluated = result['evaluated']
+                    feasible = evaluated[evaluated['compliant'] & (evaluated['total_pallets'] > 0)]
+                    
+                    fig, ax = plt.subplots(figsize=(8, 6))
+                    ax.scatter(feasible['total_pallets'], feasible['cost_per_pallet'],
+                               s=6, color='#bdc3c7', alpha=0.5, label='Configurations conformes')
+                    ax.plot(front['total_pallets'], front['cost_per_pallet'], 'o-',
+                            color='#e74c3c', linewidth=2, label='Front de Pareto')
+                    ax.set_xlabel('Palettes stockées', fontweight='bold')
+                    ax.set_ylabel('Coût annuel par palette (€)', fontweight='bold')
+                    ax.grid(True, linestyle='-', linewidth=0.5, alpha=0.3)
+                    ax.legend()
+                    with timer('st.pyplot'):
+                        st.pyplot(fig)
+                
+                with col2:
+                    st.markdown("#### 🏆 Configurations non dominées")
+                    display = front.rename(columns={
+                        'rack_width': 'Larg. rack (m)', 'rack_depth': 'Prof. rack (m)',
+                        'main_aisle_width': 'Allée (m)', 'max_levels': 'Niveaux max',
+                        'equipment_type': 'Équipement', 'racks_per_row': 'Racks/rangée',
+                        'rows_per_side': 'Rangées/côté', 'levels': 'Niveaux',
+                        'total_racks': 'Racks', 'total_pallets': 'Palettes',
+                        'required_equipment': 'Équipements', 'total_investment': 'Invest. (k€)',
+                        'cost_per_pallet': '€/palette/an', 'storage_ratio': 'Ratio stockage (%)'
+                    })
+                    st.dataframe(display, use_container_width=True, hide_index=True)
+                    
+                    choice = st.selectbox(
+                        "**Configuration à appliquer**",
+                        front.index,
+                        format_func=lambda i: f"{front.at[i, 'total_pallets']:,} palettes — {front.at[i, 'cost_per_pallet']} €/palette"
+                    )
+                    
+                    if st.button("✅ Appliquer cette configuration", use_container_width=True):
+                        selected = front.loc[choice]
+                        st.session_state.warehouse_data['params'].update({
+                            'rack_width': float(selected['rack_width']),
+                            'rack_depth': float(selected['rack_depth']),
+                            'main_aisle_width': float(selected['main_aisle_width']),
+                            'max_levels': int(selected['max_levels']),
+                            'equipment_type': selected['equipment_type']
+                        })
+                        st.session_state.warehouse_data['calculations'] = {}
+                        st.success("Configuration appliquée : relancez les calculs à l'étape 4.")
+
+# ============================================================================
+# ÉTAPE 7 : TRAITEMENT PAR LOTS
+# ============================================================================
+@st.fragment
+@profiled_page
+def batch_page():
+    st.markdown('<div class="section-header">📦 ÉTAPE 7 : TRAITEMENT DE SCÉNARIOS PAR LOTS</div>', unsafe_allow_html=True)
+    
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        st.markdown("### 📂 Scénarios")
+        uploaded = st.file_uploader("**Fichier de configurations (une par ligne)**", type=['csv', 'parquet', 'jsonl'])
+        
+        c1, c2 = st.columns(2)
+        with c1:
+            output_label = st.radio("**Format des résultats**", ["Parquet", "Excel (XLSX)", "CSV"], horizontal=True)
+        with c2:
+            chunk_size = st.select_slider("**Configurations par tranche**", [10000, 20000, 50000, 100000],
+                                          value=bulk.CHUNK_SIZE)
+        compliant_only = st.checkbox("Ne garder que les configurations conformes")
+        persist = st.checkbox("Enregistrer aussi dans la base de scénarios",
+                              help=f"Fichier SQLite {st.session_state.scenario_store.path}")
+    
+    with col2:
+        st.markdown(f"""
+        <div class="parameter-card">
+            <h4 style="margin-top:0;">📋 Colonnes attendues</h4>
+            <p>Obligatoires : {', '.join(WarehouseCalculator.BATCH_REQUIRED)}.</p>
+            <p>Facultatives (valeur par défaut sinon) : equipment_type, {', '.join(c for c in WarehouseCalculator.BATCH_DEFAULTS if c not in WarehouseCalculator.BATCH_REQUIRED)}.</p>
+            <p>Le fichier est lu, calculé et écrit par tranches : seule une tranche est en mémoire à la fois.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    output_format, extension, mime = {
+        "Parquet": ('parquet', 'parquet', 'application/vnd.apache.parquet'),
+        "Excel (XLSX)": ('xlsx', 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+        "CSV": ('csv', 'csv', 'text/csv'),
+    }[output_label]
+    
+    if uploaded is not None and st.button("🚀 Lancer le traitement", type="primary", use_container_width=True):
+        input_format = bulk.detect_format(uploaded.name, bulk.INPUT_FORMATS)
+        total = bulk.count_rows(uploaded, input_format)
+        
+        # Résultats écrits sur disque au fil des tranches ; le fichier précédent est remplacé
+        previous = st.session_state.get('bulk_result')
+        if previous and os.path.exists(previous['path']):
+            os.remove(previous['path'])
+        handle, path = tempfile.mkstemp(suffix=f'.{extension}', prefix='scenarios_')
+        os.close(handle)
+        
+        st.session_state.pop('bulk_result', None)
+        store = st.session_state.scenario_store if persist else None
+        name = os.path.splitext(uploaded.name)[0]
+        
+        def process(job):
+            def report(rows):
+                job.report(min(rows / total, 1.0) if total else 0.0, f"{rows:,} configurations traitées")
+            try:
+                summary = bulk.process(uploaded, path, input_format, output_format, chunk_size=chunk_size,
+                                       compliant_only=compliant_only, progress=report, store=store, name=name)
+            except BaseException:
+                # Erreur de lecture ou annulation : pas de fichier partiel
+                os.remove(path)
+                raise
+            return {**summary, 'path': path, 'file_name': f"{name}_resultats.{extension}", 'mime': mime}
+        
+        JOBS.submit(st.session_state.job_owner, 'bulk', "Traitement par lots", process)
+    processed = job_result('bulk')
+    if processed is not None:
+        st.session_state.bulk_result = processed
+    
+    result = st.session_state.get('bulk_result')
+    if result and os.path.exists(result['path']):
+        col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
+        with col_stat1:
+            st.metric("Configurations calculées", f"{result['rows']:,}")
+        with col_stat2:
+            st.metric("Conformes", f"{result['compliant']:,}")
+        with col_stat3:
+            st.metric("Tranches", result['chunks'])
+        with col_stat4:
+            st.metric("Durée", f"{result['elapsed']:.2f} s")
+        
+        with open(result['path'], 'rb') as f:
+            st.download_button(
+                label=f"⬇️ Télécharger les résultats ({result['written']:,} lignes)",
+                data=f,
+                file_name=result['file_name'],
+                mime=result['mime'],
+                use_container_width=True
+            )
+    
+    # Recherche dans la base de scénarios
+    st.markdown("### 🗄️ Scénarios enregistrés")
+    store = st.session_state.scenario_store
+    f1, f2, f3, f4 = st.columns([2, 1, 1, 1])
+    with f1:
+        filter_metrics = st.multiselect("**Filtres**", list(STORED_METRICS))
+    filters = []
+    for metric in filter_metrics:
+        c1, c2 = st.columns([1, 3])
+        with c1:
+            operator = st.selectbox(f"**{metric}**", OPERATORS, key=f"store_op_{metric}")
+        with c2:
+            value = st.number_input(f"Valeur ({metric})", value=0.0, key=f"store_value_{metric}",
+                                    label_visibility="collapsed")
+        filters.append((metric, operator, value))
+    with f2:
+        order_by = st.selectbox("**Tri**", list(STORED_METRICS), index=list(STORED_METRICS).index('cost_per_pallet'))
+    with f3:
+        descending = st.checkbox("Décroissant")
+    with f4:
+        limit = st.number_input("**Lignes**", min_value=10, max_value=100000, value=500, step=100)
+    
+    found = store.query(filters, order_by, descending, limit)
+    st.caption(f"{len(store):,} scénarios enregistrés ; {len(found):,} affichés.")
+    st.dataframe(found, use_container_width=True, hide_index=True)
+    
+    if len(found):
+        l1, l2 = st.columns([3, 1])
+        with l1:
+            scenario_id = st.selectbox("**Scénario à reprendre**", found['id'].tolist(),
+                                       format_func=lambda i: f"n°{i} — {found.set_index('id').at[i, 'name']}")
+        with l2:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button("📥 Reprendre dans le projet", use_container_width=True):
+                st.session_state.warehouse_data['params'] = store.load(scenario_id)['params']
+                st.session_state.warehouse_data['calculations'] = {}
+                st.success(f"Paramètres du scénario n°{scenario_id} chargés : relancer les calculs à l'étape 4")
+
+# ============================================================================
+# ÉTAPE 8 : PORTEFEUILLE DE SITES
+# ============================================================================
+@st.fragment
+@profiled_page
+def portfolio_page():
+    st.markdown('<div class="section-header">🗂️ ÉTAPE 8 : PORTEFEUILLE DE SITES</div>', unsafe_allow_html=True)
+    
+    portfolio = st.session_state.portfolio
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        st.markdown("### ➕ Sites")
+        c1, c2 = st.columns([2, 1])
+        with c1:
+            site_name = st.text_input("**Nom du site**", project_name)
+        with c2:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button("➕ Ajouter le projet courant", use_container_width=True):
+                try:
+                    portfolio.add(site_name, st.session_state.warehouse_data['params'])
+                except ValueError as e:
+                    st.error(f"{e} (renseigner les étapes 1 à 3)")
+        
+        sites_file = st.file_uploader("**Importer des sites (colonne `name` puis une colonne par paramètre)**",
+                                      type=['csv', 'parquet', 'jsonl'], key="sites_file")
+        if sites_file is not None and st.button("📂 Importer les sites", use_container_width=True):
+            try:
+                portfolio.load(pd.concat(bulk.read_chunks(sites_file, bulk.detect_format(sites_file.name, bulk.INPUT_FORMATS)),
+                                         ignore_index=True))
+            except ValueError as e:
+                st.error(f"Import impossible : {e}")
+        
+        removed = st.multiselect("**Retirer des sites**", list(portfolio.sites))
+        if removed and st.button("🗑️ Retirer la sélection", use_container_width=True):
+            portfolio.remove(removed)
+            st.rerun()
+    
+    with col2:
+        st.markdown("""
+        <div class="parameter-card">
+            <h4 style="margin-top:0;">📋 Comparaison</h4>
+            <p>Les sites sont calculés ensemble avec le moteur vectorisé (modèle à allée centrale, comme le traitement par lots).</p>
+            <p>Seuls les sites ajoutés ou dont les paramètres ont changé sont recalculés.</p>
+            <p>Cliquer sur un en-tête de colonne pour trier.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    if len(portfolio):
+        run = portfolio.compute()
+        table = portfolio.comparison()
+        
+        col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
+        with col_stat1:
+            st.metric("Sites", f"{len(portfolio):,}")
+        with col_stat2:
+            st.metric("Recalculés", f"{run['computed']:,}", delta=f"{run['reused']:,} réutilisés", delta_color="off")
+        with col_stat3:
+            st.metric("Conformes", f"{int(table['Conforme'].sum()):,}")
+        with col_stat4:
+            st.metric("Meilleur coût / palette", f"{table['Coût / palette (€)'].min():.2f} €",
+                      delta=table['Coût / palette (€)'].idxmin(), delta_color="off")
+        
+        st.dataframe(table, use_container_width=True, height=min(600, 38 + 35 * len(table)))
+        st.download_button(
+            label="⬇️ Télécharger les sites (CSV)",
+            data=portfolio.to_frame().to_csv(index=False).encode('utf-8'),
+            file_name="portefeuille_sites.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+    else:
+        st.info("Ajoutez le projet courant ou importez un fichier de sites pour les comparer.")
+
+# ============================================================================
+# PAGE DE L'ÉTAPE COURANTE
+# ============================================================================
+# Chaque page est un fragment : un widget de la page ne réexécute qu'elle, sans le style,
+# l'en-tête ni la barre latérale, réexécutés seulement au changement d'étape
+STEP_PAGES = {
+    1: building_page,
+    2: storage_page,
+    3: circulation_page,
+    4: results_page,
+    5: visualization_page,
+    6: optimization_page,
+    7: batch_page,
+    8: portfolio_page
+}
+STEP_PAGES[st.session_state.warehouse_data['step']]()
+
 # ============================================================================
 # PIED DE PAGE
 # ============================================================================
@@ -0,0 +1,32 @@
+"""Graphe des allées du modèle d'implantation de la capacité affichée"""
+import numpy as np
+
+from warehouse import WarehouseCalculator
+from warehouse.benchmark import site_params
+from warehouse.distances import site_distances
+from warehouse.layout import LayoutGenerator
+from warehouse.slotting import SlottingEngine
+
+
+def test_aisles_model_flows_use_displayed_racks():
+    params = {**site_params(100, 60), 'special_conditions': ['Produits dangereux']}
+    capacity = LayoutGenerator(params).capacity()
+    distances = site_distances(params, capacity)
+    assert distances.locations == capacity['total_racks']
+    assert np.bincount(distances.location_zone).tolist() == [zone['racks'] for zone in capacity['zones']]
+    assert np.isfinite(distances.matrix).all()
+    
+    engine = SlottingEngine(params, capacity, distances)
+    assert engine.positions == capacity['total_positions']
+    for z, zone in enumerate(capacity['zones']):
+        in_zone = distances.location_zone[engine.position_location] == z
+        assert in_zone.sum() == zone['positions']
+        assert engine.position_level[in_zone].max(initial=0) < zone['levels']
+
+
+def test_central_model_keeps_grid():
+    params = site_params(100, 60)
+    capacity = WarehouseCalculator.calculate_storage_capacity(params)
+    distances = site_distances(params, capacity)
+    assert distances.locations == capacity['total_racks']
+    assert SlottingEngine(params, capacity, distances).positions == capacity['total_positions']
@@ -0,0 +1,31 @@
+"""Répartition des emplacements par type de palette"""
+from warehouse.benchmark import site_params
+from warehouse.layout import LayoutGenerator
+from warehouse.packing import PalletPacker
+
+
+MIX = [{'pallet_type': 'EUR (800×1200)', 'share': 50.0, 'height': 1.2},
+       {'pallet_type': 'US (1000×1200)', 'share': 50.0, 'height': 1.2}]
+
+
+def test_unfit_type_gets_no_positions():
+    params = {**site_params(100, 60), 'rack_width': 1.0, 'pallet_mix': MIX}
+    packer = PalletPacker(params)
+    assert packer.unfit() == ['US (1000×1200)']
+    
+    packed = packer.positions(100)
+    assert packed['by_type']['US (1000×1200)'] == 0
+    assert packed['by_type']['EUR (800×1200)'] == packed['positions']
+    
+    capacity = LayoutGenerator(params).capacity()
+    assert capacity['unfit_pallets'] == ['US (1000×1200)']
+    for zone in capacity['zones']:
+        assert zone['positions_by_type']['US (1000×1200)'] == 0
+        assert zone['positions_by_type']['EUR (800×1200)'] == zone['positions']
+
+
+def test_storable_mix_split_by_packed_positions():
+    params = {**site_params(100, 60), 'rack_width': 2.7, 'pallet_mix': MIX}
+    packed = PalletPacker(params).positions(100)
+    assert sum(packed['by_type'].values()) <= packed['positions']
+    assert all(count > 0 for count in packed['by_type'].values())
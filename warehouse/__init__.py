@@ -0,0 +1,7 @@
+"""Moteur de dimensionnement d'entrepôt, utilisable hors de l'interface Streamlit"""
+from .cache import CachedCalculator, CalculationCache
+from .calculator import WarehouseCalculator
+from .optimizer import LayoutOptimizer
+from .sweep import ParameterSweep
+
+__all__ = ['WarehouseCalculator', 'CachedCalculator', 'CalculationCache', 'LayoutOptimizer', 'ParameterSweep']
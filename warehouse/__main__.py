@@ -0,0 +1,6 @@
+"""Exécution en ligne de commande : python -m warehouse"""
+import sys
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,297 @@
+"""Banc de performance : calculs, rendu du plan et exports, comparés à des temps de référence
+
+    python -m warehouse.benchmark                      # mesure et rapport de régression
+    python -m warehouse.benchmark --save-baseline      # enregistre les temps de référence
+    python -m warehouse.benchmark --filter plan        # seulement les cas dont le nom contient « plan »
+
+Chaque cas est répété jusqu'à durer au moins MIN_ROUND secondes, puis ce tour est
+rejoué `repeat` fois, en passes successives sur tous les cas. Le rapport donne la
+médiane du temps par appel ; la comparaison à la référence porte sur le meilleur tour,
+le moins sensible aux autres processus. Une charge de calibrage fixe (boucle Python et
+calcul NumPy) est mesurée avec chaque série : avec --normalize, les temps de référence
+sont corrigés de l'écart de vitesse entre deux machines (approximatif : à réserver aux
+références enregistrées ailleurs).
+matplotlib n'est importé que par les cas de rendu.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import bulk
+from .calculator import WarehouseCalculator
+from .geometry import plan_layout
+from .layout import LayoutGenerator
+
+
+BASELINE_PATH = Path(__file__).with_name('benchmark_baseline.json')
+MIN_ROUND = 0.2               # Durée minimale d'un tour de mesure (s)
+REPEAT = 5                    # Tours par cas
+TOLERANCE = 0.25              # Ralentissement toléré avant de signaler une régression (25 %)
+NOISE_FLOOR = 2e-6            # Écart absolu ignoré (s) : bruit de mesure des cas les plus courts
+BATCH_ROWS = 10000            # Configurations du calcul par lots et de l'export CSV
+
+# Entrepôts mesurés : du petit dépôt à la plateforme logistique (longueur × largeur en m)
+SIZES = {
+    'small': (20.0, 20.0),
+    'medium': (100.0, 60.0),
+    'large': (200.0, 120.0),
+    'huge': (400.0, 300.0),
+}
+
+
+def site_params(length, width):
+    """Paramètres de l'application (valeurs par défaut des étapes 1 à 3) pour une emprise donnée"""
+    return {
+        'length': length,
+        'width': width,
+        'clear_height': 9.0,
+        'column_spacing': 9.0,
+        'floor_load': 3.0,
+        'dock_doors': 4,
+        'pallet_type': 'EUR (800×1200)',
+        'pallet_weight': 800.0,
+        'pallet_height': 1.2,
+        'rack_width': 1.0,
+        'rack_depth': 1.2,
+        'max_levels': 3,
+        'stock_rotation': 30.0,
+        'filling_rate': 85.0,
+        'equipment_type': 'forklift',
+        'main_aisle_width': 3.5,
+        'secondary_aisle_width': 2.0,
+    }
+
+
+def batch_configs(rows=BATCH_ROWS, seed=0):
+    """Configurations tirées entre le plus petit et le plus grand entrepôt de SIZES"""
+    rng = np.random.default_rng(seed)
+    sizes = np.array(list(SIZES.values()))
+    configs = pd.DataFrame([site_params(0.0, 0.0)] * rows)
+    configs['length'] = rng.uniform(sizes[:, 0].min(), sizes[:, 0].max(), rows).round(1)
+    configs['width'] = rng.uniform(sizes[:, 1].min(), sizes[:, 1].max(), rows).round(1)
+    configs['clear_height'] = rng.choice([6.0, 9.0, 12.0], rows)
+    configs['max_levels'] = rng.integers(2, 7, rows)
+    return configs
+
+
+def _scalar_cases(name, params):
+    """Calcul unitaire de l'étape 4 pour un entrepôt"""
+    calc = WarehouseCalculator
+    capacity = calc.calculate_storage_capacity(params)
+    circulation = calc.calculate_circulation(params, capacity)
+    return {
+        f'capacity/{name}': lambda: calc.calculate_storage_capacity(params),
+        f'circulation/{name}': lambda: calc.calculate_circulation(params, capacity),
+        f'costs/{name}': lambda: calc.calculate_costs(params, capacity, circulation),
+        f'norms/{name}': lambda: calc.check_norms_compliance(params, capacity),
+        f'layout/{name}': lambda: LayoutGenerator(params).capacity(),
+    }
+
+
+def _plan_cases(name, params):
+    """Image PNG du plan de l'étape 5 (sans cache : chaque appel redessine)"""
+    from .plan import render_plan
+    layout = plan_layout(params, WarehouseCalculator.calculate_storage_capacity(params))
+    return {f'plan_png/{name}[{layout["total_racks"]} racks]': lambda: render_plan(layout)}
+
+
+def _export_cases(configs):
+    """Exports CSV des résultats par lots (bulk.ResultWriter, comme l'étape 7) et du tableau de l'étape 5"""
+    results = bulk.evaluate(configs)
+    
+    def write_csv():
+        buffer = BytesIO()
+        with bulk.ResultWriter(buffer, 'csv') as writer:
+            writer.write(results)
+        return buffer
+    
+    return {
+        f'export_csv/batch[{len(results)}]': write_csv,
+        'export_csv/params[1]': lambda: results.head(1).to_csv(index=False).encode('utf-8'),
+    }
+
+
+def cases(plans=True):
+    """Cas mesurés {nom: fonction sans argument} ; `plans=False` écarte le rendu matplotlib"""
+    configs = batch_configs()
+    results = WarehouseCalculator.calculate_batch(configs)
+    all_cases = {}
+    for name, (length, width) in SIZES.items():
+        all_cases.update(_scalar_cases(name, site_params(length, width)))
+    all_cases[f'calculate_batch[{len(configs)}]'] = lambda: WarehouseCalculator.calculate_batch(configs)
+    all_cases[f'check_norms_batch[{len(configs)}]'] = lambda: WarehouseCalculator.check_norms_batch(configs, results)
+    if plans:
+        for name in ('small', 'medium', 'huge'):
+            all_cases.update(_plan_cases(name, site_params(*SIZES[name])))
+    all_cases.update(_export_cases(configs))
+    return all_cases
+
+
+def _timed(function, number):
+    """Temps par appel (s) de `number` appels consécutifs"""
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return (time.perf_counter() - start) / number
+
+
+def _calls(function, min_round):
+    """Appels par tour pour durer au moins `min_round` secondes, et le temps par appel du dernier essai"""
+    number = 1
+    while True:
+        elapsed = _timed(function, number) * number
+        if elapsed >= min_round:
+            return number, elapsed / number
+        number = max(number * 2, int(number * min_round / max(elapsed, 1e-9)) + 1)
+
+
+def calibration_load():
+    """Charge de calibrage : interpréteur Python et NumPy, comme les cas mesurés"""
+    total = 0.0
+    for i in range(20000):
+        total += i * 0.5
+    values = np.arange(200000, dtype=float)
+    return total + float(np.sqrt(values).sum())
+
+
+def run(pattern=None, repeat=REPEAT, min_round=MIN_ROUND, plans=True, progress=None):
+    """Mesure les cas dont le nom contient `pattern` ; `progress(nom)` est appelé avant chaque cas
+    
+    Les tours sont joués en passes successives sur tous les cas (calibrage compris) :
+    une perturbation passagère de la machine ne touche qu'un tour de chaque cas.
+    Retourne, par cas, le temps médian et le meilleur temps par appel, et le calibrage.
+    """
+    selected = {'calibration': calibration_load}
+    selected.update({name: function for name, function in cases(plans).items()
+                     if not pattern or pattern in name})
+    numbers, samples = {}, {}
+    for name, function in selected.items():
+        if progress is not None:
+            progress(name)
+        numbers[name], first = _calls(function, min_round)
+        samples[name] = [first]
+    for _ in range(repeat - 1):
+        for name, function in selected.items():
+            samples[name].append(_timed(function, numbers[name]))
+    
+    calibration = min(samples.pop('calibration'))
+    timings = {name: {'median': float(np.median(values)), 'min': float(min(values)),
+                      'calls': numbers[name] * repeat} for name, values in samples.items()}
+    return timings, calibration
+
+
+def machine():
+    """Description de la machine, enregistrée avec les temps de référence"""
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    """Temps de référence enregistrés ({} si le fichier n'existe pas)"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def save_baseline(timings, calibration, path=BASELINE_PATH, merge=True):
+    """Enregistre les meilleurs temps ; `merge` garde les cas de référence non remesurés"""
+    baseline = load_baseline(path) if merge else {}
+    best = dict(baseline.get('timings', {}))
+    best.update({name: t['min'] for name, t in timings.items()})
+    data = {'machine': machine(), 'saved': time.strftime('%Y-%m-%d %H:%M:%S'), 'calibration': calibration,
+            'timings': dict(sorted(best.items()))}
+    Path(path).write_text(json.dumps(data, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+    return data
+
+
+def compare(timings, baseline, calibration=None, tolerance=TOLERANCE, noise_floor=NOISE_FLOOR):
+    """Rapport de régression : un cas ralenti de plus de `tolerance` (et de plus de `noise_floor` s)
+    est en régression, accéléré d'autant il est amélioré
+    
+    Avec les deux calibrages, les temps de référence sont d'abord corrigés de l'écart de
+    vitesse entre la machine de référence et la machine courante.
+    """
+    scale = calibration / baseline['calibration'] if calibration and baseline.get('calibration') else 1.0
+    reference = {name: t * scale for name, t in baseline.get('timings', {}).items()}
+    rows = []
+    for name, t in timings.items():
+        current, before = t['min'], reference.get(name)
+        if before is None:
+            status, ratio = 'nouveau', np.nan
+        else:
+            ratio = current / before if before > 0 else np.inf
+            if ratio > 1 + tolerance and current - before > noise_floor:
+                status = 'régression'
+            elif ratio < 1 / (1 + tolerance) and before - current > noise_floor:
+                status = 'amélioration'
+            else:
+                status = 'stable'
+        rows.append({'case': name, 'baseline_ms': None if before is None else before * 1000,
+                     'best_ms': current * 1000, 'median_ms': t['median'] * 1000, 'ratio': ratio, 'status': status})
+    return pd.DataFrame(rows, columns=['case', 'baseline_ms', 'best_ms', 'median_ms', 'ratio', 'status'])
+
+
+def build_parser():
+    """Arguments de la ligne de commande"""
+    parser = argparse.ArgumentParser(
+        prog='python -m warehouse.benchmark',
+        description="Banc de performance du calcul, du rendu du plan et des exports, avec rapport de régression.",
+    )
+    parser.add_argument('--filter', metavar='TEXTE', help="ne mesurer que les cas dont le nom contient ce texte")
+    parser.add_argument('--repeat', type=int, default=REPEAT, help="tours de mesure par cas (médiane)")
+    parser.add_argument('--min-round', type=float, default=MIN_ROUND, help="durée minimale d'un tour (s)")
+    parser.add_argument('--no-plan', action='store_true', help="sans les cas de rendu matplotlib")
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help="fichier des temps de référence (JSON)")
+    parser.add_argument('--save-baseline', action='store_true', help="enregistrer les temps mesurés comme référence")
+    parser.add_argument('--normalize', action='store_true',
+                        help="corriger la référence de l'écart de vitesse mesuré par le calibrage")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE, help="ralentissement toléré (0.25 = 25 %%)")
+    parser.add_argument('--report', metavar='FICHIER', help="écrire aussi le rapport en CSV")
+    return parser
+
+
+def main(argv=None):
+    """Point d'entrée : 1 si un cas est en régression, 0 sinon"""
+    args = build_parser().parse_args(argv)
+    baseline = load_baseline(args.baseline)
+    timings, calibration = run(args.filter, args.repeat, args.min_round, plans=not args.no_plan,
+                               progress=lambda name: print(f"… {name}", file=sys.stderr))
+    report = compare(timings, baseline, calibration if args.normalize else None, args.tolerance)
+    
+    with pd.option_context('display.max_rows', None, 'display.width', 120, 'display.float_format', '{:.3f}'.format):
+        print(report.to_string(index=False))
+    if args.report:
+        report.to_csv(args.report, index=False)
+    if args.save_baseline:
+        save_baseline(timings, calibration, args.baseline)
+        print(f"Temps de référence enregistrés dans {args.baseline}", file=sys.stderr)
+        return 0
+    if baseline.get('calibration'):
+        print(f"Vitesse relative à la référence : {baseline['calibration'] / calibration:.2f}", file=sys.stderr)
+    if not baseline:
+        print(f"Aucune référence dans {args.baseline} : relancer avec --save-baseline", file=sys.stderr)
+        return 0
+    regressions = report[report['status'] == 'régression']
+    if len(regressions):
+        print(f"{len(regressions)} régression(s) au-delà de {args.tolerance:.0%} : "
+              f"{', '.join(regressions['case'])}", file=sys.stderr)
+        return 1
+    print("Aucune régression", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Traitement de scénarios en masse : lecture, calcul et écriture par tranches
+
+Les configurations sont lues par tranches de taille fixe, calculées avec le moteur
+vectorisé puis écrites aussitôt : ni l'entrée ni la sortie complètes ne sont
+gardées en mémoire. pyarrow (Parquet) et openpyxl (XLSX) ne sont importés qu'à
+l'usage.
+"""
+import io
+import json
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from .calculator import WarehouseCalculator
+
+
+CHUNK_SIZE = 50000            # Configurations par tranche
+INPUT_FORMATS = ('csv', 'json', 'jsonl', 'parquet')
+OUTPUT_FORMATS = ('csv', 'json', 'jsonl', 'parquet', 'xlsx')
+XLSX_MAX_ROWS = 1048576       # Lignes par feuille Excel, en-tête compris
+
+
+def detect_format(name, formats, forced=None):
+    """Format d'un fichier, déduit de son extension sauf s'il est imposé"""
+    if forced:
+        return forced
+    suffix = Path(name).suffix.lower().lstrip('.')
+    if suffix not in formats:
+        raise ValueError(f"Format non reconnu pour {name} (extensions acceptées : {', '.join(formats)})")
+    return suffix
+
+
+def evaluate(configs):
+    """Capacité, circulation, coûts et conformité de chaque configuration, à la suite de ses paramètres"""
+    results = WarehouseCalculator.calculate_batch(configs)
+    checks = WarehouseCalculator.check_norms_batch(configs, results)
+    inputs = configs.drop(columns=[*results.columns, *checks.columns], errors='ignore')
+    return pd.concat([inputs, results, checks], axis=1)
+
+
+def count_rows(source, fmt):
+    """Nombre de configurations d'un fichier, sans le charger (approché pour CSV, None si inconnu)"""
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        rows = pq.ParquetFile(source).metadata.num_rows
+    elif fmt in ('csv', 'jsonl'):
+        handle = open(source, 'rb') if isinstance(source, (str, Path)) else source
+        try:
+            lines = 0
+            last = b'\n'
+            for block in iter(lambda: handle.read(1 << 20), b''):
+                lines += block.count(b'\n')
+                last = block[-1:]
+            rows = lines + (last != b'\n') - (fmt == 'csv')
+        finally:
+            if handle is source:
+                handle.seek(0)
+            else:
+                handle.close()
+    else:
+        return None
+    return max(rows, 0)
+
+
+def read_chunks(source, fmt, chunk_size=None):
+    """Itère sur les configurations d'un fichier par tranches de `chunk_size` lignes"""
+    chunk_size = chunk_size or CHUNK_SIZE
+    if fmt == 'csv':
+        yield from pd.read_csv(source, chunksize=chunk_size)
+    elif fmt == 'jsonl':
+        yield from pd.read_json(source, lines=True, chunksize=chunk_size)
+    elif fmt == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif fmt == 'json':
+        # Un document JSON ne se lit pas par morceaux : seul le calcul est découpé
+        configs = _read_json(source)
+        for start in range(0, len(configs), chunk_size):
+            yield configs.iloc[start:start + chunk_size]
+    else:
+        raise ValueError(f"Format d'entrée non pris en charge : {fmt}")
+
+
+def _read_json(source):
+    """Configuration seule (objet JSON) ou liste de configurations"""
+    if isinstance(source, (str, Path)):
+        with open(source, encoding='utf-8') as f:
+            data = json.load(f)
+    else:
+        data = json.load(source)
+    return pd.DataFrame([data] if isinstance(data, dict) else data)
+
+
+class ResultWriter:
+    """Écriture incrémentale de tranches de résultats (CSV, JSON, JSON Lines, Parquet ou XLSX)
+    
+    `target` est un chemin ou un fichier déjà ouvert (binaire, ou texte pour CSV / JSON).
+    """
+    
+    def __init__(self, target, fmt):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Format de sortie non pris en charge : {fmt}")
+        self.fmt = fmt
+        self.rows = 0
+        self._owned = isinstance(target, (str, Path))
+        self._target = target
+        self._handle = None
+        self._writer = None
+        self._schema = None
+        self._sheet = None
+        self._sheet_rows = 0
+        self._columns = None
+        
+        if fmt in ('csv', 'json', 'jsonl'):
+            self._handle = open(target, 'w', encoding='utf-8', newline='') if self._owned else target
+            self._text = isinstance(self._handle, io.TextIOBase)
+        elif fmt == 'xlsx':
+            from openpyxl import Workbook
+            self._writer = Workbook(write_only=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _write_text(self, text):
+        self._handle.write(text if self._text else text.encode('utf-8'))
+    
+    def _new_sheet(self):
+        """Feuille suivante du classeur (une feuille Excel est limitée à XLSX_MAX_ROWS lignes)"""
+        count = len(self._writer.worksheets)
+        self._sheet = self._writer.create_sheet('Résultats' if not count else f'Résultats ({count + 1})')
+        self._sheet.append(self._columns)
+        self._sheet_rows = 1
+    
+    def write(self, frame):
+        """Ajoute une tranche de résultats au fichier"""
+        first = self._columns is None
+        if first:
+            self._columns = [str(c) for c in frame.columns]
+        
+        if self.fmt == 'csv':
+            self._write_text(frame.to_csv(index=False, header=first))
+        elif self.fmt == 'jsonl':
+            if len(frame):
+                self._write_text(frame.to_json(orient='records', lines=True, force_ascii=False).rstrip('\n') + '\n')
+        elif self.fmt == 'json':
+            records = frame.to_json(orient='records', force_ascii=False)[1:-1]
+            if records:
+                self._write_text(('[' if not self.rows else ',\n') + records)
+        elif self.fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(self._target, self._schema)
+            self._writer.write_table(table)
+        else:
+            values = frame.astype(object).where(frame.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                if self._sheet is None or self._sheet_rows >= XLSX_MAX_ROWS:
+                    self._new_sheet()
+                self._sheet.append(row)
+                self._sheet_rows += 1
+        
+        self.rows += len(frame)
+    
+    def close(self):
+        """Termine le fichier (pied JSON, métadonnées Parquet, enregistrement du classeur)"""
+        if self.fmt == 'json':
+            self._write_text('[]' if not self.rows else ']')
+        elif self.fmt == 'parquet' and self._writer is not None:
+            self._writer.close()
+        elif self.fmt == 'xlsx':
+            if self._sheet is None:
+                self._columns = self._columns or []
+                self._new_sheet()
+            self._writer.save(self._target)
+        
+        if self._handle is not None:
+            self._handle.flush()
+            if self._owned:
+                self._handle.close()
+
+
+def process(source, target, input_format, output_format, chunk_size=None, compliant_only=False, progress=None,
+            store=None, name=None):
+    """Lit, calcule et écrit les configurations tranche par tranche
+    
+    `progress(rows)` est appelé après chaque tranche avec le nombre de lignes traitées.
+    `store` (ScenarioStore) enregistre en plus chaque tranche calculée sous le nom `name`.
+    Retourne un résumé : lignes lues et écrites, configurations conformes, tranches, durée.
+    """
+    start = time.perf_counter()
+    rows = compliant = chunks = 0
+    with ResultWriter(target, output_format) as writer:
+        for configs in read_chunks(source, input_format, chunk_size):
+            results = evaluate(configs)
+            rows += len(results)
+            compliant += int(results['compliant'].sum())
+            writer.write(results[results['compliant']] if compliant_only else results)
+            if store is not None:
+                kept = results['compliant'] if compliant_only else slice(None)
+                store.save_batch(configs[kept], results[kept], name)
+            chunks += 1
+            if progress is not None:
+                progress(rows)
+    
+    return {
+        'rows': rows,
+        'written': writer.rows,
+        'compliant': compliant,
+        'chunks': chunks,
+        'elapsed': round(time.perf_counter() - start, 3),
+    }
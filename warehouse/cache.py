@@ -0,0 +1,245 @@
+"""Cache des calculs unitaires, indexé sur une empreinte canonique des paramètres"""
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .calculator import WarehouseCalculator
+from .layout import LAYOUT_INPUTS, LayoutGenerator
+
+
+# Valeur canonique d'un paramètre absent (le calcul appliquera sa valeur par défaut)
+_MISSING = '<absent>'
+
+# Caches partagés par toutes les sessions du processus (voir shared_cache)
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def canonical_value(value, precision=6):
+    """Forme canonique d'une valeur : flottants arrondis, types NumPy convertis, listes et dictionnaires figés"""
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        value = round(float(value), precision)
+        return 0.0 if value == 0 else value
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [canonical_value(v, precision) for v in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else tuple(items)
+    if isinstance(value, dict):
+        return tuple((k, canonical_value(v, precision)) for k, v in sorted(value.items()))
+    return value
+
+
+def _copy(value):
+    """Copie des dictionnaires, listes et tableaux (à toute profondeur) pour que l'appelant
+    ne modifie pas l'entrée en cache ; les autres valeurs (octets, figures) sont partagées"""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.copy()
+    return value
+
+
+def _sizeof(value):
+    """Taille approchée d'une valeur en mémoire (octets), contenu compris"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return sys.getsizeof(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes + 112
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    if hasattr(value, 'memory_usage'):             # Tableaux pandas
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, 'to_plotly_json'):           # Figures Plotly
+        return _sizeof(value.to_plotly_json())
+    return sys.getsizeof(value)
+
+
+def params_key(name, params, fields, extra=None, precision=6):
+    """Empreinte d'un calcul : nom, paramètres effectivement lus et valeurs amont utilisées"""
+    items = [(field, canonical_value(params[field], precision) if field in params else _MISSING)
+             for field in fields]
+    if extra:
+        items += [(k, canonical_value(v, precision)) for k, v in sorted(extra.items())]
+    return hashlib.blake2b(repr((name, items)).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CalculationCache:
+    """Cache LRU borné (résultats de calcul ou images) avec compteurs de succès / échecs
+    
+    Bornes facultatives : `ttl` (durée de vie d'une entrée, en secondes) et `max_bytes`
+    (taille totale approchée des entrées). Les valeurs sont copiées à l'entrée et à la
+    sortie : un appelant qui modifie son résultat ne modifie ni le cache ni le résultat
+    des autres. Si plusieurs fils demandent la même entrée absente, un seul la calcule,
+    les autres attendent son résultat.
+    """
+    
+    def __init__(self, maxsize=1024, precision=6, ttl=None, max_bytes=None):
+        self.maxsize = maxsize
+        self.precision = precision
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()     # clé -> (valeur, expiration, taille)
+        self._pending = {}                # clé -> threading.Event du calcul en cours
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.waits = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def key(self, name, params, fields, extra=None):
+        return params_key(name, params, fields, extra, self.precision)
+    
+    def _drop(self, key):
+        self.bytes -= self._entries.pop(key)[2]
+    
+    def get_or_compute(self, key, compute):
+        """Retourne le résultat en cache ou le calcule ; les résultats vides (erreurs) ne sont pas conservés"""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if entry[1] is None or entry[1] > time.monotonic():
+                        self._entries.move_to_end(key)
+                        self.hits += 1
+                        return _copy(entry[0])
+                    self._drop(key)
+                    self.expirations += 1
+                pending = self._pending.get(key)
+                if pending is None:
+                    self.misses += 1
+                    self._pending[key] = threading.Event()
+                    break
+                self.waits += 1
+            # Même entrée en cours de calcul dans un autre fil : attendre, puis relire
+            pending.wait()
+        
+        try:
+            result = compute()
+            if result:
+                self._store(key, result)
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+        return result
+    
+    def _store(self, key, result):
+        size = _sizeof(result)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        value = _copy(result)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, expires, size)
+            self.bytes += size
+            while len(self._entries) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def purge(self):
+        """Retire les entrées expirées ; retourne leur nombre"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, (_, expires, _) in self._entries.items() if expires is not None and expires <= now]
+            for k in expired:
+                self._drop(k)
+            self.expirations += len(expired)
+        return len(expired)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = self.expirations = self.waits = 0
+    
+    def stats(self):
+        """Compteurs d'utilisation du cache"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'waits': self.waits,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(100.0 * self.hits / total, 1) if total else 0.0,
+        }
+
+
+def shared_cache(name, **options):
+    """Cache `name` partagé par toutes les sessions du processus, créé au premier appel
+    avec `options` (arguments de CalculationCache)"""
+    with _SHARED_LOCK:
+        if name not in _SHARED:
+            _SHARED[name] = CalculationCache(**options)
+        return _SHARED[name]
+
+
+def shared_stats():
+    """Compteurs de chaque cache partagé, entrées expirées retirées"""
+    with _SHARED_LOCK:
+        caches = dict(_SHARED)
+    for cache in caches.values():
+        cache.purge()
+    return {name: cache.stats() for name, cache in caches.items()}
+
+
+class CachedCalculator:
+    """Même interface que WarehouseCalculator, avec mémoïsation de chaque étape
+    
+    Chaque calcul n'est indexé que sur les paramètres qu'il lit et sur les valeurs
+    amont dont il dépend : changer l'éclairage ne recalcule rien, changer l'équipement
+    ne recalcule pas la capacité.
+    """
+    
+    NORMS = WarehouseCalculator.NORMS
+    
+    def __init__(self, cache=None):
+        self.cache = cache if cache is not None else CalculationCache()
+    
+    def calculate_storage_capacity(self, params):
+        key = self.cache.key('capacity', params, WarehouseCalculator.CAPACITY_INPUTS)
+        return self.cache.get_or_compute(key, lambda: WarehouseCalculator.calculate_storage_capacity(params))
+    
+    def generate_layout(self, params):
+        """Capacité de l'implantation multi-allées et multi-zones (LayoutGenerator)"""
+        key = self.cache.key('layout', params, LAYOUT_INPUTS)
+        return self.cache.get_or_compute(key, lambda: LayoutGenerator(params).capacity())
+    
+    def calculate_circulation(self, params, capacity, distances=None):
+        key = self.cache.key('circulation', params, WarehouseCalculator.CIRCULATION_INPUTS, {
+            'total_pallets': capacity.get('total_pallets', 0),
+            'distances': distances.key if distances is not None else None,
+        })
+        return self.cache.get_or_compute(key, lambda: WarehouseCalculator.calculate_circulation(params, capacity, distances))
+    
+    def calculate_costs(self, params, capacity, circulation):
+        key = self.cache.key('costs', params, WarehouseCalculator.COSTS_INPUTS, {
+            'total_positions': capacity.get('total_positions', 0),
+            'total_pallets': capacity.get('total_pallets', 0),
+            'required_equipment': circulation.get('required_equipment', 1),
+        })
+        return self.cache.get_or_compute(key, lambda: WarehouseCalculator.calculate_costs(params, capacity, circulation))
+    
+    @staticmethod
+    def check_norms_compliance(params, capacity):
+        return WarehouseCalculator.check_norms_compliance(params, capacity)
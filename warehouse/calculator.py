@@ -0,0 +1,430 @@
+"""Moteur de calcul du dimensionnement d'entrepôt (calcul unitaire et par lots)"""
+import logging
+import math
+
+import numpy as np
+import pandas as pd
+
+from .profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+
+class WarehouseCalculator:
+    """Classe principale de calcul pour le dimensionnement d'entrepôt"""
+    
+    # Normes de référence
+    NORMS = {
+        'min_aisle_width_forklift': 3.5,  # Largeur minimale allée pour chariot élévateur (m)
+        'min_aisle_width_pallet': 2.5,    # Largeur minimale pour transpalette (m)
+        'clearance_height': 0.5,          # Dégagement minimum sous poutre (m)
+        'fire_aisle_width': 1.2,          # Largeur allée d'évacuation (m)
+        'max_rack_height': 15.0,         # Hauteur maximale recommandée (m)
+        'min_turning_radius': 2.0,        # Rayon de braquage minimum (m)
+        'load_per_m2': 1500.0,            # Charge au sol maximale (kg/m²)
+        'lighting_level': 300.0,          # Niveau d'éclairage minimum (lux)
+        'min_door_width': 2.4,            # Largeur minimale porte (m)
+        'safety_margin': 0.3,             # Marge de sécurité autour racks (%)
+    }
+    
+    # Coûts unitaires de référence
+    COSTS = {
+        'rack_per_position': 180.0,       # Coût des racks (€/emplacement)
+        'area_per_m2': 250.0,             # Coût de la surface (€/m²)
+        'default_equipment': 30000.0,     # Équipement non référencé (€)
+        'installation_rate': 0.15,        # Installation (part de l'investissement)
+        'maintenance_rate': 0.03,         # Maintenance annuelle (part de l'investissement)
+        'operators_per_equipment': 2.0,   # Opérateurs par équipement
+        'operator_salary': 35000.0,       # Coût annuel d'un opérateur (€)
+        'energy_per_m2': 15.0,            # Énergie (€/m²/an)
+    }
+    
+    # Coût unitaire des équipements de manutention (€)
+    EQUIPMENT_COSTS = {
+        'forklift': 45000.0,
+        'reach_truck': 55000.0,
+        'pallet_truck': 8000.0,
+        'automated': 120000.0
+    }
+    
+    # Paramètres lus par chaque calcul (clés du cache de calcul)
+    CAPACITY_INPUTS = ('length', 'width', 'main_aisle_width', 'rack_width', 'rack_depth', 'max_levels',
+                       'clear_height', 'pallet_height', 'filling_rate', 'pallet_volume')
+    CIRCULATION_INPUTS = ('length', 'width', 'equipment_speed', 'equipment_type', 'operating_hours',
+                          'stock_rotation')
+    COSTS_INPUTS = ('length', 'width', 'equipment_type')
+    
+    # Affichage des erreurs de calcul unitaire (st.error dans l'interface, journal seul sinon)
+    error_handler = None
+    
+    @staticmethod
+    def _report_error(message):
+        """Journalise une erreur de calcul et la transmet à l'affichage éventuel"""
+        logger.error(message)
+        if WarehouseCalculator.error_handler is not None:
+            WarehouseCalculator.error_handler(message)
+    
+    @staticmethod
+    @profiled('calculate_storage_capacity')
+    def calculate_storage_capacity(params):
+        """Calcule la capacité de stockage selon les normes ISO"""
+        try:
+            # Nombre de racks possibles
+            usable_length = params['length'] - params['main_aisle_width'] - 4.0  # 2m de chaque côté
+            racks_per_row = max(1, int(usable_length / (params['rack_depth'] + 1.0)))
+            
+            usable_width = params['width'] - 2.0  # 1m de chaque côté
+            rows_per_side = max(1, int(usable_width / (params['rack_width'] + 1.0)))
+            
+            total_racks = racks_per_row * rows_per_side * 2  # Deux côtés
+            
+            # Capacité par rack
+            levels = min(params.get('max_levels', 3), 
+                        int(params['clear_height'] / (params['pallet_height'] + 0.3)))
+            positions_per_level = 2  # Avant/arrière
+            
+            total_positions = total_racks * levels * positions_per_level
+            total_pallets = int(total_positions * params.get('filling_rate', 85) / 100.0)
+            
+            # Surface utile
+            storage_area = total_racks * params['rack_width'] * params['rack_depth']
+            total_area = params['length'] * params['width']
+            storage_ratio = (storage_area / total_area) * 100.0 if total_area > 0 else 0.0
+            
+            return {
+                'total_racks': total_racks,
+                'racks_per_row': racks_per_row,
+                'rows_per_side': rows_per_side,
+                'levels': levels,
+                'total_positions': total_positions,
+                'total_pallets': total_pallets,
+                'storage_area': round(storage_area, 1),
+                'total_area': total_area,
+                'storage_ratio': round(storage_ratio, 1),
+                'volume_capacity': round(total_pallets * params.get('pallet_volume', 1.0), 1)
+            }
+        except Exception as e:
+            WarehouseCalculator._report_error(f"Erreur dans le calcul de capacité: {e}")
+            return {}
+    
+    @staticmethod
+    @profiled('calculate_circulation')
+    def calculate_circulation(params, capacity, distances=None):
+        """Calcule les paramètres de circulation
+        
+        `distances` (DistanceTable) fournit la distance moyenne quai → emplacement par
+        le graphe des allées ; sans table, la distance est estimée sur les dimensions.
+        """
+        try:
+            # Distance moyenne de parcours
+            if distances is not None:
+                avg_distance = distances.mean_distance
+            else:
+                avg_distance = (params['length'] + params['width']) / 2.0
+            
+            # Temps de cycle
+            travel_speed = params.get('equipment_speed', 10.0) * 1000.0 / 3600.0  # m/s
+            travel_time = avg_distance / travel_speed if travel_speed > 0 else 0
+            handling_time = 120.0 if params.get('equipment_type') == 'forklift' else 90.0  # secondes
+            
+            cycle_time = travel_time * 2.0 + handling_time / 60.0  # minutes
+            
+            # Débit
+            pallets_per_hour = 60.0 / cycle_time if cycle_time > 0 else 0
+            daily_capacity = pallets_per_hour * params.get('operating_hours', 16.0)
+            
+            # Nombre d'équipements nécessaires
+            daily_throughput = capacity.get('total_pallets', 0) / params.get('stock_rotation', 30.0)
+            required_equipment = max(1, math.ceil(daily_throughput / daily_capacity)) if daily_capacity > 0 else 1
+            
+            return {
+                'avg_distance': round(avg_distance, 1),
+                'cycle_time': round(cycle_time, 1),
+                'pallets_per_hour': round(pallets_per_hour, 1),
+                'daily_capacity': int(daily_capacity),
+                'daily_throughput': int(daily_throughput),
+                'required_equipment': required_equipment
+            }
+        except Exception as e:
+            WarehouseCalculator._report_error(f"Erreur dans le calcul de circulation: {e}")
+            return {}
+    
+    @staticmethod
+    @profiled('calculate_costs')
+    def calculate_costs(params, capacity, circulation):
+        """Calcule les coûts d'investissement et d'exploitation"""
+        try:
+            rates = WarehouseCalculator.COSTS
+            
+            # Coût des racks (€/emplacement)
+            rack_cost = capacity.get('total_positions', 0) * rates['rack_per_position']
+            
+            # Coût de la surface (€/m²)
+            area_cost = params['length'] * params['width'] * rates['area_per_m2']
+            
+            # Coût des équipements
+            equipment_cost = WarehouseCalculator.EQUIPMENT_COSTS.get(params.get('equipment_type', 'forklift'), rates['default_equipment']) * circulation.get('required_equipment', 1)
+            
+            # Coût installation
+            installation_cost = (rack_cost + area_cost + equipment_cost) * rates['installation_rate']
+            
+            # Coût total
+            total_investment = rack_cost + area_cost + equipment_cost + installation_cost
+            
+            # Coûts annuels
+            annual_maintenance = total_investment * rates['maintenance_rate']
+            annual_personnel = circulation.get('required_equipment', 1) * rates['operators_per_equipment'] * rates['operator_salary']
+            annual_energy = params['length'] * params['width'] * rates['energy_per_m2']
+            
+            total_annual_cost = annual_maintenance + annual_personnel + annual_energy
+            
+            cost_per_pallet = total_annual_cost / capacity.get('total_pallets', 1) if capacity.get('total_pallets', 0) > 0 else 0
+            
+            return {
+                'rack_cost': round(rack_cost / 1000.0, 1),
+                'area_cost': round(area_cost / 1000.0, 1),
+                'equipment_cost': round(equipment_cost / 1000.0, 1),
+                'installation_cost': round(installation_cost / 1000.0, 1),
+                'total_investment': round(total_investment / 1000.0, 1),
+                'annual_maintenance': round(annual_maintenance / 1000.0, 1),
+                'annual_personnel': round(annual_personnel / 1000.0, 1),
+                'annual_energy': round(annual_energy / 1000.0, 1),
+                'total_annual_cost': round(total_annual_cost / 1000.0, 1),
+                'cost_per_pallet': round(cost_per_pallet, 2)
+            }
+        except Exception as e:
+            WarehouseCalculator._report_error(f"Erreur dans le calcul des coûts: {e}")
+            return {}
+    
+    @staticmethod
+    @profiled('check_norms_compliance')
+    def check_norms_compliance(params, capacity):
+        """Vérifie la conformité aux normes et retourne les alertes"""
+        warnings = []
+        optimizations = []
+        
+        try:
+            # Vérification hauteur
+            if params['clear_height'] - params.get('max_rack_height', 6.0) < WarehouseCalculator.NORMS['clearance_height']:
+                warnings.append(f"⚠️ **Hauteur insuffisante** : Dégagement sous poutre inférieur à {WarehouseCalculator.NORMS['clearance_height']}m")
+            
+            # Vérification largeur allée
+            min_aisle = WarehouseCalculator.NORMS['min_aisle_width_forklift'] if params.get('equipment_type') == 'forklift' else WarehouseCalculator.NORMS['min_aisle_width_pallet']
+            if params.get('main_aisle_width', 3.5) < min_aisle:
+                warnings.append(f"⚠️ **Allée trop étroite** : {params.get('main_aisle_width', 3.5)}m < {min_aisle}m minimum pour {params.get('equipment_type', 'forklift')}")
+            
+            # Implantation multi-allées : allées secondaires et poteaux
+            if 'zones' in capacity:
+                if params.get('secondary_aisle_width', 2.0) < min_aisle:
+                    warnings.append(f"⚠️ **Allées secondaires trop étroites** : {params.get('secondary_aisle_width', 2.0)}m < {min_aisle}m minimum pour {params.get('equipment_type', 'forklift')}")
+                if capacity.get('posts_in_aisles', 0) > 0:
+                    warnings.append(f"⚠️ **Poteaux dans les allées** : {capacity['posts_in_aisles']} poteaux gênent la circulation (ajuster l'espacement des poteaux ou la profondeur des racks)")
+                if capacity.get('unfit_pallets'):
+                    warnings.append(f"⚠️ **Palettes hors gabarit** : {', '.join(capacity['unfit_pallets'])} ne tiennent pas dans une alvéole de {params['rack_width']}m × {params['rack_depth']}m (élargir les lisses ou réduire la hauteur)")
+            
+            # Vérification charge au sol
+            estimated_load = (capacity.get('total_pallets', 0) * params.get('pallet_weight', 800.0)) / params.get('total_area', capacity.get('total_area', 1.0))
+            if estimated_load > WarehouseCalculator.NORMS['load_per_m2']:
+                warnings.append(f"⚠️ **Charge au sol excessive** : {estimated_load:.0f} kg/m² > {WarehouseCalculator.NORMS['load_per_m2']} kg/m² maximum")
+            
+            # Optimisations
+            storage_ratio = capacity.get('storage_ratio', 0.0)
+            if storage_ratio > 70.0:
+                optimizations.append("✅ **Excellent ratio de stockage** (>70%)")
+            else:
+                optimizations.append("💡 **Optimisation possible** : Augmenter le nombre de niveaux pour améliorer le ratio de stockage")
+            
+            if params.get('stock_rotation', 30.0) < 15.0:
+                optimizations.append("🚀 **Rotation rapide** : Considérer une zone de préparation de commandes dédiée")
+        
+        except Exception as e:
+            warnings.append(f"Erreur dans la vérification des normes: {e}")
+        
+        return warnings, optimizations
+    
+    # ========================================================================
+    # CALCUL PAR LOTS (VECTORISÉ)
+    # ========================================================================
+    
+    # Colonnes indispensables au calcul par lots
+    BATCH_REQUIRED = ('length', 'width', 'clear_height', 'pallet_height',
+                      'rack_width', 'rack_depth', 'main_aisle_width')
+    
+    # Valeurs par défaut des colonnes optionnelles (identiques aux params.get() unitaires)
+    BATCH_DEFAULTS = {
+        'max_levels': 3,
+        'filling_rate': 85.0,
+        'pallet_volume': 1.0,
+        'equipment_speed': 10.0,
+        'operating_hours': 16.0,
+        'stock_rotation': 30.0,
+        'max_rack_height': 6.0,
+        'pallet_weight': 800.0,
+        'main_aisle_width': 3.5,
+    }
+    
+    @staticmethod
+    def _batch_column(configs, name):
+        """Extrait une colonne numérique en tableau NumPy, valeurs manquantes remplacées par le défaut"""
+        default = WarehouseCalculator.BATCH_DEFAULTS.get(name, np.nan)
+        if name not in configs:
+            return np.full(len(configs), default, dtype=float)
+        values = configs[name].to_numpy(dtype=float)
+        return np.where(np.isnan(values), default, values)
+    
+    @staticmethod
+    def _round(values, ndigits):
+        """Arrondi vectorisé donnant exactement le même résultat que round() de Python"""
+        rounded = np.round(values, ndigits)
+        # np.round diffère de round() sur les quasi demi-valeurs : on les reprend une à une
+        scaled = values * 10.0 ** ndigits
+        ties = np.isfinite(scaled) & (np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+        if ties.any():
+            rounded[ties] = [round(float(v), ndigits) for v in values[ties]]
+        return rounded
+    
+    @staticmethod
+    def calculate_batch(configs):
+        """Calcule capacité, circulation et coûts pour un lot de configurations
+        
+        `configs` est un DataFrame (une ligne par configuration) avec les mêmes colonnes
+        que `params`. Le résultat a le même index et reprend les clés des calculs unitaires.
+        """
+        if not isinstance(configs, pd.DataFrame):
+            configs = pd.DataFrame(configs)
+        
+        missing = [c for c in WarehouseCalculator.BATCH_REQUIRED if c not in configs]
+        if missing:
+            raise ValueError(f"Colonnes manquantes pour le calcul par lots : {', '.join(missing)}")
+        
+        def col(name):
+            return WarehouseCalculator._batch_column(configs, name)
+        
+        rnd = WarehouseCalculator._round
+        length, width = col('length'), col('width')
+        rack_width, rack_depth = col('rack_width'), col('rack_depth')
+        
+        if 'equipment_type' in configs:
+            equipment = configs['equipment_type'].astype(object)
+        else:
+            equipment = pd.Series(None, index=configs.index, dtype=object)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # --- Capacité de stockage ---
+            usable_length = length - col('main_aisle_width') - 4.0
+            racks_per_row = np.maximum(1, np.trunc(usable_length / (rack_depth + 1.0))).astype(np.int64)
+            
+            usable_width = width - 2.0
+            rows_per_side = np.maximum(1, np.trunc(usable_width / (rack_width + 1.0))).astype(np.int64)
+            
+            total_racks = racks_per_row * rows_per_side * 2
+            
+            levels = np.minimum(col('max_levels').astype(np.int64),
+                                np.trunc(col('clear_height') / (col('pallet_height') + 0.3)).astype(np.int64))
+            total_positions = total_racks * levels * 2
+            total_pallets = np.trunc(total_positions * col('filling_rate') / 100.0).astype(np.int64)
+            
+            storage_area = total_racks * rack_width * rack_depth
+            total_area = length * width
+            storage_ratio = np.where(total_area > 0, (storage_area / total_area) * 100.0, 0.0)
+            
+            # --- Circulation ---
+            avg_distance = (length + width) / 2.0
+            
+            travel_speed = col('equipment_speed') * 1000.0 / 3600.0
+            travel_time = np.where(travel_speed > 0, avg_distance / travel_speed, 0.0)
+            handling_time = np.where(equipment.to_numpy() == 'forklift', 120.0, 90.0)
+            
+            cycle_time = travel_time * 2.0 + handling_time / 60.0
+            
+            pallets_per_hour = np.where(cycle_time > 0, 60.0 / cycle_time, 0.0)
+            daily_capacity = pallets_per_hour * col('operating_hours')
+            
+            daily_throughput = total_pallets / col('stock_rotation')
+            required_equipment = np.where(
+                daily_capacity > 0,
+                np.maximum(1, np.ceil(daily_throughput / daily_capacity)),
+                1
+            ).astype(np.int64)
+            
+            # --- Coûts ---
+            rates = WarehouseCalculator.COSTS
+            rack_cost = total_positions * rates['rack_per_position']
+            area_cost = length * width * rates['area_per_m2']
+            
+            unit_equipment_cost = (equipment.fillna('forklift')
+                                   .map(WarehouseCalculator.EQUIPMENT_COSTS)
+                                   .fillna(rates['default_equipment'])
+                                   .to_numpy(dtype=float))
+            equipment_cost = unit_equipment_cost * required_equipment
+            
+            installation_cost = (rack_cost + area_cost + equipment_cost) * rates['installation_rate']
+            total_investment = rack_cost + area_cost + equipment_cost + installation_cost
+            
+            annual_maintenance = total_investment * rates['maintenance_rate']
+            annual_personnel = required_equipment * rates['operators_per_equipment'] * rates['operator_salary']
+            annual_energy = length * width * rates['energy_per_m2']
+            
+            total_annual_cost = annual_maintenance + annual_personnel + annual_energy
+            
+            cost_per_pallet = np.where(total_pallets > 0, total_annual_cost / total_pallets, 0.0)
+        
+        return pd.DataFrame({
+            # Capacité
+            'total_racks': total_racks,
+            'racks_per_row': racks_per_row,
+            'rows_per_side': rows_per_side,
+            'levels': levels,
+            'total_positions': total_positions,
+            'total_pallets': total_pallets,
+            'storage_area': rnd(storage_area, 1),
+            'total_area': total_area,
+            'storage_ratio': rnd(storage_ratio, 1),
+            'volume_capacity': rnd(total_pallets * col('pallet_volume'), 1),
+            # Circulation
+            'avg_distance': rnd(avg_distance, 1),
+            'cycle_time': rnd(cycle_time, 1),
+            'pallets_per_hour': rnd(pallets_per_hour, 1),
+            'daily_capacity': np.trunc(daily_capacity).astype(np.int64),
+            'daily_throughput': np.trunc(daily_throughput).astype(np.int64),
+            'required_equipment': required_equipment,
+            # Coûts (k€)
+            'rack_cost': rnd(rack_cost / 1000.0, 1),
+            'area_cost': rnd(area_cost / 1000.0, 1),
+            'equipment_cost': rnd(equipment_cost / 1000.0, 1),
+            'installation_cost': rnd(installation_cost / 1000.0, 1),
+            'total_investment': rnd(total_investment / 1000.0, 1),
+            'annual_maintenance': rnd(annual_maintenance / 1000.0, 1),
+            'annual_personnel': rnd(annual_personnel / 1000.0, 1),
+            'annual_energy': rnd(annual_energy / 1000.0, 1),
+            'total_annual_cost': rnd(total_annual_cost / 1000.0, 1),
+            'cost_per_pallet': rnd(cost_per_pallet, 2),
+        }, index=configs.index)
+    
+    
+    @staticmethod
+    def check_norms_batch(configs, results):
+        """Vérifie la conformité aux normes pour un lot (mêmes règles que check_norms_compliance)
+        
+        Retourne un DataFrame de booléens : une colonne par règle et `compliant` pour l'ensemble.
+        """
+        if not isinstance(configs, pd.DataFrame):
+            configs = pd.DataFrame(configs)
+        
+        def col(name):
+            return WarehouseCalculator._batch_column(configs, name)
+        
+        norms = WarehouseCalculator.NORMS
+        forklift = (configs['equipment_type'].to_numpy() == 'forklift') if 'equipment_type' in configs else False
+        min_aisle = np.where(forklift, norms['min_aisle_width_forklift'], norms['min_aisle_width_pallet'])
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            estimated_load = (results['total_pallets'].to_numpy() * col('pallet_weight')) / results['total_area'].to_numpy()
+        
+        checks = pd.DataFrame({
+            'height_ok': ~(col('clear_height') - col('max_rack_height') < norms['clearance_height']),
+            'aisle_ok': ~(col('main_aisle_width') < min_aisle),
+            'load_ok': ~(estimated_load > norms['load_per_m2']),
+        }, index=configs.index)
+        checks['compliant'] = checks.all(axis=1)
+        return checks
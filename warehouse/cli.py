@@ -0,0 +1,64 @@
+"""Ligne de commande : calcul par lots de configurations lues dans un fichier
+
+    python -m warehouse configurations.csv -o resultats.parquet --chunk-size 50000
+
+Les fichiers sont traités par tranches (voir bulk.py). Seuls NumPy et pandas sont
+chargés : ni Streamlit ni matplotlib au démarrage.
+"""
+import argparse
+import sqlite3
+import sys
+
+from . import bulk
+from .store import ScenarioStore
+
+
+def build_parser():
+    """Arguments de la ligne de commande"""
+    parser = argparse.ArgumentParser(
+        prog='python -m warehouse',
+        description="Dimensionnement d'entrepôt par lots : capacité, circulation, coûts et conformité aux normes.",
+    )
+    parser.add_argument('input', help="fichier de configurations (.csv, .json, .jsonl, .parquet) ou '-' pour stdin")
+    parser.add_argument('-o', '--output', help="fichier de résultats (.csv, .json, .jsonl, .parquet, .xlsx ; "
+                                               "par défaut : CSV sur stdout)")
+    parser.add_argument('--input-format', choices=bulk.INPUT_FORMATS, help="format d'entrée, si l'extension ne suffit pas")
+    parser.add_argument('--output-format', choices=bulk.OUTPUT_FORMATS, help="format de sortie, si l'extension ne suffit pas")
+    parser.add_argument('--chunk-size', type=int, default=bulk.CHUNK_SIZE, help="configurations lues et calculées par tranche")
+    parser.add_argument('--compliant-only', action='store_true', help="ne garder que les configurations conformes")
+    parser.add_argument('--store', metavar='DB', help="enregistrer aussi les résultats dans cette base de scénarios SQLite")
+    parser.add_argument('-q', '--quiet', action='store_true', help="pas de résumé sur stderr")
+    return parser
+
+
+def main(argv=None):
+    """Point d'entrée : retourne le code de sortie du processus"""
+    args = build_parser().parse_args(argv)
+    try:
+        if args.input == '-':
+            input_format = args.input_format or 'csv'
+            source = sys.stdin if input_format in ('csv', 'json', 'jsonl') else sys.stdin.buffer
+        else:
+            source, input_format = args.input, bulk.detect_format(args.input, bulk.INPUT_FORMATS, args.input_format)
+        if args.output in (None, '-'):
+            output_format = args.output_format or 'csv'
+            target = sys.stdout if output_format in ('csv', 'json', 'jsonl') else sys.stdout.buffer
+        else:
+            target, output_format = args.output, bulk.detect_format(args.output, bulk.OUTPUT_FORMATS, args.output_format)
+        
+        store = ScenarioStore(args.store) if args.store else None
+        try:
+            summary = bulk.process(source, target, input_format, output_format,
+                                   chunk_size=args.chunk_size, compliant_only=args.compliant_only,
+                                   store=store, name=args.input)
+        finally:
+            if store is not None:
+                store.close()
+    except (OSError, ValueError, ImportError, sqlite3.Error) as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 1
+    
+    if not args.quiet:
+        print(f"{summary['rows']} configuration(s) calculée(s), {summary['compliant']} conforme(s) "
+              f"en {summary['elapsed']:.2f} s ({summary['chunks']} tranche(s))", file=sys.stderr)
+    return 0
@@ -0,0 +1,312 @@
+"""Distances de parcours sur le graphe des allées, précalculées quai → emplacement"""
+import heapq
+
+import numpy as np
+
+from .cache import params_key, shared_cache
+from .geometry import MANEUVER_DEPTH, QUAI_WIDTH, dock_positions, plan_geometry, site_layout
+from .layout import LAYOUT_INPUTS, PERIMETER, LayoutGenerator
+
+
+# Entrées qui déterminent entièrement le graphe (clé des tables de distances)
+DISTANCE_INPUTS = ('length', 'width', 'rack_width', 'rack_depth', 'main_aisle_width',
+                   'racks_per_row', 'rows_per_side', 'dock_doors')
+# Entrées du graphe de l'implantation multi-allées (celles du générateur, plus les quais)
+AISLE_DISTANCE_INPUTS = LAYOUT_INPUTS + ('dock_doors',)
+
+PERIMETER_OFFSET = 1.0   # Axe des allées de rive, au milieu de la marge de 2 m le long des murs (m)
+
+# Voies verticales du graphe : mur de gauche, allée centrale, zone de manœuvre des quais
+WEST, CENTER, FRONT = 0, 1, 2
+
+# Tables déjà construites, partagées par tous les calculs du processus
+_TABLES = shared_cache('distances', maxsize=32)
+
+
+def _dijkstra(adjacency, source):
+    """Plus courts chemins depuis un nœud (listes d'adjacence [(voisin, longueur)])"""
+    dist = [np.inf] * len(adjacency)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > dist[node]:
+            continue
+        for neighbor, weight in adjacency[node]:
+            candidate = d + weight
+            if candidate < dist[neighbor]:
+                dist[neighbor] = candidate
+                heapq.heappush(heap, (candidate, neighbor))
+    return np.array(dist)
+
+
+def _all_pairs(adjacency):
+    """Plus courts chemins entre tous les nœuds (Floyd-Warshall vectorisé, graphe de quelques centaines de nœuds)"""
+    size = len(adjacency)
+    dist = np.full((size, size), np.inf)
+    np.fill_diagonal(dist, 0.0)
+    for node, edges in enumerate(adjacency):
+        for neighbor, weight in edges:
+            dist[node, neighbor] = min(dist[node, neighbor], weight)
+    for k in range(size):
+        np.minimum(dist, dist[:, k, None] + dist[None, k, :], out=dist)
+    return dist
+
+
+class DistanceTable:
+    """Distance de chaque quai à chaque emplacement de rack par le réseau d'allées
+    
+    Le graphe suit le plan de l'étape 5 : allées de rangée (entre deux rangées de racks,
+    ouvertes aux deux bouts), allée centrale, zone de manœuvre devant les quais et
+    allées de rive le long des murs. Dijkstra ne parcourt que les carrefours ; un
+    emplacement, situé sur une allée de rangée, est atteint par la plus courte de ses
+    deux extrémités. La matrice (quais × emplacements) est calculée une fois puis
+    interrogée en O(1) ; les distances entre emplacements (`between`) passent par les
+    carrefours, dont les plus courts chemins ne sont calculés qu'à la première demande.
+    
+    Les emplacements sont numérotés côté gauche puis côté droit, puis colonne par
+    colonne et rangée par rangée (ordre de rack_origins).
+    
+    Pour les tournées, chaque allée de rangée appartient à un bloc (0 : côté droit,
+    parcouru d'abord ; 1 : côté gauche) et reçoit un rang de balayage ; `aisle_ends`
+    donne l'abscisse de son extrémité éloignée puis de son extrémité côté quais.
+    """
+    
+    def __init__(self, layout):
+        self.key = params_key('distances', layout, DISTANCE_INPUTS)
+        self.layout = layout
+        geometry = plan_geometry(layout)
+        racks_per_row, rows_per_side = layout['racks_per_row'], layout['rows_per_side']
+        pitch_x, pitch_y = geometry['pitch_x'], geometry['pitch_y']
+        
+        # Ordonnées des allées de rangée (au-dessus de chaque rangée) et des allées de rive
+        bottom, top = PERIMETER_OFFSET, layout['width'] - PERIMETER_OFFSET
+        aisle_y = np.minimum(geometry['origin_y'] + np.arange(rows_per_side) * pitch_y
+                             + layout['rack_width'] + (pitch_y - layout['rack_width']) / 2, top)
+        levels = np.concatenate([[bottom], aisle_y, [top]])
+        
+        # Abscisses des voies verticales
+        self.lane_x = {
+            WEST: geometry['origin_x']['left'] - PERIMETER_OFFSET,
+            CENTER: geometry['alley_start'] + layout['main_aisle_width'] / 2,
+            FRONT: max(layout['length'] - QUAI_WIDTH - MANEUVER_DEPTH / 2,
+                       geometry['origin_x']['right'] + racks_per_row * pitch_x),
+        }
+        docks = dock_positions(layout)
+        dock_offset = max(0.0, layout['length'] - QUAI_WIDTH / 2 - self.lane_x[FRONT])
+        
+        # Nœuds : (voie, niveau) puis un nœud par quai, raccordé à la zone de manœuvre
+        n = len(levels)
+        adjacency = [[] for _ in range(3 * n + len(docks))]
+        
+        def link(a, b, weight):
+            adjacency[a].append((b, weight))
+            adjacency[b].append((a, weight))
+        
+        for lane in (WEST, CENTER):
+            for k in range(n - 1):
+                link(lane * n + k, lane * n + k + 1, levels[k + 1] - levels[k])
+        front = sorted([(y, FRONT * n + k) for k, y in enumerate(levels)]
+                       + [(y, 3 * n + d) for d, y in enumerate(docks)])
+        for (y0, a), (y1, b) in zip(front, front[1:]):
+            link(a, b, y1 - y0)
+        for k in range(n):
+            link(WEST * n + k, CENTER * n + k, self.lane_x[CENTER] - self.lane_x[WEST])
+            link(CENTER * n + k, FRONT * n + k, self.lane_x[FRONT] - self.lane_x[CENTER])
+        
+        self._adjacency = adjacency
+        self._junctions = None
+        
+        nodes = np.array([_dijkstra(adjacency, 3 * n + d) for d in range(len(docks))]) + dock_offset
+        self._nodes = nodes
+        rows = np.arange(1, rows_per_side + 1)
+        west, center, front = (nodes[:, lane * n + rows] for lane in (WEST, CENTER, FRONT))
+        
+        # Emplacement (colonne i, rangée j) : meilleure des deux extrémités de son allée de rangée
+        rack_x = {side: geometry['origin_x'][side] + np.arange(racks_per_row) * pitch_x + layout['rack_depth'] / 2
+                  for side in ('left', 'right')}
+        left = np.minimum(west[:, None, :] + (rack_x['left'] - self.lane_x[WEST])[None, :, None],
+                          center[:, None, :] + (self.lane_x[CENTER] - rack_x['left'])[None, :, None])
+        right = np.minimum(center[:, None, :] + (rack_x['right'] - self.lane_x[CENTER])[None, :, None],
+                           front[:, None, :] + (self.lane_x[FRONT] - rack_x['right'])[None, :, None])
+        
+        self.matrix = np.concatenate([left.reshape(len(docks), -1), right.reshape(len(docks), -1)], axis=1)
+        self.matrix.flags.writeable = False
+        self.nearest = self.matrix.min(axis=0)
+        self.nearest_dock = self.matrix.argmin(axis=0)
+        self.mean_distance = float(self.matrix.mean())
+        
+        # Position de chaque emplacement dans son allée de rangée et carrefours de ses deux extrémités
+        column = np.repeat(np.arange(racks_per_row), rows_per_side)
+        row = np.tile(np.arange(rows_per_side), racks_per_row)
+        self.location_x = np.concatenate([rack_x['left'][column], rack_x['right'][column]])
+        self.location_aisle = np.concatenate([row, rows_per_side + row])
+        ends = {'left': (WEST, CENTER), 'right': (CENTER, FRONT)}
+        self._ends = np.concatenate([np.stack([lane * n + row + 1 for lane in ends[side]], axis=1)
+                                     for side in ('left', 'right')])
+        self._offsets = np.abs(self.location_x[:, None]
+                               - np.array([[self.lane_x[lane] for lane in ends[side]]
+                                           for side in ('left', 'right')]).repeat(len(column), axis=0))
+        
+        # Balayage des allées : bloc droit de bas en haut, puis bloc gauche de haut en bas
+        aisle = np.arange(2 * rows_per_side)
+        self.aisle_block = (aisle < rows_per_side).astype(np.int64)
+        self.aisle_sweep = np.where(aisle >= rows_per_side, aisle - rows_per_side, 2 * rows_per_side - 1 - aisle)
+        self.aisle_ends = np.array([[self.lane_x[lane] for lane in ends[side]]
+                                    for side in ('left', 'right')]).repeat(rows_per_side, axis=0)
+    
+    @property
+    def docks(self):
+        return self.matrix.shape[0]
+    
+    @property
+    def locations(self):
+        return self.matrix.shape[1]
+    
+    @property
+    def aisles(self):
+        return len(self.aisle_block)
+    
+    def location(self, side, column, row):
+        """Indice d'emplacement (side : 0 gauche, 1 droite), scalaires ou tableaux"""
+        rows_per_side = self.layout['rows_per_side']
+        return (np.asarray(side) * self.layout['racks_per_row'] + column) * rows_per_side + row
+    
+    def distance(self, dock, location):
+        """Distance quai → emplacement (m), scalaires ou tableaux"""
+        return self.matrix[dock, location]
+    
+    def aisle_depth(self, dock, location):
+        """Part du trajet quai → emplacement parcourue dans l'allée de rangée (m), par l'extrémité retenue"""
+        dock, location = np.asarray(dock), np.asarray(location)
+        offsets = self._offsets[location]
+        via = self._nodes[dock[..., None], self._ends[location]] + offsets
+        return np.take_along_axis(offsets, via.argmin(axis=-1)[..., None], axis=-1)[..., 0]
+    
+    def between(self, a, b):
+        """Distance emplacement → emplacement (m) par les allées, tableaux de même forme
+        
+        Dans une même allée de rangée, la distance est l'écart en x ; sinon le meilleur
+        des quatre chemins passant par une extrémité de chaque allée.
+        """
+        if self._junctions is None:
+            self._junctions = _all_pairs(self._adjacency)
+        a, b = np.asarray(a), np.asarray(b)
+        via = (self._offsets[a][..., :, None] + self._junctions[self._ends[a][..., :, None], self._ends[b][..., None, :]]
+               + self._offsets[b][..., None, :])
+        return np.where(self.location_aisle[a] == self.location_aisle[b],
+                        np.abs(self.location_x[a] - self.location_x[b]), via.min(axis=(-2, -1)))
+
+
+class AisleDistanceTable(DistanceTable):
+    """Distances quai → emplacement sur l'implantation multi-allées (LayoutGenerator)
+    
+    Même interface que DistanceTable, sur les racks comptés à l'étape 4 : les allées
+    secondaires, verticales, sont coupées par les allées transversales en allées de
+    rangée ; les allées de rive haute et basse, les allées transversales et la zone
+    de manœuvre devant les quais les relient. Chaque ligne de racks est desservie par
+    l'allée secondaire la plus proche, un emplacement par rack ; `location_x` est
+    alors l'ordonnée du rack dans son allée et `location_zone` sa zone (ordre de
+    capacity['zones']).
+    
+    Les blocs de balayage sont les tronçons entre allées transversales, parcourus de
+    bas en haut, en serpentin : allées de droite à gauche dans un bloc sur deux.
+    """
+    
+    def __init__(self, params):
+        self.key = params_key('aisle-distances', params, AISLE_DISTANCE_INPUTS)
+        self.layout = None
+        generator = LayoutGenerator(params)
+        generated = generator.generate(racks=True)
+        length, width = generator.length, generator.width
+        segments, segment_length, origins = generator.cross_aisles()
+        aisle = params.get('secondary_aisle_width', 2.0)
+        
+        # Niveaux des voies horizontales : rive basse, axes des allées transversales, rive haute
+        levels = np.concatenate([[PERIMETER / 2], origins[1:] - params.get('main_aisle_width', 3.5) / 2,
+                                 [width - PERIMETER / 2]])
+        n = len(levels)
+        
+        # Colonnes : axes des allées secondaires de toutes les zones, puis zone de manœuvre
+        columns = [zone['aisle_x'] + aisle / 2 for zone in generated['zones']]
+        column_x = np.concatenate(columns + [[]])
+        front_x = max(length - QUAI_WIDTH - MANEUVER_DEPTH / 2, column_x.max(initial=0.0))
+        self.lane_x = np.append(column_x, front_x)
+        front = len(column_x)
+        dock_doors = max(1, int(params.get('dock_doors', 4)))
+        docks = (np.arange(dock_doors) + 1) * (width / (dock_doors + 1))     # Comme sur le plan des zones
+        dock_offset = max(0.0, length - QUAI_WIDTH / 2 - front_x)
+        
+        # Nœuds : (colonne, niveau) puis un nœud par quai, raccordé à la zone de manœuvre
+        adjacency = [[] for _ in range((front + 1) * n + len(docks))]
+        
+        def link(a, b, weight):
+            adjacency[a].append((b, weight))
+            adjacency[b].append((a, weight))
+        
+        for c in range(front):
+            for k in range(n - 1):
+                link(c * n + k, c * n + k + 1, levels[k + 1] - levels[k])
+        lane = sorted([(y, front * n + k) for k, y in enumerate(levels)]
+                      + [(y, (front + 1) * n + d) for d, y in enumerate(docks)])
+        for (y0, a), (y1, b) in zip(lane, lane[1:]):
+            link(a, b, y1 - y0)
+        for c in range(front):
+            for k in range(n):
+                link(c * n + k, (c + 1) * n + k, self.lane_x[c + 1] - self.lane_x[c])
+        
+        self._adjacency = adjacency
+        self._junctions = None
+        self._nodes = np.array([_dijkstra(adjacency, (front + 1) * n + d) for d in range(len(docks))]) + dock_offset
+        
+        # Racks : allée secondaire la plus proche de leur ligne, tronçon de leur ordonnée
+        offset, column, y, zone_of = 0, [], [], []
+        for z, (zone, centers) in enumerate(zip(generated['zones'], columns)):
+            if len(centers) and len(zone['rack_x']):
+                middle = zone['rack_x'] + zone['rack_depth'] / 2
+                column.append(offset + np.abs(middle[:, None] - centers[None, :]).argmin(axis=1))
+                y.append(zone['rack_y'] + params['rack_width'] / 2)
+                zone_of.append(np.full(len(middle), z))
+            offset += len(centers)
+        column = np.concatenate(column + [[]]).astype(np.int64)
+        self.location_x = np.concatenate(y + [[]])
+        self.location_zone = np.concatenate(zone_of + [[]]).astype(np.int64)
+        segment = np.clip(np.searchsorted(origins, self.location_x, side='right') - 1, 0, segments - 1)
+        self.location_aisle = column * segments + segment
+        self._ends = np.stack([column * n + segment, column * n + segment + 1], axis=1)
+        self._offsets = np.abs(self.location_x[:, None] - levels[np.stack([segment, segment + 1], axis=1)])
+        
+        self.matrix = (self._nodes[:, self._ends] + self._offsets[None]).min(axis=-1)
+        self.matrix.flags.writeable = False
+        self.nearest = self.matrix.min(axis=0)
+        self.nearest_dock = self.matrix.argmin(axis=0)
+        self.mean_distance = float(self.matrix.mean()) if self.matrix.size else 0.0
+        
+        # Balayage : tronçons de bas en haut, allées de droite à gauche un tronçon sur deux
+        c, k = np.divmod(np.arange(front * segments), segments)
+        self.aisle_block = k
+        self.aisle_sweep = k * front + np.where(k % 2 == 0, front - 1 - c, c)
+        self.aisle_ends = np.stack([levels[k], levels[k + 1]], axis=1)
+    
+    def location(self, side, column, row):
+        raise NotImplementedError("Emplacements de l'implantation multi-allées : indices de la table")
+
+
+def site_distances(params, capacity, cache=None):
+    """Table des distances du modèle de la capacité calculée
+    
+    Implantation multi-allées si la capacité est détaillée par zone (LayoutGenerator),
+    grille simplifiée de site_layout sinon : les flux portent sur les racks affichés.
+    """
+    if 'zones' not in capacity:
+        return distance_table(site_layout(params, capacity), cache)
+    cache = cache if cache is not None else _TABLES
+    key = params_key('aisle-distances', params, AISLE_DISTANCE_INPUTS)
+    return cache.get_or_compute(key, lambda: AisleDistanceTable(params))
+
+
+def distance_table(layout, cache=None):
+    """Table des distances du plan, construite une seule fois par géométrie"""
+    cache = cache if cache is not None else _TABLES
+    key = params_key('distances', layout, DISTANCE_INPUTS)
+    return cache.get_or_compute(key, lambda: DistanceTable(layout))
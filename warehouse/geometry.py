@@ -0,0 +1,82 @@
+"""Géométrie du plan d'implantation (NumPy seul, sans bibliothèque de dessin)"""
+import numpy as np
+
+
+QUAI_WIDTH = 4.0     # Profondeur d'un quai (m)
+QUAI_HEIGHT = 3.0    # Largeur d'un quai (m)
+EXIT_WIDTH = 2.4     # Largeur sortie de secours (m)
+MANEUVER_DEPTH = 8.0  # Zone de manœuvre devant les quais (m)
+
+
+def plan_layout(params, capacity):
+    """Dimensions du plan à partir des paramètres et de la capacité calculée"""
+    # Correction : Assurer que la longueur est le plus grand côté
+    length = max(params.get('length', 60.0), params.get('width', 40.0))
+    width = min(params.get('length', 60.0), params.get('width', 40.0))
+    
+    rack_width = params.get('rack_width', 1.0)
+    rack_depth = params.get('rack_depth', 1.2)
+    main_aisle_width = params.get('main_aisle_width', 3.5)
+    
+    racks_per_row = capacity.get('racks_per_row', 0)
+    rows_per_side = capacity.get('rows_per_side', 0)
+    
+    # Si les calculs n'ont pas été faits, estimer basé sur les dimensions
+    if racks_per_row == 0:
+        usable_length = length - main_aisle_width - 4  # Marges
+        racks_per_row = max(1, int(usable_length / (rack_depth + 0.8)))
+    
+    if rows_per_side == 0:
+        usable_width = width - 4  # Marges
+        rows_per_side = max(1, int(usable_width / (rack_width + 0.8)))
+    
+    return {
+        'length': length,
+        'width': width,
+        'rack_width': rack_width,
+        'rack_depth': rack_depth,
+        'main_aisle_width': main_aisle_width,
+        'racks_per_row': racks_per_row,
+        'rows_per_side': rows_per_side,
+        'total_racks': racks_per_row * rows_per_side * 2,
+        'dock_doors': min(params.get('dock_doors', 4), 6),  # Limiter à 6 pour la visibilité
+        'view': None,  # Zone zoomée (x0, x1, y0, y1), None pour le plan entier
+    }
+
+
+def site_layout(params, capacity):
+    """Plan complet pour les calculs de flux : comme plan_layout, avec tous les quais"""
+    layout = plan_layout(params, capacity)
+    layout['dock_doors'] = max(1, int(params.get('dock_doors', 4)))
+    return layout
+
+
+def plan_geometry(layout):
+    """Pas et origines de la grille de racks de chaque côté de l'allée centrale"""
+    length, width = layout['length'], layout['width']
+    rack_width, rack_depth = layout['rack_width'], layout['rack_depth']
+    racks_per_row, rows_per_side = layout['racks_per_row'], layout['rows_per_side']
+    
+    # Espacements répartissant les racks sur toute la largeur et la demi-longueur
+    available_width = width - 4  # 2m de chaque côté
+    spacing_y = (available_width - rows_per_side * rack_width) / (rows_per_side + 1) if rows_per_side > 1 else 1.0
+    
+    available_length_left = (length - layout['main_aisle_width']) / 2 - 2  # Moitié gauche
+    spacing_x = (available_length_left - racks_per_row * rack_depth) / (racks_per_row + 1) if racks_per_row > 1 else 1.0
+    
+    alley_start = 2 + racks_per_row * (rack_depth + spacing_x) + spacing_x
+    alley_end = alley_start + layout['main_aisle_width']
+    
+    return {
+        'pitch_x': rack_depth + spacing_x,
+        'pitch_y': rack_width + spacing_y,
+        'origin_x': {'left': 2.0, 'right': alley_end + spacing_x},
+        'origin_y': 2.0,
+        'alley_start': alley_start,
+    }
+
+
+def dock_positions(layout):
+    """Ordonnées des centres des quais, répartis sur le mur de droite"""
+    dock_doors = layout['dock_doors']
+    return (np.arange(dock_doors) + 1) * (layout['width'] / (dock_doors + 1))
@@ -0,0 +1,199 @@
+"""Tâches de calcul en arrière-plan : identifiants, progression, annulation
+
+Les calculs longs (simulation, Monte-Carlo, optimisation, traitement par lots) sont
+soumis à un JobRunner et s'exécutent dans ses fils : l'interface interroge leur
+progression au lieu d'attendre. Le runner partagé (shared_runner) vit avec le
+processus : une tâche continue et garde son résultat si la page est rechargée.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+
+MAX_WORKERS = 2               # Tâches exécutées en même temps
+KEEP_FINISHED = 3600.0        # Durée de conservation d'une tâche terminée non récupérée (s)
+
+# États d'une tâche
+PENDING, RUNNING, DONE, FAILED, CANCELLED = 'pending', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+_RUNNER = None
+_RUNNER_LOCK = threading.Lock()
+_CURRENT = ContextVar('warehouse_job', default=None)
+
+
+def current_job():
+    """Tâche exécutée par le fil courant (None hors d'une tâche)"""
+    return _CURRENT.get()
+
+
+class JobCancelled(Exception):
+    """Levée par Job.report() quand l'annulation de la tâche a été demandée"""
+
+
+class Job:
+    """Une tâche soumise : état, progression (0 à 1), message, résultat ou erreur
+    
+    La fonction de la tâche reçoit le Job en premier argument et appelle report()
+    à chaque étape : c'est là que la progression est publiée et que l'annulation
+    prend effet (JobCancelled interrompt le calcul). Les erreurs signalées sans
+    interrompre le calcul (log_error) sont gardées pour l'affichage.
+    """
+    
+    def __init__(self, owner, kind, label):
+        self.id = uuid.uuid4().hex[:12]
+        self.owner = owner
+        self.kind = kind
+        self.label = label
+        self.status = PENDING
+        self.progress = 0.0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.errors = []
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._future = None
+    
+    @property
+    def done(self):
+        return self.status in FINISHED
+    
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+    
+    def report(self, fraction=None, message=None):
+        """Publie la progression ; lève JobCancelled si l'annulation a été demandée"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        if fraction is not None:
+            self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+    
+    def log_error(self, message):
+        """Note une erreur rencontrée par le calcul, affichée avec son résultat"""
+        self.errors.append(message)
+    
+    def cancel(self):
+        """Demande l'annulation : immédiate si la tâche n'a pas démarré, au prochain report() sinon"""
+        self._cancel.set()
+        if self._future is not None and self._future.cancel():
+            self.finished = time.time()
+            self.status = CANCELLED
+    
+    def _run(self, function, args, kwargs):
+        # L'heure de fin est posée avant l'état final : une tâche terminée a toujours une heure de fin
+        if self._cancel.is_set():
+            self.finished = time.time()
+            self.status = CANCELLED
+            return
+        self.started, self.status = time.time(), RUNNING
+        token = _CURRENT.set(self)
+        try:
+            result = function(self, *args, **kwargs)
+        except JobCancelled:
+            status = CANCELLED
+        except Exception as e:
+            self.error = f"{type(e).__name__} : {e}"
+            status = FAILED
+        else:
+            self.result, self.progress = result, 1.0
+            status = DONE
+        finally:
+            _CURRENT.reset(token)
+        self.finished = time.time()
+        self.status = status
+    
+    def snapshot(self):
+        """État de la tâche pour l'affichage (sans le résultat)"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'label': self.label,
+            'status': self.status,
+            'progress': round(100.0 * self.progress, 1),
+            'message': self.message,
+            'elapsed': round(self.elapsed, 1),
+            'error': self.error,
+            'errors': list(self.errors),
+        }
+
+
+class JobRunner:
+    """Pool de fils exécutant les tâches soumises, retrouvées par identifiant ou par propriétaire
+    
+    Le propriétaire est un identifiant choisi par l'appelant (celui de l'onglet du
+    navigateur dans l'application) : les tâches d'un propriétaire ne sont visibles que
+    de lui. Les tâches terminées sont gardées KEEP_FINISHED secondes, le temps d'être
+    récupérées, puis oubliées.
+    """
+    
+    def __init__(self, max_workers=MAX_WORKERS, keep=KEEP_FINISHED):
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='warehouse-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, owner, kind, label, function, *args, **kwargs):
+        """Soumet function(job, *args, **kwargs) ; une tâche du même type encore en cours est annulée"""
+        self.purge()
+        for previous in self.jobs(owner, kind):
+            if not previous.done:
+                previous.cancel()
+        job = Job(owner, kind, label)
+        with self._lock:
+            self._jobs[job.id] = job
+        job._future = self._executor.submit(job._run, function, args, kwargs)
+        return job
+    
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def jobs(self, owner, kind=None):
+        """Tâches d'un propriétaire (d'un type donné), des plus anciennes aux plus récentes"""
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if j.owner == owner and (kind is None or j.kind == kind)]
+        return sorted(jobs, key=lambda j: j.created)
+    
+    def latest(self, owner, kind):
+        """Dernière tâche d'un type pour un propriétaire (None si aucune)"""
+        jobs = self.jobs(owner, kind)
+        return jobs[-1] if jobs else None
+    
+    def forget(self, job_id):
+        """Retire une tâche terminée (résultat récupéré)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.done:
+                del self._jobs[job_id]
+    
+    def purge(self):
+        """Oublie les tâches terminées depuis plus de `keep` secondes"""
+        limit = time.time() - self.keep
+        with self._lock:
+            for job_id in [i for i, j in self._jobs.items() if j.done and j.finished < limit]:
+                del self._jobs[job_id]
+    
+    def stats(self):
+        """Nombre de tâches par état, tous propriétaires confondus"""
+        with self._lock:
+            statuses = [j.status for j in self._jobs.values()]
+        return {status: statuses.count(status) for status in (PENDING, RUNNING, *FINISHED)}
+
+
+def shared_runner(max_workers=MAX_WORKERS):
+    """JobRunner partagé par toutes les sessions du processus, créé au premier appel"""
+    global _RUNNER
+    with _RUNNER_LOCK:
+        if _RUNNER is None:
+            _RUNNER = JobRunner(max_workers)
+        return _RUNNER
@@ -0,0 +1,225 @@
+"""Générateur d'implantation multi-allées et multi-zones (NumPy seul, sans dessin)"""
+import math
+
+import numpy as np
+
+from .calculator import WarehouseCalculator
+from .geometry import MANEUVER_DEPTH, QUAI_WIDTH
+from .packing import PalletPacker
+from .profiling import profiled
+
+
+PERIMETER = 1.0           # Dégagement le long des murs (m)
+FLUE_GAP = 0.2            # Espace entre deux racks dos à dos (m)
+POST_SIZE = 0.4           # Section des poteaux de structure (m)
+MAX_ROW_LENGTH = 40.0     # Longueur maximale d'une rangée entre deux allées transversales (m)
+OFFSET_STEPS = 16         # Décalages de trame essayés pour tenir les poteaux hors des allées
+
+# Paramètres lus par le générateur (clé du cache de calcul)
+LAYOUT_INPUTS = WarehouseCalculator.CAPACITY_INPUTS + ('secondary_aisle_width', 'column_spacing',
+                                                       'rack_type', 'special_conditions',
+                                                       'pallet_type', 'pallet_mix')
+
+# Types de racks (choix de l'étape 2) : palettes en profondeur par côté, doubles rangées par allée
+RACK_TYPES = {
+    'Palettier conventionnel': {'deep': 1, 'rows_per_aisle': 1},
+    'Drive-in': {'deep': 4, 'rows_per_aisle': 1},
+    'Palettier mobile': {'deep': 1, 'rows_per_aisle': 4},    # Une seule allée ouverte par groupe
+    'Cantilever': {'deep': 1, 'rows_per_aisle': 1},
+}
+
+# Zones dédiées aux conditions spéciales de l'étape 2 : part de la longueur de stockage,
+# type de rack, limites de hauteur et bande de séparation avec la zone voisine (m)
+ZONE_TYPES = {
+    'Chambres froides': {'share': 0.15, 'rack_type': 'Palettier mobile', 'max_height': 8.0,
+                         'max_levels': None, 'separation': 0.3},       # Panneaux isolants
+    'Produits dangereux': {'share': 0.10, 'rack_type': 'Palettier conventionnel', 'max_height': None,
+                           'max_levels': 3, 'separation': 2.0},         # Mur coupe-feu et bande libre
+    'Sécurité renforcée': {'share': 0.05, 'rack_type': 'Palettier conventionnel', 'max_height': None,
+                           'max_levels': None, 'separation': 1.0},      # Grillage et sas
+    'Valeur élevée': {'share': 0.05, 'rack_type': 'Palettier conventionnel', 'max_height': None,
+                      'max_levels': None, 'separation': 1.0},
+    'Fragile': {'share': 0.10, 'rack_type': 'Palettier conventionnel', 'max_height': None,
+                'max_levels': 2, 'separation': 0.0},
+}
+STANDARD_ZONE = 'Standard'
+
+
+def _hits(posts, start, end):
+    """Nombre de poteaux (abscisses triées) touchant chaque intervalle [start, end]"""
+    half = POST_SIZE / 2
+    return np.searchsorted(posts, end + half, side='left') - np.searchsorted(posts, start - half, side='right')
+
+
+class LayoutGenerator:
+    """Rangées parallèles de racks séparées par des allées secondaires, zone par zone
+    
+    Le bâtiment est découpé dans sa longueur en zones : zones spéciales côté mur,
+    zone standard côté quais, la bande de manœuvre des quais restant libre. Dans
+    chaque zone, doubles rangées de racks dos à dos et allées secondaires alternent
+    le long de x ; des allées transversales (main_aisle_width) coupent les rangées
+    tous les MAX_ROW_LENGTH mètres au plus.
+    
+    Les poteaux (grille column_spacing) ne doivent pas tomber dans les allées : la trame
+    de chaque zone est calée en essayant OFFSET_STEPS décalages à la fois, puis les racks
+    touchant un poteau sont retirés. Comme la grille de poteaux est régulière, les racks
+    perdus se comptent par produit (rangées touchées × travées touchées) : le calcul
+    ne dépend que du nombre de rangées, pas du nombre de racks.
+    
+    Les emplacements d'une travée viennent du rangement du mix de palettes
+    (PalletPacker) sous la hauteur et le nombre de niveaux permis dans la zone.
+    """
+    
+    def __init__(self, params):
+        self.params = params
+        self.length = params['length']
+        self.width = params['width']
+        spacing = params.get('column_spacing', 0.0)
+        self.posts_x = np.arange(spacing, self.length - 1e-9, spacing) if spacing > 0 else np.empty(0)
+        self.posts_y = np.arange(spacing, self.width - 1e-9, spacing) if spacing > 0 else np.empty(0)
+    
+    def zones(self):
+        """Zones (nom, type de rack, limites de hauteur) et leur étendue [x0, x1] le long du bâtiment"""
+        specials = [name for name in self.params.get('special_conditions', []) if name in ZONE_TYPES]
+        standard = {'share': None, 'rack_type': self.params.get('rack_type', 'Palettier conventionnel'),
+                    'max_height': None, 'max_levels': None, 'separation': 0.0}
+        specs = [(name, ZONE_TYPES[name]) for name in specials] + [(STANDARD_ZONE, standard)]
+        
+        # Bandes de séparation entre zones voisines, puis partage de la longueur restante
+        separations = [max(a['separation'], b['separation']) for (_, a), (_, b) in zip(specs, specs[1:])]
+        storage = self.length - QUAI_WIDTH - MANEUVER_DEPTH - PERIMETER
+        available = max(0.0, storage - sum(separations))
+        shares = [spec['share'] for _, spec in specs[:-1]]
+        shares.append(max(0.0, 1.0 - sum(shares)))
+        
+        zones = []
+        x = PERIMETER
+        for k, ((name, spec), share) in enumerate(zip(specs, shares)):
+            end = x + share * available
+            zones.append({'name': name, **spec, 'x0': x, 'x1': end})
+            x = end + (separations[k] if k < len(separations) else 0.0)
+        return zones
+    
+    def cross_aisles(self):
+        """Tronçons de rangée le long de y : nombre, longueur et origine de chacun"""
+        main_aisle = self.params.get('main_aisle_width', 3.5)
+        usable = self.width - 2 * PERIMETER
+        segments = max(2, math.ceil(usable / MAX_ROW_LENGTH))
+        length = max(0.0, (usable - (segments - 1) * main_aisle) / segments)
+        origins = PERIMETER + np.arange(segments) * (length + main_aisle)
+        return segments, length, origins
+    
+    def generate(self, racks=False):
+        """Implantation de chaque zone ; `racks=True` ajoute les rectangles des racks (x, y, profondeur)"""
+        params = self.params
+        rack_width, rack_depth = params['rack_width'], params['rack_depth']
+        aisle = params.get('secondary_aisle_width', 2.0)
+        main_aisle = params.get('main_aisle_width', 3.5)
+        packer = PalletPacker(params)
+        
+        # Travées le long de y, communes à toutes les rangées
+        segments, segment_length, segment_origins = self.cross_aisles()
+        bays_per_segment = int(segment_length // rack_width) if rack_width > 0 else 0
+        bay_y = (segment_origins[:, None] + np.arange(bays_per_segment) * rack_width).ravel()
+        bay_hit = _hits(self.posts_y, bay_y, bay_y + rack_width) > 0
+        cross_posts = int(_hits(self.posts_y, segment_origins[1:] - main_aisle, segment_origins[1:]).sum())
+        
+        zones = []
+        for zone in self.zones():
+            rack = RACK_TYPES.get(zone['rack_type'], RACK_TYPES['Palettier conventionnel'])
+            line_depth = rack['deep'] * rack_depth
+            pair = 2 * line_depth + FLUE_GAP
+            group = rack['rows_per_aisle'] * pair
+            span = zone['x1'] - zone['x0']
+            groups = max(0, int((span - aisle) // (group + aisle)))
+            slack = max(0.0, span - aisle - groups * (group + aisle))
+            
+            # Abscisses des lignes de racks et des allées pour chaque décalage de trame (décalages × lignes)
+            offsets = np.unique(np.linspace(0.0, slack, OFFSET_STEPS))[:, None]
+            g = np.repeat(np.arange(groups), 2 * rack['rows_per_aisle'])
+            within = np.tile(np.arange(2 * rack['rows_per_aisle']), groups)
+            line_x = (zone['x0'] + offsets + aisle + g * (group + aisle)
+                      + (within // 2) * pair + (within % 2) * (line_depth + FLUE_GAP))
+            aisle_x = zone['x0'] + offsets + np.arange(groups + 1) * (group + aisle)
+            
+            line_hit = _hits(self.posts_x, line_x, line_x + line_depth) > 0
+            aisle_posts = _hits(self.posts_x, aisle_x, aisle_x + aisle).sum(axis=1) * len(self.posts_y)
+            lost = line_hit.sum(axis=1) * int(bay_hit.sum())
+            best = np.lexsort((lost, aisle_posts))[0]
+            
+            height = min(params['clear_height'], zone['max_height'] or np.inf)
+            max_levels = min(params.get('max_levels', 3), zone['max_levels'] or np.inf)
+            lines = line_x.shape[1]
+            count = lines * len(bay_y) - int(lost[best])
+            packed = packer.positions(count, height, max_levels, rack['deep'])
+            positions = packed['positions']
+            
+            result = {
+                'name': zone['name'],
+                'rack_type': zone['rack_type'],
+                'x0': round(zone['x0'], 2),
+                'x1': round(zone['x1'], 2),
+                'lines': lines,
+                'aisles': groups + 1 if groups else 0,
+                'racks': count,
+                'levels': int(math.ceil(packed['levels'] - 1e-9)),
+                'positions': int(positions),
+                'positions_by_type': packed['by_type'],
+                'pallets': int(positions * params.get('filling_rate', 85) / 100.0),
+                'storage_area': round(count * rack_width * line_depth, 1),
+                'posts_in_aisles': int(aisle_posts[best]) if groups else 0,
+                'racks_lost_to_posts': int(lost[best]),
+            }
+            if racks:
+                keep = ~(line_hit[best][:, None] & bay_hit[None, :])
+                rows, bays = np.nonzero(keep)
+                result['rack_x'] = line_x[best][rows]
+                result['rack_y'] = bay_y[bays]
+                result['rack_depth'] = line_depth
+                result['aisle_x'] = aisle_x[best] if groups else np.empty(0)
+            zones.append(result)
+        
+        return {
+            'zones': zones,
+            'segments': segments,
+            'segment_length': round(segment_length, 2),
+            'cross_aisle_y': segment_origins[1:] - main_aisle,
+            'bays_per_line': len(bay_y),
+            'posts_in_cross_aisles': cross_posts * len(self.posts_x),
+        }
+    
+    @profiled('generate_layout')
+    def capacity(self):
+        """Capacité au format de calculate_storage_capacity, détaillée par zone
+        
+        racks_per_row et rows_per_side restent ceux de la grille simplifiée (plan de
+        l'étape 5) ; les flux portent sur les racks générés ici (AisleDistanceTable).
+        """
+        try:
+            capacity = WarehouseCalculator.calculate_storage_capacity(self.params)
+            if not capacity:
+                return {}
+            layout = self.generate()
+            zones = layout['zones']
+            total_area = self.length * self.width
+            storage_area = sum(z['storage_area'] for z in zones)
+            total_pallets = sum(z['pallets'] for z in zones)
+            capacity.update({
+                'total_racks': sum(z['racks'] for z in zones),
+                'levels': max(z['levels'] for z in zones),
+                'total_positions': sum(z['positions'] for z in zones),
+                'total_pallets': total_pallets,
+                'storage_area': round(storage_area, 1),
+                'storage_ratio': round(100.0 * storage_area / total_area, 1) if total_area > 0 else 0.0,
+                'volume_capacity': round(total_pallets * self.params.get('pallet_volume', 1.0), 1),
+                'zones': zones,
+                'secondary_aisles': sum(z['aisles'] for z in zones),
+                'cross_aisles': layout['segments'] - 1,
+                'posts_in_aisles': sum(z['posts_in_aisles'] for z in zones) + layout['posts_in_cross_aisles'],
+                'racks_lost_to_posts': sum(z['racks_lost_to_posts'] for z in zones),
+                'unfit_pallets': PalletPacker(self.params).unfit(),
+            })
+            return capacity
+        except Exception as e:
+            WarehouseCalculator._report_error(f"Erreur dans la génération de l'implantation: {e}")
+            return {}
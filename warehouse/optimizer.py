@@ -0,0 +1,214 @@
+"""Optimisation de la configuration racks / allées / niveaux / équipement"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from .calculator import WarehouseCalculator
+
+
+class LayoutOptimizer:
+    """Recherche du front de Pareto capacité (palettes) / coût par palette
+    
+    Les capacités ne dépendent des paramètres balayés qu'à travers des fonctions en
+    escalier (racks_per_row, rows_per_side, levels) : deux points donnant les mêmes
+    valeurs entières et le même équipement ont exactement les mêmes résultats. Chaque
+    classe d'équivalence n'est donc évaluée qu'une seule fois, et leur nombre est borné
+    par les comptes entiers quelle que soit la finesse du pas.
+    """
+    
+    # Espace de recherche par défaut (bornes des saisies des étapes 2 et 3)
+    SEARCH_SPACE = {
+        'rack_width': (0.8, 3.0),
+        'rack_depth': (0.8, 3.0),
+        'main_aisle_width': (2.0, 6.0),
+        'max_levels': (1, 10),
+        'equipment_type': ('forklift', 'reach_truck', 'pallet_truck', 'automated'),
+    }
+    
+    GRID_STEP = 0.5      # Pas de la grille initiale (m)
+    RESOLUTION = 0.1     # Pas du raffinement, précision des saisies (m)
+    CHUNK_SIZE = 20000   # Classes évaluées entre deux contrôles du temps imparti
+    
+    # Paramètres du bâtiment nécessaires à l'optimisation
+    REQUIRED = ('length', 'width', 'clear_height', 'pallet_height')
+    
+    # Colonnes présentées pour chaque point du front
+    FRONT_COLUMNS = ['rack_width', 'rack_depth', 'main_aisle_width', 'max_levels', 'equipment_type',
+                     'racks_per_row', 'rows_per_side', 'levels', 'total_racks', 'total_pallets',
+                     'required_equipment', 'total_investment', 'cost_per_pallet', 'storage_ratio']
+    
+    @staticmethod
+    def _axis(bounds, step):
+        """Valeurs d'un axe continu entre deux bornes (borne haute incluse)"""
+        lo, hi = bounds
+        values = np.round(np.arange(lo, hi + 1e-9, step), 2)
+        return np.unique(np.append(values, round(hi, 2)))
+    
+    @staticmethod
+    def _min_aisle(equipment_type):
+        """Largeur d'allée minimale imposée par la norme pour un équipement"""
+        norms = WarehouseCalculator.NORMS
+        return norms['min_aisle_width_forklift'] if equipment_type == 'forklift' else norms['min_aisle_width_pallet']
+    
+    @staticmethod
+    def _racks_per_row(params, rack_depth, aisle):
+        """Même formule que calculate_storage_capacity, vectorisée"""
+        usable_length = params['length'] - aisle - 4.0
+        return np.maximum(1, np.trunc(usable_length / (rack_depth + 1.0))).astype(np.int64)
+    
+    @staticmethod
+    def _rows_per_side(params, rack_width):
+        """Même formule que calculate_storage_capacity, vectorisée"""
+        usable_width = params['width'] - 2.0
+        return np.maximum(1, np.trunc(usable_width / (rack_width + 1.0))).astype(np.int64)
+    
+    @staticmethod
+    def _level_cap(params):
+        """Nombre de niveaux permis par la hauteur libre"""
+        return int(params['clear_height'] / (params['pallet_height'] + 0.3))
+    
+    @staticmethod
+    def class_codes(params, points, equipments):
+        """Code entier de la classe d'équivalence (racks_per_row, rows_per_side, levels, équipement)"""
+        rpr = LayoutOptimizer._racks_per_row(params, points['rack_depth'].to_numpy(float),
+                                             points['main_aisle_width'].to_numpy(float))
+        rps = LayoutOptimizer._rows_per_side(params, points['rack_width'].to_numpy(float))
+        levels = np.minimum(points['max_levels'].to_numpy(np.int64), LayoutOptimizer._level_cap(params))
+        equipment = pd.Categorical(points['equipment_type'], categories=list(equipments)).codes
+        return ((rpr * 10000 + rps) * 100 + levels) * 10 + equipment
+    
+    @staticmethod
+    def _grid_candidates(params, rack_widths, rack_depths, aisles, max_levels, equipments):
+        """Produit cartésien des représentants de chaque classe, axe par axe
+        
+        rows_per_side ne dépend que de rack_width, racks_per_row du couple
+        (rack_depth, allée) et levels de max_levels : on garde un représentant par
+        valeur entière sur chaque axe avant de croiser les axes.
+        """
+        # rack_width : plus grand module donnant chaque valeur de rows_per_side
+        rps = LayoutOptimizer._rows_per_side(params, rack_widths)
+        widths = pd.DataFrame({'rack_width': rack_widths, 'rps': rps}).groupby('rps')['rack_width'].max()
+        
+        # max_levels : au-delà du plafond de hauteur, tous les niveaux sont équivalents
+        levels = np.unique(np.minimum(max_levels, LayoutOptimizer._level_cap(params)))
+        
+        # (rack_depth, allée) : allées conformes à l'équipement, plus grand module puis plus large allée
+        blocks = []
+        for equipment in equipments:
+            feasible = aisles[aisles >= LayoutOptimizer._min_aisle(equipment) - 1e-9]
+            if not len(feasible):
+                continue
+            depth, aisle = np.meshgrid(rack_depths, feasible, indexing='ij')
+            block = pd.DataFrame({'rack_depth': depth.ravel(), 'main_aisle_width': aisle.ravel()})
+            block['rpr'] = LayoutOptimizer._racks_per_row(params, block['rack_depth'].to_numpy(),
+                                                          block['main_aisle_width'].to_numpy())
+            block = (block.sort_values(['rack_depth', 'main_aisle_width'], ascending=False)
+                     .drop_duplicates('rpr'))
+            block['equipment_type'] = equipment
+            blocks.append(block[['rack_depth', 'main_aisle_width', 'equipment_type']])
+        
+        if not blocks:
+            return pd.DataFrame(columns=['rack_width', 'rack_depth', 'main_aisle_width', 'max_levels', 'equipment_type'])
+        
+        candidates = (pd.concat(blocks, ignore_index=True)
+                      .merge(pd.DataFrame({'rack_width': widths.to_numpy()}), how='cross')
+                      .merge(pd.DataFrame({'max_levels': levels}), how='cross'))
+        return candidates[['rack_width', 'rack_depth', 'main_aisle_width', 'max_levels', 'equipment_type']]
+    
+    @staticmethod
+    def _distance_to_front(params, candidates, front):
+        """Distance (en nombre de racks / rangées / niveaux) de chaque candidat au point du front le plus proche"""
+        if front.empty:
+            return np.zeros(len(candidates))
+        rpr = LayoutOptimizer._racks_per_row(params, candidates['rack_depth'].to_numpy(float),
+                                             candidates['main_aisle_width'].to_numpy(float))
+        rps = LayoutOptimizer._rows_per_side(params, candidates['rack_width'].to_numpy(float))
+        levels = np.minimum(candidates['max_levels'].to_numpy(np.int64), LayoutOptimizer._level_cap(params))
+        distance = np.full(len(candidates), np.inf)
+        for _, point in front.iterrows():
+            gap = np.maximum.reduce([np.abs(rpr - point['racks_per_row']),
+                                     np.abs(rps - point['rows_per_side']),
+                                     np.abs(levels - point['levels'])])
+            distance = np.minimum(distance, gap)
+        return distance
+    
+    @staticmethod
+    def _evaluate(params, candidates):
+        """Évalue un lot de candidats avec le moteur vectorisé et les contrôles de conformité"""
+        configs = pd.DataFrame({k: v for k, v in params.items() if np.isscalar(v)}, index=candidates.index)
+        for column in candidates.columns:
+            configs[column] = candidates[column]
+        results = WarehouseCalculator.calculate_batch(configs)
+        checks = WarehouseCalculator.check_norms_batch(configs, results)
+        return pd.concat([candidates, results, checks], axis=1)
+    
+    @staticmethod
+    def pareto_front(evaluated):
+        """Points non dominés : maximiser total_pallets, minimiser cost_per_pallet"""
+        feasible = evaluated[evaluated['compliant'] & (evaluated['total_pallets'] > 0)]
+        ordered = feasible.sort_values(['total_pallets', 'cost_per_pallet'], ascending=[False, True])
+        costs = ordered['cost_per_pallet'].to_numpy()
+        best_before = np.concatenate([[np.inf], np.minimum.accumulate(costs)[:-1]])
+        return ordered[costs < best_before]
+    
+    @staticmethod
+    def optimize(params, search_space=None, time_budget=10.0, grid_step=None, resolution=None, progress=None):
+        """Balaye une grille grossière puis affine autour du front, dans le temps imparti (s)
+        
+        Retourne un dictionnaire avec le front de Pareto, l'ensemble des classes évaluées
+        et des statistiques de recherche. `progress(fraction)` est appelé après chaque
+        tranche du raffinement (part des classes ou du temps imparti, la plus avancée).
+        """
+        start = time.perf_counter()
+        missing = [k for k in LayoutOptimizer.REQUIRED if k not in params]
+        if missing:
+            raise ValueError(f"Paramètres manquants pour l'optimisation : {', '.join(missing)}")
+        
+        space = {**LayoutOptimizer.SEARCH_SPACE, **(search_space or {})}
+        grid_step = grid_step or LayoutOptimizer.GRID_STEP
+        resolution = resolution or LayoutOptimizer.RESOLUTION
+        
+        fine_axes = tuple(LayoutOptimizer._axis(space[name], resolution)
+                          for name in ('rack_width', 'rack_depth', 'main_aisle_width'))
+        coarse_axes = tuple(LayoutOptimizer._axis(space[name], grid_step)
+                            for name in ('rack_width', 'rack_depth', 'main_aisle_width'))
+        max_levels = list(range(int(space['max_levels'][0]), int(space['max_levels'][1]) + 1))
+        equipments = list(space['equipment_type'])
+        
+        # 1. Grille grossière réduite aux représentants de classes
+        grid_points = int(np.prod([len(a) for a in fine_axes]) * len(max_levels) * len(equipments))
+        candidates = LayoutOptimizer._grid_candidates(params, *coarse_axes, np.array(max_levels), equipments)
+        evaluated = LayoutOptimizer._evaluate(params, candidates.reset_index(drop=True))
+        front = LayoutOptimizer.pareto_front(evaluated)
+        
+        # 2. Raffinement : classes de la grille fine non encore évaluées, en partant du voisinage du front
+        refined = LayoutOptimizer._grid_candidates(params, *fine_axes, np.array(max_levels), equipments)
+        seen = LayoutOptimizer.class_codes(params, evaluated, equipments)
+        refined = refined[~np.isin(LayoutOptimizer.class_codes(params, refined, equipments), seen)]
+        order = np.argsort(LayoutOptimizer._distance_to_front(params, refined, front), kind='stable')
+        refined = refined.iloc[order].reset_index(drop=True)
+        
+        iterations = 0
+        complete = True
+        for chunk_start in range(0, len(refined), LayoutOptimizer.CHUNK_SIZE):
+            if time.perf_counter() - start > time_budget:
+                complete = False
+                break
+            chunk = refined.iloc[chunk_start:chunk_start + LayoutOptimizer.CHUNK_SIZE].reset_index(drop=True)
+            evaluated = pd.concat([evaluated, LayoutOptimizer._evaluate(params, chunk)], ignore_index=True)
+            front = LayoutOptimizer.pareto_front(evaluated)
+            iterations += 1
+            if progress is not None:
+                progress(min(1.0, max((chunk_start + len(chunk)) / len(refined),
+                                      (time.perf_counter() - start) / time_budget)))
+        
+        return {
+            'front': front[LayoutOptimizer.FRONT_COLUMNS].reset_index(drop=True),
+            'evaluated': evaluated,
+            'classes_evaluated': len(evaluated),
+            'points_skipped': grid_points - len(evaluated),
+            'iterations': iterations,
+            'elapsed': round(time.perf_counter() - start, 3),
+            'complete': complete,
+        }
@@ -0,0 +1,132 @@
+"""Rangement d'un mix de palettes dans les alvéoles des racks (comptes par type, sans objet par palette)"""
+import math
+
+import numpy as np
+
+
+# Empreinte des palettes de l'étape 2 (m) : petit côté, grand côté
+PALLET_TYPES = {
+    'EUR (800×1200)': (0.8, 1.2),
+    'US (1000×1200)': (1.0, 1.2),
+    'Demi-palette': (0.6, 0.8),
+    'Conteneur': (1.0, 1.2),
+}
+
+SIDE_CLEARANCE = 0.075    # Jeu entre charges et entre charge et échelle (m, EN 15620)
+OVERHANG = 0.05           # Débord admis à l'avant et à l'arrière des lisses (m)
+LEVEL_CLEARANCE = 0.3     # Lisse et dégagement au-dessus de la charge (m), comme pour les niveaux
+REFERENCE_PALLETS = 1000000   # Stock de référence pour le remplissage moyen d'une travée
+
+
+def default_mix(params):
+    """Mix d'une seule palette : type et hauteur saisis à l'étape 2"""
+    return [{'pallet_type': params.get('pallet_type', 'EUR (800×1200)'), 'share': 100.0,
+             'height': params.get('pallet_height', 1.2)}]
+
+
+class PalletPacker:
+    """Palettes de plusieurs types dans des travées de rack (lisses de rack_width, profondeur rack_depth)
+    
+    Chaque niveau de lisse reçoit un seul type de palette, dans l'orientation qui en
+    place le plus ; sa hauteur est celle de la charge plus LEVEL_CLEARANCE. Les niveaux
+    sont ensuite empilés dans les travées par « first-fit decreasing » sur les hauteurs :
+    les niveaux les plus hauts d'abord, puis les plus bas dans la hauteur restante.
+    
+    Le rangement travaille sur des comptes par type : une travée remplie est répétée
+    autant de fois que les stocks restants le permettent. Le nombre d'itérations dépend
+    du nombre de types et de niveaux, jamais du nombre de palettes.
+    """
+    
+    def __init__(self, params, mix=None):
+        self.params = params
+        mix = mix or params.get('pallet_mix') or default_mix(params)
+        mix = [m for m in mix if m.get('share', 0) > 0]
+        if not mix:
+            raise ValueError("Le mix de palettes est vide")
+        self.types = [m['pallet_type'] for m in mix]
+        shares = np.array([float(m['share']) for m in mix])
+        self.shares = shares / shares.sum()
+        self.heights = np.array([float(m.get('height') or params.get('pallet_height', 1.2)) for m in mix])
+        self.level_heights = self.heights + LEVEL_CLEARANCE
+    
+    def slots(self, deep=1):
+        """Palettes par niveau de lisse pour chaque type (meilleure des deux orientations)"""
+        beam, depth = self.params['rack_width'], self.params['rack_depth'] + 2 * OVERHANG
+        footprint = np.array([PALLET_TYPES.get(t, PALLET_TYPES['EUR (800×1200)']) for t in self.types])
+        best = np.zeros(len(self.types), dtype=np.int64)
+        for face, length in ((footprint[:, 0], footprint[:, 1]), (footprint[:, 1], footprint[:, 0])):
+            across = np.floor((beam - SIDE_CLEARANCE) / (face + SIDE_CLEARANCE) + 1e-9)
+            behind = np.floor(depth / length + 1e-9)
+            best = np.maximum(best, (np.maximum(across, 0) * behind).astype(np.int64))
+        return best * deep
+    
+    def unfit(self, height_limit=None, deep=1):
+        """Types de palette qu'aucun niveau ne peut recevoir (lisse trop courte ou hauteur insuffisante)"""
+        height_limit = self.params['clear_height'] if height_limit is None else height_limit
+        fits = (self.slots(deep) > 0) & (self.level_heights <= height_limit)
+        return [t for t, ok in zip(self.types, fits) if not ok]
+    
+    def pack(self, counts, height_limit=None, max_levels=None, deep=1):
+        """Travées nécessaires pour ranger `counts` palettes par type (ordre du mix)
+        
+        Retourne les travées, le motif de chaque groupe de travées identiques (niveaux
+        par type et nombre de répétitions) et, par type, niveaux et emplacements occupés.
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        height_limit = self.params['clear_height'] if height_limit is None else height_limit
+        max_levels = int(self.params.get('max_levels', 3) if max_levels is None else max_levels)
+        slots = self.slots(deep)
+        storable = (slots > 0) & (self.level_heights <= height_limit)
+        needed = np.where(storable, -(-counts // np.maximum(slots, 1)), 0)
+        remaining = needed.copy()
+        order = np.argsort(-self.level_heights, kind='stable')
+        
+        patterns = []
+        while max_levels > 0 and remaining.any():
+            # Une travée en first-fit decreasing : niveaux les plus hauts d'abord
+            pattern = np.zeros(len(remaining), dtype=np.int64)
+            free_height, free_levels = height_limit, max_levels
+            for t in order:
+                if remaining[t] and free_levels:
+                    k = min(int(remaining[t]), int((free_height + 1e-9) // self.level_heights[t]), free_levels)
+                    pattern[t] = k
+                    free_height -= k * self.level_heights[t]
+                    free_levels -= k
+            used = pattern > 0
+            repeats = int((remaining[used] // pattern[used]).min())
+            remaining -= pattern * repeats
+            patterns.append({'levels': pattern.tolist(), 'bays': repeats})
+        
+        bays = sum(p['bays'] for p in patterns)
+        return {
+            'bays': bays,
+            'patterns': patterns,
+            'levels': needed.tolist(),
+            'positions': (needed * slots).tolist(),
+            'unstorable': int(counts[~storable].sum()),
+            'slots': slots.tolist(),
+        }
+    
+    def bay_capacity(self, height_limit=None, max_levels=None, deep=1):
+        """Emplacements et niveaux d'une travée moyenne remplie avec le mix (stock de référence)"""
+        counts = np.round(self.shares * REFERENCE_PALLETS).astype(np.int64)
+        packed = self.pack(counts, height_limit, max_levels, deep)
+        if not packed['bays']:
+            return {'positions': 0.0, 'levels': 0.0, 'shares': np.zeros(len(self.types))}
+        positions = np.asarray(packed['positions'], dtype=float)
+        return {
+            'positions': positions.sum() / packed['bays'],
+            'levels': sum(packed['levels']) / packed['bays'],
+            # Part de chaque type dans les emplacements rangés (nulle pour un type hors gabarit)
+            'shares': positions / positions.sum(),
+        }
+    
+    def positions(self, bays, height_limit=None, max_levels=None, deep=1):
+        """Emplacements offerts par `bays` travées et leur répartition par type de palette"""
+        capacity = self.bay_capacity(height_limit, max_levels, deep)
+        total = int(math.floor(bays * capacity['positions'] + 1e-9))
+        return {
+            'positions': total,
+            'levels': capacity['levels'],
+            'by_type': dict(zip(self.types, np.floor(total * capacity['shares']).astype(np.int64).tolist())),
+        }
@@ -0,0 +1,208 @@
+"""Plan de croissance pluriannuel : quand ajouter des niveaux de racks et des équipements"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from .cache import CachedCalculator
+from .calculator import WarehouseCalculator
+
+
+MAX_LEVELS = 10               # Niveaux envisagés au plus (curseur de l'étape 2)
+DISCOUNT_RATE = 0.08          # Taux d'actualisation annuel
+RACK_PROJECT_COST = 25000.0   # Coût fixe d'un chantier d'extension des racks (€)
+EQUIPMENT_ORDER_COST = 5000.0  # Coût fixe d'une commande d'équipements (mise en service, formation, €)
+OVERFLOW_COST = 120.0         # Palette stockée à l'extérieur faute de place (€/palette/an)
+
+
+def growth_forecast(start, growth, years):
+    """Prévision de stock (palettes) à croissance annuelle constante (`growth` en %)"""
+    return [int(round(start * (1 + growth / 100.0) ** year)) for year in range(years)]
+
+
+def _grow(costs, unit_cost, fixed):
+    """Meilleur coût d'arrivée dans chaque état le long de l'axe 0 (valeurs croissantes)
+    
+    Rester coûte 0 ; passer de i à j > i coûte unit_cost[j] - unit_cost[i] + fixed.
+    """
+    shifted = costs - unit_cost[:, None]
+    grown = np.full_like(costs, np.inf)
+    grown[1:] = np.minimum.accumulate(shifted, axis=0)[:-1]
+    return np.minimum(costs, grown + unit_cost[:, None] + fixed)
+
+
+class GrowthPlanner:
+    """Niveaux installés et parc d'équipements année par année, au moindre coût actualisé
+    
+    L'état d'une année est (niveaux installés, équipements) ; il ne peut que croître.
+    Une année coûte ses investissements (emplacements et équipements ajoutés, plus
+    RACK_PROJECT_COST par chantier de racks et EQUIPMENT_ORDER_COST par commande
+    d'équipements) et son exploitation (maintenance,
+    personnel, énergie, palettes stockées à l'extérieur au-delà de la capacité), avec
+    les taux de WarehouseCalculator.COSTS. Un parc inférieur au besoin de flux est exclu.
+    
+    La programmation dynamique porte sur la grille niveaux × parcs : le meilleur
+    prédécesseur de chaque état s'obtient par minimums cumulés sur les deux axes, sans
+    boucle sur les transitions. Seuls les parcs égaux au besoin maximal d'une année à
+    venir sont candidats (acheter entre deux ne fait que coûter plus tôt), soit
+    O(années² × niveaux) quel que soit le nombre d'équipements. Les capacités par
+    nombre de niveaux viennent du CachedCalculator et sont partagées par tous les scénarios.
+    """
+    
+    def __init__(self, params, calculator=None, layout=False, daily_capacity=None,
+                 discount_rate=DISCOUNT_RATE, overflow_cost=OVERFLOW_COST):
+        self.params = params
+        self.calculator = calculator if calculator is not None else CachedCalculator()
+        self.discount_rate = discount_rate
+        self.overflow_cost = overflow_cost
+        
+        # Capacité pour chaque nombre de niveaux (0 = bâtiment vide), calculs mis en cache
+        physical = int(params['clear_height'] / (params['pallet_height'] + 0.3))
+        self.max_levels = max(1, min(MAX_LEVELS, physical))
+        compute = self.calculator.generate_layout if layout else self.calculator.calculate_storage_capacity
+        capacities = [compute({**params, 'max_levels': levels}) for levels in range(1, self.max_levels + 1)]
+        if not all(capacities):
+            raise ValueError("Capacité non calculable pour ces paramètres")
+        self.racks = np.array([0] + [c['total_racks'] for c in capacities])
+        self.positions = np.array([0] + [c['total_positions'] for c in capacities], dtype=float)
+        self.pallets = np.array([0] + [c['total_pallets'] for c in capacities], dtype=float)
+        
+        # Capacité journalière d'un équipement (indépendante du stock)
+        if daily_capacity is None:
+            circulation = self.calculator.calculate_circulation(params, capacities[-1])
+            daily_capacity = circulation.get('daily_capacity', 0)
+        self.daily_capacity = float(daily_capacity)
+    
+    def required_equipment(self, forecast):
+        """Équipements nécessaires chaque année pour le flux stock / rotation"""
+        throughput = np.asarray(forecast, dtype=float) / self.params.get('stock_rotation', 30.0)
+        if self.daily_capacity <= 0:
+            return np.ones(len(throughput), dtype=np.int64)
+        return np.maximum(1, np.ceil(throughput / self.daily_capacity)).astype(np.int64)
+    
+    def plan(self, forecast):
+        """Plan optimal pour une prévision de stock (palettes par année)
+        
+        Retourne le détail par année (état, ajouts, coûts en k€) et un résumé : coût
+        total actualisé et années des chantiers de racks et des achats d'équipements.
+        """
+        start = time.perf_counter()
+        forecast = np.asarray(forecast, dtype=float)
+        years = len(forecast)
+        if not years:
+            raise ValueError("La prévision est vide")
+        params, rates = self.params, WarehouseCalculator.COSTS
+        
+        required = self.required_equipment(forecast)
+        equipment = np.unique(np.concatenate([[0], np.maximum.accumulate(required)]))
+        unit_equipment = WarehouseCalculator.EQUIPMENT_COSTS.get(params.get('equipment_type', 'forklift'),
+                                                                 rates['default_equipment'])
+        area = params['length'] * params['width']
+        build = 1 + rates['installation_rate']
+        rack_cost = self.positions * rates['rack_per_position'] * build          # Par niveau installé
+        equipment_cost = equipment * unit_equipment * build                      # Par parc
+        investment = (rack_cost + area * rates['area_per_m2'] * build)[:, None] + equipment_cost[None, :]
+        personnel = equipment * rates['operators_per_equipment'] * rates['operator_salary']
+        discount = (1 + self.discount_rate) ** -np.arange(years)
+        
+        # Coût cumulé du meilleur chemin jusqu'à chaque état (niveaux × équipements)
+        costs = np.empty((years, len(self.positions), len(equipment)))
+        previous = np.full(costs.shape[1:], np.inf)
+        previous[0, 0] = 0.0
+        for year in range(years):
+            d = discount[year]
+            # Transitions séparables : achats d'équipements, puis chantier de racks
+            best = _grow(previous.T, d * equipment_cost, d * EQUIPMENT_ORDER_COST).T
+            best = _grow(best, d * rack_cost, d * RACK_PROJECT_COST)
+            if year == 0:
+                best += d * area * rates['area_per_m2'] * build       # Bâtiment construit la première année
+            
+            overflow = np.maximum(0.0, forecast[year] - self.pallets) * self.overflow_cost
+            operating = (investment * rates['maintenance_rate'] + personnel[None, :]
+                         + area * rates['energy_per_m2'] + overflow[:, None])
+            operating[:, equipment < required[year]] = np.inf
+            costs[year] = best + d * operating
+            previous = costs[year]
+        
+        # Remontée du chemin : l'état final le moins cher, puis le prédécesseur de chaque année
+        levels_path = np.empty(years, dtype=np.int64)
+        equipment_path = np.empty(years, dtype=np.int64)
+        state = np.unravel_index(np.argmin(costs[-1]), costs.shape[1:])
+        for year in range(years - 1, -1, -1):
+            levels_path[year], equipment_path[year] = state
+            if year:
+                state = self._predecessor(costs, year, state, discount[year], rack_cost, equipment_cost,
+                                          investment, personnel, area, forecast[year], required[year])
+        
+        return self._report(forecast, required, levels_path, equipment_path, costs, discount,
+                            rack_cost, equipment_cost, investment, personnel, area, equipment, start)
+    
+    def _operating(self, investment, personnel, area, levels, units, demand):
+        """Coût d'exploitation annuel d'un état (€)"""
+        rates = WarehouseCalculator.COSTS
+        overflow = max(0.0, demand - self.pallets[levels]) * self.overflow_cost
+        return (investment[levels, units] * rates['maintenance_rate'] + personnel[units]
+                + area * rates['energy_per_m2'] + overflow)
+    
+    def _predecessor(self, costs, year, state, d, rack_cost, equipment_cost, investment, personnel, area,
+                     demand, required):
+        """État de l'année précédente menant à `state` au coût retenu"""
+        levels, units = state
+        step = costs[year][levels, units] - d * self._operating(investment, personnel, area, levels, units, demand)
+        before = costs[year - 1][:levels + 1, :units + 1]
+        added = (d * (rack_cost[levels] - rack_cost[:levels + 1])[:, None]
+                 + d * (equipment_cost[units] - equipment_cost[:units + 1])[None, :])
+        added[:levels] += d * RACK_PROJECT_COST
+        added[:, :units] += d * EQUIPMENT_ORDER_COST
+        total = before + added
+        return np.unravel_index(np.argmin(np.abs(total - step)), total.shape)
+    
+    def _report(self, forecast, required, levels, units, costs, discount, rack_cost, equipment_cost,
+                investment, personnel, area, fleet, start):
+        """Détail par année du chemin retenu (`units` : indices dans `fleet`)"""
+        rates = WarehouseCalculator.COSTS
+        prior_levels = np.concatenate([[0], levels[:-1]])
+        prior_units = np.concatenate([[0], units[:-1]])
+        capex = (rack_cost[levels] - rack_cost[prior_levels] + (levels > prior_levels) * RACK_PROJECT_COST
+                 + equipment_cost[units] - equipment_cost[prior_units]
+                 + (units > prior_units) * EQUIPMENT_ORDER_COST)
+        capex[0] += area * rates['area_per_m2'] * (1 + rates['installation_rate'])
+        opex = np.array([self._operating(investment, personnel, area, l, e, f)
+                         for l, e, f in zip(levels, units, forecast)])
+        stored = np.minimum(forecast, self.pallets[levels])
+        
+        years = pd.DataFrame({
+            'year': np.arange(1, len(forecast) + 1),
+            'demand': forecast.astype(np.int64),
+            'levels': levels,
+            'racks': self.racks[levels],
+            'positions': self.positions[levels].astype(np.int64),
+            'pallets': self.pallets[levels].astype(np.int64),
+            'overflow': np.maximum(0, forecast - self.pallets[levels]).astype(np.int64),
+            'required_equipment': required,
+            'equipment': fleet[units],
+            'added_levels': levels - prior_levels,
+            'added_equipment': fleet[units] - fleet[prior_units],
+            'capex': np.round(capex / 1000.0, 1),
+            'opex': np.round(opex / 1000.0, 1),
+            'cost_per_pallet': np.round(np.where(stored > 0, opex / np.maximum(stored, 1), 0.0), 2),
+        })
+        return {
+            'years': years,
+            'summary': {
+                'years': len(forecast),
+                'npv': round(float(costs[-1][levels[-1], units[-1]]) / 1000.0, 1),
+                'capex': round(float(capex.sum()) / 1000.0, 1),
+                'rack_projects': [int(y) for y in years['year'][years['added_levels'] > 0]],
+                'equipment_purchases': [int(y) for y in years['year'][years['added_equipment'] > 0]],
+                'final_levels': int(levels[-1]),
+                'final_equipment': int(fleet[units[-1]]),
+                'overflow_years': int((years['overflow'] > 0).sum()),
+                'elapsed': round(time.perf_counter() - start, 4),
+            },
+        }
+    
+    def plan_scenarios(self, forecasts):
+        """Plans de plusieurs prévisions {nom: palettes par année} ; capacités calculées une seule fois"""
+        plans = {name: self.plan(forecast) for name, forecast in forecasts.items()}
+        return pd.DataFrame({name: plan['summary'] for name, plan in plans.items()}).T, plans
@@ -0,0 +1,286 @@
+"""Regroupement des lignes de commande en tournées de préparation et calcul de leurs parcours"""
+import time
+
+import numpy as np
+import pandas as pd
+
+
+PICK_TIME = 20.0            # Prélèvement d'une ligne, déplacement exclu (s)
+TOUR_SETUP = 60.0           # Début et fin de tournée : liste, chariot, dépose au quai (s)
+
+ROUTING_POLICIES = {
+    's_shape': "S-shape : allées parcourues en serpentin",
+    'largest_gap': "Plus grand écart : allées visitées par leurs deux extrémités",
+}
+BATCHING_RULES = {
+    'fifo': "Ordre d'arrivée des commandes",
+    'proximity': "Proximité : commandes triées par allée moyenne",
+}
+
+# Colonnes reconnues dans le fichier de lignes de commande
+ORDER_COLUMNS = {
+    'order': "Identifiant de la commande",
+    'sku': "Référence prélevée (emplacement donné par le slotting)",
+    'location': "Emplacement (indice DistanceTable), à la place de sku",
+}
+
+TWO_OPT_MAX_STOPS = 60      # Au-delà, la tournée garde l'ordre de la politique (coût quadratique)
+TWO_OPT_CELLS = 2000000     # Cellules (tournées × arrêts²) traitées par paquet 2-opt
+TWO_OPT_MAX_PASSES = 200
+
+
+class PickingPlanner:
+    """Tournées de préparation sur le réseau d'allées du plan (DistanceTable)
+    
+    Les commandes sont regroupées en tournées bornées en commandes et en lignes, puis
+    chaque tournée reçoit l'ordre de visite de la politique choisie : un simple tri de
+    toutes les lignes de la journée. Les distances entre arrêts successifs sont lues
+    en bloc dans la DistanceTable ; l'amélioration 2-opt facultative traite ensemble
+    les tournées de même longueur.
+    
+    Blocs et rangs de balayage des allées viennent de la table (bloc droit puis bloc
+    gauche sur la grille simplifiée, tronçons entre allées transversales sur
+    l'implantation multi-allées) ; l'extrémité proche d'une allée est la seconde
+    de `aisle_ends`.
+    """
+    
+    def __init__(self, params, distances, orders_per_batch=8, lines_per_batch=40,
+                 batching='proximity', policy='s_shape', two_opt=False):
+        if policy not in ROUTING_POLICIES:
+            raise ValueError(f"Politique de parcours inconnue : {policy}")
+        if batching not in BATCHING_RULES:
+            raise ValueError(f"Règle de regroupement inconnue : {batching}")
+        self.params = params
+        self.distances = distances
+        self.orders_per_batch = max(1, int(orders_per_batch))
+        self.lines_per_batch = max(1, int(lines_per_batch))
+        self.batching = batching
+        self.policy = policy
+        self.two_opt = two_opt
+        
+        # Bloc et rang de balayage de l'allée de chaque emplacement
+        aisle = distances.location_aisle
+        self.block = distances.aisle_block[aisle]
+        self.sweep = distances.aisle_sweep[aisle]
+    
+    def locate(self, lines, slotting=None, seed=0):
+        """Emplacement de chaque ligne (-1 si inconnu)
+        
+        Colonne location, sinon sku placée par le slotting ; sans slotting, chaque
+        référence reçoit un emplacement tiré au hasard (rangement aléatoire).
+        """
+        if 'location' in lines:
+            location = lines['location'].to_numpy(dtype=np.int64)
+        elif 'sku' in lines:
+            if slotting:
+                assigned = slotting['skus'].drop_duplicates('sku')
+                found = pd.Index(assigned['sku']).get_indexer(lines['sku'])
+                location = np.where(found >= 0, assigned['location'].to_numpy()[found], -1)
+            else:
+                codes, uniques = pd.factorize(lines['sku'])
+                placed = np.random.default_rng(seed).integers(0, self.distances.locations, len(uniques))
+                location = np.where(codes >= 0, placed[codes], -1)
+        else:
+            raise ValueError("Colonne sku ou location manquante dans les lignes de commande")
+        return np.where((location >= 0) & (location < self.distances.locations), location, -1)
+    
+    def batch(self, orders, location):
+        """Numéro de tournée de chaque ligne (commandes entières, tournées numérotées à partir de 0)"""
+        codes, uniques = pd.factorize(orders)
+        sizes = np.bincount(codes, minlength=len(uniques))
+        if self.batching == 'proximity':
+            mean_sweep = np.bincount(codes, weights=self.sweep[location], minlength=len(uniques)) / sizes
+            sequence = np.argsort(mean_sweep, kind='stable')
+        else:
+            sequence = np.arange(len(uniques))
+        
+        # Remplissage glouton : une boucle sur les commandes (pas sur les lignes)
+        tour_of_order = [0] * len(uniques)
+        tour = count = filled = 0
+        for o, size in zip(sequence.tolist(), sizes[sequence].tolist()):
+            if count and (count >= self.orders_per_batch or filled + size > self.lines_per_batch):
+                tour += 1
+                count = filled = 0
+            tour_of_order[o] = tour
+            count += 1
+            filled += size
+        return np.asarray(tour_of_order, dtype=np.int64)[codes]
+    
+    def sequence(self, tour, location):
+        """Ordre de visite de toutes les lignes (permutation), tournée par tournée"""
+        block, sweep, x = self.block[location], self.sweep[location], self.distances.location_x[location]
+        by_aisle = np.lexsort((x, sweep, tour))
+        t, b, s, xs = tour[by_aisle], block[by_aisle], sweep[by_aisle], x[by_aisle]
+        
+        # Rang de l'allée dans le bloc de la tournée, et nombre d'allées visitées dans ce bloc
+        new_group = np.r_[True, (t[1:] != t[:-1]) | (b[1:] != b[:-1])]
+        new_aisle = new_group | np.r_[False, s[1:] != s[:-1]]
+        aisles = np.cumsum(new_aisle)
+        rank = aisles - np.maximum.accumulate(np.where(new_group, aisles, 0))
+        group = np.cumsum(new_group) - 1
+        visited = np.maximum.reduceat(rank, np.flatnonzero(new_group))[group] + 1
+        
+        if self.policy == 's_shape':
+            # Allées paires entrées par l'extrémité proche (x décroissant), impaires par l'autre
+            direction = np.where(rank % 2 == 0, -1.0, 1.0)
+            return by_aisle[np.lexsort((direction * xs, s, b, t))]
+        
+        # Plus grand écart : première et dernière allées traversées, les autres visitées
+        # depuis chaque extrémité sans franchir le plus grand intervalle entre prélèvements
+        far, near = self.distances.aisle_ends[self.distances.location_aisle[location[by_aisle]]].T
+        start = np.flatnonzero(new_aisle)
+        aisle_id = aisles - 1
+        gap_before = np.where(new_aisle, xs - far, np.r_[0.0, np.diff(xs)])
+        widest = np.maximum.reduceat(gap_before, start)[aisle_id]
+        last = np.r_[start[1:], len(xs)] - 1
+        near_gap = (near - xs)[last][aisle_id]
+        split = (gap_before == widest) & (widest > near_gap)
+        cut = np.cumsum(split)
+        near_part = cut - np.r_[0, cut][start][aisle_id] > 0
+        
+        first_aisle = rank == 0
+        last_aisle = (rank == visited - 1) & ~first_aisle
+        phase = np.where(first_aisle, 0, np.where(last_aisle, 2, np.where(near_part, 3, 1)))
+        aisle_key = np.where(phase == 3, -s, s)
+        x_key = np.where((phase == 0) | (phase == 3), -xs, xs)
+        return by_aisle[np.lexsort((x_key, aisle_key, phase, b, t))]
+    
+    def docks(self, tour, location, tours):
+        """Quai de chaque tournée : celui qui minimise la somme des distances à ses emplacements"""
+        total = np.array([np.bincount(tour, weights=self.distances.matrix[d, location], minlength=tours)
+                          for d in range(self.distances.docks)])
+        return total.argmin(axis=0)
+    
+    def lengths(self, tour, location, dock, tours):
+        """Longueur de chaque tournée (m), lignes dans l'ordre de visite"""
+        same = tour[1:] == tour[:-1]
+        inner = self.distances.between(location[:-1][same], location[1:][same])
+        length = np.bincount(tour[:-1][same], weights=inner, minlength=tours)
+        first = np.flatnonzero(np.r_[True, ~same])
+        last = np.r_[first[1:], len(tour)] - 1
+        matrix = self.distances.matrix
+        return length + matrix[dock, location[first]] + matrix[dock, location[last]]
+    
+    def improve(self, order, tour, location, dock, progress=None):
+        """Amélioration 2-opt des tournées de 3 à TWO_OPT_MAX_STOPS arrêts (ordre modifié en place)
+        
+        Les tournées de même longueur n forment des tableaux (tournées × n) : à chaque
+        passe, toutes reçoivent en même temps leur meilleure inversion de segment.
+        `progress(fraction)` est appelé après chaque paquet de tournées.
+        """
+        tours_sorted = tour[order]
+        first = np.flatnonzero(np.r_[True, tours_sorted[1:] != tours_sorted[:-1]])
+        size = np.diff(np.r_[first, len(order)])
+        sizes = np.unique(size[(size >= 3) & (size <= TWO_OPT_MAX_STOPS)]).tolist()
+        for k, n in enumerate(sizes):
+            same = np.flatnonzero(size == n)
+            step = max(1, TWO_OPT_CELLS // (n + 2) ** 2)
+            for chunk in range(0, len(same), step):
+                ids = same[chunk:chunk + step]
+                positions = first[ids][:, None] + np.arange(n)
+                lines = order[positions]
+                best = self._two_opt(location[lines], dock[tours_sorted[first[ids]]])
+                order[positions] = np.take_along_axis(lines, best, axis=1)
+                if progress is not None:
+                    progress((k + (chunk + len(ids)) / len(same)) / len(sizes))
+    
+    def _two_opt(self, stops, dock):
+        """Meilleur ordre des arrêts (tournées × n) ; le quai occupe les positions 0 et n + 1"""
+        count, n = stops.shape
+        matrix = self.distances.matrix
+        dist = np.zeros((count, n + 2, n + 2))
+        dist[:, 1:-1, 1:-1] = self.distances.between(stops[:, :, None], stops[:, None, :])
+        dist[:, 0, 1:-1] = dist[:, -1, 1:-1] = matrix[dock[:, None], stops]
+        dist[:, 1:-1, 0] = dist[:, 1:-1, -1] = dist[:, 0, 1:-1]
+        
+        route = np.tile(np.arange(n + 2), (count, 1))
+        upper = np.triu(np.ones((n, n), dtype=bool), k=1)
+        index = np.arange(n + 2)
+        active = np.arange(count)
+        for _ in range(TWO_OPT_MAX_PASSES):
+            r, d = route[active], dist[active]
+            rows = np.arange(len(active))[:, None, None]
+            # Inversion du segment [i, j] : arêtes (i-1, i) et (j, j+1) remplacées par (i-1, j) et (i, j+1)
+            edge = d[rows[:, :, 0], r[:, :-1], r[:, 1:]]
+            delta = (d[rows, r[:, :n, None], r[:, None, 1:n + 1]] + d[rows, r[:, 1:n + 1, None], r[:, None, 2:]]
+                     - edge[:, :n, None] - edge[:, None, 1:])
+            delta = np.where(upper, delta, 0.0).reshape(len(active), -1)
+            move = delta.argmin(axis=1)
+            better = delta[np.arange(len(active)), move] < -1e-9
+            if not better.any():
+                break
+            active, move = active[better], move[better]
+            i, j = move // n + 1, move % n + 1
+            reverse = (index >= i[:, None]) & (index <= j[:, None])
+            route[active] = np.take_along_axis(route[active], np.where(reverse, (i + j)[:, None] - index, index), axis=1)
+        return route[:, 1:-1] - 1
+    
+    def run(self, lines, slotting=None, seed=0, progress=None):
+        """Tournées d'une journée de lignes de commande (DataFrame order, sku | location)
+        
+        Retourne les lignes dans l'ordre de visite, le détail des tournées et un résumé :
+        distance parcourue, lignes par heure de préparateur et préparateurs nécessaires.
+        `progress(fraction)` est appelé après chaque étape (et chaque paquet du 2-opt).
+        """
+        def report(fraction):
+            if progress is not None:
+                progress(fraction)
+        
+        start_clock = time.perf_counter()
+        if 'order' not in lines:
+            raise ValueError("Colonne order manquante dans les lignes de commande")
+        location = self.locate(lines, slotting, seed)
+        located = location >= 0
+        orders = lines['order'].to_numpy()[located]
+        location = location[located]
+        if not len(location):
+            raise ValueError("Aucune ligne de commande n'a d'emplacement connu")
+        report(0.2)
+        
+        tour = self.batch(orders, location)
+        tours = int(tour.max()) + 1
+        dock = self.docks(tour, location, tours)
+        report(0.4)
+        order = self.sequence(tour, location)
+        report(0.5)
+        if self.two_opt:
+            self.improve(order, tour, location, dock, progress=lambda fraction: report(0.5 + 0.45 * fraction))
+        tour, location, orders = tour[order], location[order], orders[order]
+        length = self.lengths(tour, location, dock, tours)
+        
+        speed = self.params.get('equipment_speed', 10.0) * 1000.0 / 3600.0
+        line_count = np.bincount(tour, minlength=tours)
+        order_count = pd.Series(orders).groupby(tour).nunique().to_numpy()
+        duration = length / speed + line_count * PICK_TIME + TOUR_SETUP
+        hours = float(duration.sum()) / 3600.0
+        first = np.flatnonzero(np.r_[True, tour[1:] != tour[:-1]])
+        
+        return {
+            'lines': pd.DataFrame({
+                'tour': tour,
+                'stop': np.arange(len(tour)) - np.repeat(first, line_count),
+                'order': orders,
+                'location': location,
+            }),
+            'tours': pd.DataFrame({
+                'tour': np.arange(tours),
+                'dock': dock,
+                'orders': order_count,
+                'lines': line_count,
+                'distance': np.round(length, 1),
+                'duration': np.round(duration / 60.0, 2),
+            }),
+            'summary': {
+                'lines': len(tour),
+                'unlocated': int((~located).sum()),
+                'orders': int(pd.Series(orders).nunique()),
+                'tours': tours,
+                'distance_km': round(float(length.sum()) / 1000.0, 1),
+                'distance_per_line': round(float(length.sum()) / len(tour), 1),
+                'mean_tour': round(float(length.mean()), 1),
+                'picks_per_hour': round(len(tour) / hours, 1) if hours else 0.0,
+                'picker_hours': round(hours, 1),
+                'pickers': int(np.ceil(hours / self.params.get('operating_hours', 16.0))),
+                'elapsed': round(time.perf_counter() - start_clock, 3),
+            },
+        }
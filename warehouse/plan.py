@@ -0,0 +1,372 @@
+"""Plan d'implantation 2D : géométrie vectorisée et rendu mis en cache"""
+from io import BytesIO
+
+import numpy as np
+import plotly.graph_objects as go
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Patch, Rectangle
+
+from .cache import params_key
+from .geometry import EXIT_WIDTH, MANEUVER_DEPTH, QUAI_HEIGHT, QUAI_WIDTH, plan_geometry, plan_layout
+from .layout import POST_SIZE, LayoutGenerator
+from .layout import LAYOUT_INPUTS as ZONE_INPUTS
+from .profiling import profiled, timer
+
+
+# Entrées qui déterminent entièrement le dessin (clé du cache d'images)
+LAYOUT_INPUTS = ('length', 'width', 'rack_width', 'rack_depth', 'main_aisle_width',
+                 'racks_per_row', 'rows_per_side', 'dock_doors', 'view')
+
+# Niveau de détail : au-delà de ce nombre de racks visibles, une bande par rangée
+LOD_RACK_THRESHOLD = 4000
+MAX_ROW_LABELS = 40  # Étiquettes de comptage par côté en vue agrégée
+
+# Vue interactive : au-delà, bandes par rangée plutôt que racks individuels
+WEBGL_RACK_LIMIT = 200000
+
+
+def _index_range(origin, pitch, size, count, lo, hi):
+    """Plage [first, last) des modules origin + k * pitch (de taille size) qui coupent [lo, hi]"""
+    if pitch <= 0:
+        return 0, count
+    first = min(count, max(0, int(np.floor((lo - origin - size) / pitch)) + 1))
+    last = min(count, max(0, int(np.ceil((hi - origin) / pitch))))
+    return first, max(first, last)
+
+
+def visible_racks(layout, geometry, side):
+    """Plages d'indices (colonnes, rangées) des racks d'un côté visibles dans la vue"""
+    if layout.get('view') is None:
+        return (0, layout['racks_per_row']), (0, layout['rows_per_side'])
+    x0, x1, y0, y1 = layout['view']
+    columns = _index_range(geometry['origin_x'][side], geometry['pitch_x'], layout['rack_depth'],
+                           layout['racks_per_row'], x0, x1)
+    rows = _index_range(geometry['origin_y'], geometry['pitch_y'], layout['rack_width'],
+                        layout['rows_per_side'], y0, y1)
+    return columns, rows
+
+
+def rack_origins(geometry, side, columns, rows):
+    """Coins bas-gauche des racks des plages données, calculés en bloc"""
+    i, j = np.meshgrid(np.arange(*columns), np.arange(*rows), indexing='ij')
+    return np.column_stack([(geometry['origin_x'][side] + i * geometry['pitch_x']).ravel(),
+                            (geometry['origin_y'] + j * geometry['pitch_y']).ravel()])
+
+
+def row_blocks(layout, geometry, side, columns, rows):
+    """Sommets (n, 4, 2) d'une bande par rangée couvrant les colonnes données"""
+    x_start = geometry['origin_x'][side] + columns[0] * geometry['pitch_x']
+    x_end = geometry['origin_x'][side] + (columns[1] - 1) * geometry['pitch_x'] + layout['rack_depth']
+    y = geometry['origin_y'] + np.arange(*rows) * geometry['pitch_y']
+    vertices = np.empty((len(y), 4, 2))
+    vertices[:, :, 0] = [x_start, x_end, x_end, x_start]
+    vertices[:, :, 1] = y[:, None] + np.array([0.0, 0.0, layout['rack_width'], layout['rack_width']])
+    return vertices
+
+
+def rack_vertices(origins, rack_depth, rack_width):
+    """Sommets (n, 4, 2) des rectangles de racks pour une PolyCollection"""
+    offsets = np.array([[0.0, 0.0], [rack_depth, 0.0], [rack_depth, rack_width], [0.0, rack_width]])
+    return origins[:, None, :] + offsets[None, :, :]
+
+
+@profiled('build_plan_figure')
+def build_plan_figure(layout):
+    """Construit la figure du plan (racks dessinés en collections, sans pyplot)
+    
+    Au-delà de LOD_RACK_THRESHOLD racks visibles, chaque rangée est dessinée comme une
+    seule bande étiquetée : le coût du rendu dépend du nombre de rangées, pas de racks.
+    """
+    length, width = layout['length'], layout['width']
+    main_aisle_width = layout['main_aisle_width']
+    geometry = plan_geometry(layout)
+    alley_start = geometry['alley_start']
+    
+    fig = Figure(figsize=(14, 10))
+    ax = fig.add_subplot()
+    
+    # Dessiner le bâtiment
+    ax.add_patch(Rectangle((0, 0), length, width,
+                           linewidth=3, edgecolor='#2c3e50',
+                           facecolor='#ecf0f1', alpha=0.3))
+    
+    # Racks côté GAUCHE (bleu) et côté DROIT (vert) : détail rack par rack ou bandes par rangée
+    sides = {'left': ('#3498db', '#2980b9'), 'right': ('#2ecc71', '#27ae60')}
+    ranges = {side: visible_racks(layout, geometry, side) for side in sides}
+    visible = sum((c[1] - c[0]) * (r[1] - r[0]) for c, r in ranges.values())
+    aggregated = visible > LOD_RACK_THRESHOLD
+    
+    for side, (face, edge) in sides.items():
+        columns, rows = ranges[side]
+        if columns[1] <= columns[0] or rows[1] <= rows[0]:
+            continue
+        if not aggregated:
+            vertices = rack_vertices(rack_origins(geometry, side, columns, rows),
+                                     layout['rack_depth'], layout['rack_width'])
+            ax.add_collection(PolyCollection(vertices, facecolors=face, edgecolors=edge,
+                                             linewidths=1.0, alpha=0.8))
+            continue
+        
+        vertices = row_blocks(layout, geometry, side, columns, rows)
+        ax.add_collection(PolyCollection(vertices, facecolors=face, edgecolors=edge,
+                                         linewidths=0.5, alpha=0.8))
+        # Nombre de racks par bande, sur une rangée sur `step` au-delà de MAX_ROW_LABELS
+        step = -(-len(vertices) // MAX_ROW_LABELS)
+        count = columns[1] - columns[0]
+        for block in vertices[::step]:
+            ax.text(block[:, 0].mean(), block[:, 1].mean(), f'{count} racks',
+                    ha='center', va='center', fontsize=6, color='#2c3e50', clip_on=True)
+    
+    # Allée centrale
+    ax.add_patch(Rectangle((alley_start, 0), main_aisle_width, width,
+                           facecolor='#95a5a6', alpha=0.5,
+                           edgecolor='#7f8c8d', linewidth=2))
+    
+    # Quais de chargement (côté droit du bâtiment)
+    dock_doors = layout['dock_doors']
+    for i in range(dock_doors):
+        quai_y = (i + 1) * (width / (dock_doors + 1)) - QUAI_HEIGHT / 2
+        ax.add_patch(Rectangle((length - QUAI_WIDTH, quai_y), QUAI_WIDTH, QUAI_HEIGHT,
+                               facecolor='#e74c3c', alpha=0.7,
+                               edgecolor='#c0392b', linewidth=2))
+    
+    # Zone de manœuvre devant les quais
+    ax.add_patch(Rectangle((length - QUAI_WIDTH - MANEUVER_DEPTH, 0), MANEUVER_DEPTH, width,
+                           facecolor='#f1c40f', alpha=0.2, hatch='//'))
+    
+    # Sorties de secours
+    ax.add_patch(Rectangle((length / 2 - EXIT_WIDTH / 2, -0.5), EXIT_WIDTH, 1,
+                           facecolor='#9b59b6', alpha=0.6))
+    
+    # Configuration du graphique
+    if layout.get('view') is None:
+        ax.set_xlim(-2, length + 2)
+        ax.set_ylim(-2, width + 2)
+    else:
+        ax.set_xlim(*layout['view'][:2])
+        ax.set_ylim(*layout['view'][2:])
+    ax.set_aspect('equal')
+    ax.set_xlabel('LONGUEUR (mètres)', fontweight='bold', fontsize=12)
+    ax.set_ylabel('LARGEUR (mètres)', fontweight='bold', fontsize=12)
+    title = f'PLAN D\'IMPLANTATION OPTIMISÉ - {layout["total_racks"]} RACKS'
+    if aggregated:
+        title += ' (vue par rangées)'
+    ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+    
+    # Mesures sur le plan : longueur, largeur, allée
+    ax.annotate(f'{length:.0f}m', xy=(length / 2, -1.5),
+                ha='center', va='center', fontsize=10, fontweight='bold',
+                color='#2c3e50')
+    ax.annotate(f'{width:.0f}m', xy=(-1.5, width / 2),
+                ha='center', va='center', fontsize=10, fontweight='bold',
+                color='#2c3e50', rotation=90)
+    ax.annotate(f'Allée\n{main_aisle_width}m',
+                xy=(alley_start + main_aisle_width / 2, width / 2),
+                ha='center', va='center', fontsize=9, fontweight='bold',
+                color='#c0392b', rotation=90,
+                bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8))
+    
+    # Légende détaillée
+    legend_elements = [
+        Patch(facecolor='#3498db', edgecolor='#2980b9', alpha=0.8, label='Racks côté gauche'),
+        Patch(facecolor='#2ecc71', edgecolor='#27ae60', alpha=0.8, label='Racks côté droit'),
+        Patch(facecolor='#95a5a6', edgecolor='#7f8c8d', alpha=0.5, label='Allée principale'),
+        Patch(facecolor='#e74c3c', edgecolor='#c0392b', alpha=0.7, label='Quais chargement'),
+        Patch(facecolor='#f1c40f', alpha=0.2, hatch='//', label='Zone de manœuvre'),
+        Patch(facecolor='#9b59b6', alpha=0.6, label='Sortie secours')
+    ]
+    ax.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(1.02, 1),
+              borderaxespad=0., fontsize=9)
+    
+    # Grille secondaire pour meilleure lisibilité
+    ax.grid(True, which='major', linestyle='-', linewidth=0.5, alpha=0.3, color='gray')
+    ax.grid(True, which='minor', linestyle=':', linewidth=0.3, alpha=0.2, color='gray')
+    ax.minorticks_on()
+    
+    # Ajuster les marges pour la légende
+    fig.tight_layout(rect=[0, 0, 0.85, 1])
+    return fig
+
+
+def render_plan(layout, cache=None, fmt='png', dpi=150):
+    """Image du plan (octets PNG ou SVG), construite une seule fois par implantation distincte"""
+    def draw():
+        fig = build_plan_figure(layout)
+        buf = BytesIO()
+        with timer('savefig'):
+            fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches='tight')
+        return buf.getvalue()
+    
+    if cache is None:
+        return draw()
+    key = params_key('plan', layout, LAYOUT_INPUTS, {'format': fmt, 'dpi': dpi})
+    return cache.get_or_compute(key, draw)
+
+
+@profiled('build_zones_figure')
+def build_zones_figure(params):
+    """Figure de l'implantation multi-allées : zones, racks, allées transversales et poteaux
+    
+    Au-delà de LOD_RACK_THRESHOLD racks, chaque ligne de racks est dessinée comme une
+    bande par tronçon (les racks retirés aux poteaux n'apparaissent plus).
+    """
+    generator = LayoutGenerator(params)
+    generated = generator.generate(racks=True)
+    length, width = generator.length, generator.width
+    zones = generated['zones']
+    total = sum(z['racks'] for z in zones)
+    aggregated = total > LOD_RACK_THRESHOLD
+    _, segment_length, segment_origins = generator.cross_aisles()
+    
+    fig = Figure(figsize=(14, 10))
+    ax = fig.add_subplot()
+    ax.add_patch(Rectangle((0, 0), length, width, linewidth=3, edgecolor='#2c3e50',
+                           facecolor='#ecf0f1', alpha=0.3))
+    
+    colors = ['#2ecc71', '#3498db', '#e67e22', '#9b59b6', '#e74c3c', '#1abc9c']
+    legend_elements = []
+    for k, zone in enumerate(zones):
+        color = colors[-1] if zone['name'] == 'Standard' else colors[k % (len(colors) - 1)]
+        ax.add_patch(Rectangle((zone['x0'], 0), zone['x1'] - zone['x0'], width,
+                               facecolor=color, alpha=0.08, edgecolor=color, linewidth=1.5, linestyle='--'))
+        if aggregated:
+            x = np.unique(zone['rack_x'])
+            x, y = np.repeat(x, len(segment_origins)), np.tile(segment_origins, len(x))
+            height = segment_length
+        else:
+            x, y, height = zone['rack_x'], zone['rack_y'], params['rack_width']
+        if len(x):
+            ax.add_collection(PolyCollection(rack_vertices(np.column_stack([x, y]), zone['rack_depth'], height),
+                                             facecolors=color, edgecolors=color, linewidths=0.5, alpha=0.8))
+        legend_elements.append(Patch(facecolor=color, alpha=0.8,
+                                     label=f"{zone['name']} : {zone['racks']:,} racks ({zone['rack_type']})"))
+    
+    # Allées transversales, poteaux, quais et zone de manœuvre
+    storage_end = length - QUAI_WIDTH - MANEUVER_DEPTH
+    for y in generated['cross_aisle_y']:
+        ax.add_patch(Rectangle((0, y), storage_end, params.get('main_aisle_width', 3.5),
+                               facecolor='#95a5a6', alpha=0.5))
+    posts_x, posts_y = np.meshgrid(generator.posts_x, generator.posts_y)
+    ax.scatter(posts_x.ravel(), posts_y.ravel(), marker='s', s=max(2.0, 400.0 * POST_SIZE / length),
+               color='#2c3e50', zorder=3)
+    dock_doors = max(1, int(params.get('dock_doors', 4)))
+    quai_y = (np.arange(dock_doors) + 1) * (width / (dock_doors + 1)) - QUAI_HEIGHT / 2
+    ax.add_collection(PolyCollection(rack_vertices(np.column_stack([np.full(dock_doors, length - QUAI_WIDTH), quai_y]),
+                                                   QUAI_WIDTH, QUAI_HEIGHT),
+                                     facecolors='#e74c3c', edgecolors='#c0392b', alpha=0.7))
+    ax.add_patch(Rectangle((storage_end, 0), MANEUVER_DEPTH, width, facecolor='#f1c40f', alpha=0.2, hatch='//'))
+    
+    ax.set_xlim(-2, length + 2)
+    ax.set_ylim(-2, width + 2)
+    ax.set_aspect('equal')
+    ax.set_xlabel('LONGUEUR (mètres)', fontweight='bold', fontsize=12)
+    ax.set_ylabel('LARGEUR (mètres)', fontweight='bold', fontsize=12)
+    title = f'IMPLANTATION MULTI-ALLÉES - {total:,} RACKS'
+    if aggregated:
+        title += ' (vue par lignes)'
+    ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+    
+    legend_elements += [
+        Patch(facecolor='#95a5a6', alpha=0.5, label='Allées transversales'),
+        Patch(facecolor='#2c3e50', label='Poteaux'),
+        Patch(facecolor='#e74c3c', edgecolor='#c0392b', alpha=0.7, label='Quais chargement'),
+        Patch(facecolor='#f1c40f', alpha=0.2, hatch='//', label='Zone de manœuvre'),
+    ]
+    ax.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(1.02, 1),
+              borderaxespad=0., fontsize=9)
+    fig.tight_layout(rect=[0, 0, 0.85, 1])
+    return fig
+
+
+def render_zones(params, cache=None, dpi=150):
+    """Image PNG de l'implantation multi-allées, construite une seule fois par jeu de paramètres"""
+    def draw():
+        fig = build_zones_figure(params)
+        buf = BytesIO()
+        with timer('savefig'):
+            fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+        return buf.getvalue()
+    
+    if cache is None:
+        return draw()
+    key = params_key('zones', params, ZONE_INPUTS + ('dock_doors',), {'dpi': dpi})
+    return cache.get_or_compute(key, draw)
+
+
+def polygon_arrays(vertices):
+    """Coordonnées x, y (float32) de polygones séparés par NaN, pour une trace unique"""
+    xy = np.full((len(vertices), 5, 2), np.nan, dtype=np.float32)
+    xy[:, :4, :] = vertices
+    xy = xy.reshape(-1, 2)
+    return xy[:, 0], xy[:, 1]
+
+
+@profiled('build_plan_plotly')
+def build_plan_plotly(layout):
+    """Plan interactif : une trace WebGL par côté, zoom et déplacement gérés par le navigateur"""
+    length, width = layout['length'], layout['width']
+    main_aisle_width = layout['main_aisle_width']
+    geometry = plan_geometry(layout)
+    alley_start = geometry['alley_start']
+    aggregated = layout['total_racks'] > WEBGL_RACK_LIMIT
+    
+    fig = go.Figure()
+    
+    # Racks (ou bandes par rangée pour les très grands sites) : coordonnées envoyées en bloc
+    for side, name, face, edge in (('left', 'Racks côté gauche', '#3498db', '#2980b9'),
+                                   ('right', 'Racks côté droit', '#2ecc71', '#27ae60')):
+        columns, rows = (0, layout['racks_per_row']), (0, layout['rows_per_side'])
+        if aggregated:
+            vertices = row_blocks(layout, geometry, side, columns, rows)
+        else:
+            vertices = rack_vertices(rack_origins(geometry, side, columns, rows),
+                                     layout['rack_depth'], layout['rack_width'])
+        x, y = polygon_arrays(vertices)
+        fig.add_trace(go.Scattergl(x=x, y=y, mode='lines', fill='toself', name=name,
+                                   fillcolor=face, opacity=0.8, line=dict(color=edge, width=1),
+                                   hoverinfo='name'))
+    
+    # Éléments fixes du plan : quelques formes seulement
+    shapes = [
+        dict(type='rect', x0=0, y0=0, x1=length, y1=width,
+             line=dict(color='#2c3e50', width=3), fillcolor='rgba(236, 240, 241, 0.3)', layer='below'),
+        dict(type='rect', x0=alley_start, y0=0, x1=alley_start + main_aisle_width, y1=width,
+             line=dict(color='#7f8c8d', width=2), fillcolor='rgba(149, 165, 166, 0.5)'),
+        dict(type='rect', x0=length - QUAI_WIDTH - MANEUVER_DEPTH, y0=0, x1=length - QUAI_WIDTH, y1=width,
+             line=dict(width=0), fillcolor='rgba(241, 196, 15, 0.2)'),
+        dict(type='rect', x0=length / 2 - EXIT_WIDTH / 2, y0=-0.5, x1=length / 2 + EXIT_WIDTH / 2, y1=0.5,
+             line=dict(width=0), fillcolor='rgba(155, 89, 182, 0.6)'),
+    ]
+    dock_doors = layout['dock_doors']
+    for i in range(dock_doors):
+        quai_y = (i + 1) * (width / (dock_doors + 1)) - QUAI_HEIGHT / 2
+        shapes.append(dict(type='rect', x0=length - QUAI_WIDTH, y0=quai_y, x1=length, y1=quai_y + QUAI_HEIGHT,
+                           line=dict(color='#c0392b', width=2), fillcolor='rgba(231, 76, 60, 0.7)'))
+    
+    title = f"PLAN D'IMPLANTATION OPTIMISÉ - {layout['total_racks']} RACKS"
+    if aggregated:
+        title += ' (vue par rangées)'
+    fig.update_layout(
+        title=dict(text=f'<b>{title}</b>', x=0.5),
+        shapes=shapes,
+        annotations=[dict(x=alley_start + main_aisle_width / 2, y=width / 2, text=f'Allée<br>{main_aisle_width}m',
+                          showarrow=False, textangle=-90, font=dict(color='#c0392b', size=11),
+                          bgcolor='rgba(255, 255, 255, 0.8)')],
+        xaxis=dict(title='<b>LONGUEUR (mètres)</b>', range=[-2, length + 2], showgrid=True),
+        yaxis=dict(title='<b>LARGEUR (mètres)</b>', range=[-2, width + 2], showgrid=True,
+                   scaleanchor='x', scaleratio=1),
+        plot_bgcolor='white',
+        height=650,
+        margin=dict(l=60, r=20, t=60, b=60),
+        dragmode='pan',
+    )
+    return fig
+
+
+def render_plan_plotly(layout, cache=None):
+    """Figure interactive du plan, construite une seule fois par implantation distincte"""
+    if cache is None:
+        return build_plan_plotly(layout)
+    key = params_key('plan_plotly', layout, LAYOUT_INPUTS)
+    return cache.get_or_compute(key, lambda: build_plan_plotly(layout))
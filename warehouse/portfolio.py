@@ -0,0 +1,103 @@
+"""Portefeuille de sites : configurations nommées, calculées en lot et comparées"""
+import time
+
+import pandas as pd
+
+from . import bulk
+from .cache import params_key
+from .calculator import WarehouseCalculator
+
+
+# Paramètres lus par le calcul par lots (empreinte d'un site)
+SITE_INPUTS = tuple(dict.fromkeys(WarehouseCalculator.BATCH_REQUIRED + tuple(WarehouseCalculator.BATCH_DEFAULTS)
+                                  + ('equipment_type',)))
+
+# Colonnes de la comparaison, dans l'ordre d'affichage
+COMPARISON_COLUMNS = {
+    'total_area': "Surface (m²)",
+    'total_positions': "Emplacements",
+    'total_pallets': "Palettes",
+    'storage_ratio': "Taux de stockage (%)",
+    'required_equipment': "Équipements",
+    'total_investment': "Investissement (k€)",
+    'total_annual_cost': "Coût annuel (k€)",
+    'cost_per_pallet': "Coût / palette (€)",
+    'height_ok': "Hauteur",
+    'aisle_ok': "Allées",
+    'load_ok': "Charge au sol",
+    'compliant': "Conforme",
+}
+
+
+class SitePortfolio:
+    """Sites nommés (paramètres de l'application) et résultats de leur dernier calcul
+    
+    Chaque site garde l'empreinte des paramètres lus par le calcul par lots : compute()
+    ne recalcule, en un seul appel vectorisé, que les sites nouveaux ou modifiés.
+    """
+    
+    def __init__(self):
+        self.sites = {}
+        self._fingerprints = {}
+        self._results = pd.DataFrame()
+    
+    def __len__(self):
+        return len(self.sites)
+    
+    def add(self, name, params):
+        """Ajoute un site ou remplace ses paramètres"""
+        name = str(name).strip()
+        if not name:
+            raise ValueError("Le site doit avoir un nom")
+        missing = [c for c in WarehouseCalculator.BATCH_REQUIRED if c not in params]
+        if missing:
+            raise ValueError(f"Paramètres manquants pour {name} : {', '.join(missing)}")
+        self.sites[name] = {field: params[field] for field in SITE_INPUTS if field in params}
+    
+    def remove(self, names):
+        for name in names:
+            self.sites.pop(name, None)
+            self._fingerprints.pop(name, None)
+        self._results = self._results.drop(index=list(names), errors='ignore')
+    
+    def load(self, frame):
+        """Ajoute les sites d'un tableau (colonne `name` puis une colonne par paramètre)"""
+        if 'name' not in frame:
+            raise ValueError("Colonne manquante dans le fichier de sites : name")
+        for record in frame.to_dict('records'):
+            name = record.pop('name')
+            self.add(name, {k: v for k, v in record.items() if not pd.isna(v)})
+    
+    def to_frame(self):
+        """Paramètres des sites, une ligne par site (format accepté par load)"""
+        frame = pd.DataFrame.from_dict(self.sites, orient='index')
+        return frame.rename_axis('name').reset_index()
+    
+    def stale(self):
+        """Sites dont les paramètres ont changé depuis le dernier calcul"""
+        keys = {name: params_key('site', params, SITE_INPUTS) for name, params in self.sites.items()}
+        return [name for name, key in keys.items() if self._fingerprints.get(name) != key], keys
+    
+    def compute(self):
+        """Calcule les sites nouveaux ou modifiés en un lot ; retourne le nombre de sites calculés et réutilisés"""
+        start = time.perf_counter()
+        stale, keys = self.stale()
+        if stale:
+            configs = pd.DataFrame.from_dict({name: self.sites[name] for name in stale}, orient='index')
+            results = bulk.evaluate(configs)[list(COMPARISON_COLUMNS)]
+            kept = self._results.drop(index=stale, errors='ignore')
+            self._results = pd.concat([kept, results]) if len(kept) else results
+            self._fingerprints.update({name: keys[name] for name in stale})
+        return {
+            'computed': len(stale),
+            'reused': len(self.sites) - len(stale),
+            'elapsed': round(time.perf_counter() - start, 4),
+        }
+    
+    def comparison(self):
+        """Résultats des sites, dans l'ordre d'ajout, colonnes libellées pour l'affichage"""
+        if not self.sites:
+            return pd.DataFrame(columns=list(COMPARISON_COLUMNS.values()))
+        self.compute()
+        table = self._results.reindex(list(self.sites)).rename(columns=COMPARISON_COLUMNS)
+        return table.rename_axis("Site")
@@ -0,0 +1,107 @@
+"""Mesure du temps passé dans chaque étape d'une exécution (calculs, figures, affichage)
+
+Les étapes instrumentées appellent timer() ou sont décorées par profiled() : sans
+profileur actif dans le fil courant, le coût se limite à la lecture d'une ContextVar.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+
+
+HISTORY = 50                  # Exécutions gardées par profileur
+
+_CURRENT = ContextVar('warehouse_profiler', default=None)
+_NULL = nullcontext()
+_LOG_LOCK = threading.Lock()
+
+
+def timer(stage):
+    """Chronomètre une étape pour le profileur actif (contexte vide sinon)"""
+    profiler = _CURRENT.get()
+    return _NULL if profiler is None else profiler.timer(stage)
+
+
+def profiled(stage):
+    """Décorateur : chaque appel de la fonction est une étape `stage` du profileur actif"""
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler = _CURRENT.get()
+            if profiler is None:
+                return function(*args, **kwargs)
+            with profiler.timer(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Profiler:
+    """Temps par étape de chaque exécution, historique borné et journal JSON facultatif
+    
+    run() délimite une exécution (une page de l'application) : le profileur y est actif
+    dans le fil courant, les étapes appelées pendant ce temps sont cumulées par nom.
+    Chaque exécution terminée est ajoutée à l'historique et, avec `log_path`, écrite
+    comme une ligne JSON (date, session, libellé, total et étapes en ms).
+    """
+    
+    def __init__(self, enabled=False, log_path=None, session=None):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.session = session or uuid.uuid4().hex[:8]
+        self.runs = deque(maxlen=HISTORY)
+        self._stages = None
+    
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._stages is not None:
+                elapsed = time.perf_counter() - start
+                calls, total = self._stages.get(stage, (0, 0.0))
+                self._stages[stage] = (calls + 1, total + elapsed)
+    
+    def run(self, label):
+        """Contexte d'une exécution mesurée ; contexte vide si le profileur est désactivé"""
+        return self._run(label) if self.enabled else _NULL
+    
+    @contextmanager
+    def _run(self, label):
+        self._stages = {}
+        token = _CURRENT.set(self)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = time.perf_counter() - start
+            _CURRENT.reset(token)
+            stages, self._stages = self._stages, None
+            self._record(label, total, stages)
+    
+    def _record(self, label, total, stages):
+        record = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'session': self.session,
+            'label': label,
+            'total_ms': round(total * 1000, 3),
+            'stages': {name: {'calls': calls, 'ms': round(elapsed * 1000, 3)}
+                       for name, (calls, elapsed) in stages.items()},
+        }
+        self.runs.append(record)
+        if self.log_path:
+            line = json.dumps(record, ensure_ascii=False)
+            with _LOG_LOCK, open(self.log_path, 'a', encoding='utf-8') as log:
+                log.write(line + '\n')
+    
+    def last(self):
+        """Dernière exécution mesurée (None si aucune)"""
+        return self.runs[-1] if self.runs else None
+    
+    def clear(self):
+        self.runs.clear()
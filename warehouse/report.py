@@ -0,0 +1,215 @@
+"""Rapport PDF multipage : paramètres, résultats de l'étape 4, non-conformités et plan
+
+Les pages sont des figures matplotlib écrites par le moteur PDF (PdfPages), sans
+pyplot : le rapport se construit hors du fil de la page (tâche en arrière-plan). Le
+plan reste vectoriel, racks en collections (une bande par rangée au-delà de
+LOD_RACK_THRESHOLD racks) : la taille du fichier ne suit pas le nombre de racks.
+"""
+import textwrap
+import time
+from io import BytesIO
+
+import numpy as np
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+from .cache import params_key
+from .plan import LAYOUT_INPUTS, build_plan_figure
+from .profiling import profiled
+
+
+PAGE_SIZE = (11.69, 8.27)     # A4 paysage (pouces)
+ROWS_PER_PAGE = 30            # Lignes d'un tableau par page
+WRAP = 110                    # Caractères par ligne des non-conformités
+
+# Tableaux de résultats de l'étape 4 : (libellé, clé, format)
+CAPACITY_ROWS = (
+    ("Surface totale", 'total_area', "{:,.0f} m²"),
+    ("Surface de stockage", 'storage_area', "{:,.1f} m²"),
+    ("Taux d'occupation", 'storage_ratio', "{:.1f}%"),
+    ("Volume utile", 'volume_capacity', "{:,.0f} m³"),
+    ("Racks", 'total_racks', "{:,}"),
+    ("Emplacements", 'total_positions', "{:,}"),
+    ("Palettes totales", 'total_pallets', "{:,}"),
+)
+CIRCULATION_ROWS = (
+    ("Distance moyenne", 'avg_distance', "{:.1f} m"),
+    ("Temps de cycle", 'cycle_time', "{:.1f} min"),
+    ("Débit horaire", 'pallets_per_hour', "{:.1f} pal/h"),
+    ("Débit journalier", 'daily_capacity', "{:,} pal/j"),
+    ("Équipements nécessaires", 'required_equipment', "{}"),
+    ("Capacité théorique", 'daily_throughput', "{:,} pal/j"),
+)
+INVESTMENT_ROWS = (
+    ("Racks et rayonnage", 'rack_cost', "{} k€"),
+    ("Surface bâtiment", 'area_cost', "{} k€"),
+    ("Équipements", 'equipment_cost', "{} k€"),
+    ("Installation", 'installation_cost', "{} k€"),
+    ("TOTAL", 'total_investment', "{} k€"),
+)
+OPERATING_ROWS = (
+    ("Maintenance", 'annual_maintenance', "{} k€"),
+    ("Personnel", 'annual_personnel', "{} k€"),
+    ("Énergie", 'annual_energy', "{} k€"),
+    ("TOTAL", 'total_annual_cost', "{} k€"),
+    ("Coût par palette", 'cost_per_pallet', "{} €/an"),
+)
+ZONE_COLUMNS = {'name': "Zone", 'rack_type': "Type de rack", 'lines': "Lignes", 'aisles': "Allées",
+                'racks': "Racks", 'levels': "Niveaux", 'pallets': "Palettes"}
+
+HEADER_COLOR = '#2c3e50'
+STRIPE_COLOR = '#ecf0f1'
+
+
+def _scalars(values):
+    """Valeurs scalaires d'un dictionnaire (paramètres, résultats), tableaux et listes exclus"""
+    return {k: v for k, v in values.items() if np.isscalar(v)}
+
+
+def _format(fmt, value):
+    if value is None:
+        return "—"
+    try:
+        return fmt.format(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _rows(spec, values):
+    return [[label, _format(fmt, values.get(key))] for label, key, fmt in spec]
+
+
+def _clean(warning):
+    """Texte d'une non-conformité sans la mise en forme Markdown de l'application"""
+    return warning.replace('**', '').replace('⚠️', '').strip()
+
+
+def _draw_table(ax, title, columns, rows, fontsize=9):
+    """Tableau à en-tête foncé et lignes alternées dans un axe sans repère"""
+    ax.axis('off')
+    ax.set_title(title, loc='left', fontsize=12, fontweight='bold', color=HEADER_COLOR)
+    table = ax.table(cellText=rows or [["—"] * len(columns)], colLabels=columns,
+                     loc='upper left', cellLoc='left', colLoc='left')
+    table.auto_set_font_size(False)
+    table.set_fontsize(fontsize)
+    table.scale(1, 1.35)
+    for (row, _), cell in table.get_celld().items():
+        cell.set_edgecolor('#bdc3c7')
+        if row == 0:
+            cell.set_facecolor(HEADER_COLOR)
+            cell.get_text().set_color('white')
+            cell.get_text().set_fontweight('bold')
+        elif row % 2 == 0:
+            cell.set_facecolor(STRIPE_COLOR)
+
+
+def _page(title):
+    fig = Figure(figsize=PAGE_SIZE)
+    fig.suptitle(title, x=0.05, ha='left', fontsize=16, fontweight='bold', color=HEADER_COLOR)
+    return fig
+
+
+def _cover_page(pdf, title, calculations, warnings):
+    fig = _page(f"RAPPORT DE DIMENSIONNEMENT - {title}")
+    capacity = calculations.get('capacity', {})
+    circulation = calculations.get('circulation', {})
+    costs = calculations.get('costs', {})
+    lines = [
+        f"Édité le {time.strftime('%d/%m/%Y à %H:%M')}",
+        "",
+        f"Racks installés : {_format('{:,}', capacity.get('total_racks'))}",
+        f"Capacité : {_format('{:,}', capacity.get('total_pallets'))} palettes",
+        f"Débit : {_format('{:.1f}', circulation.get('pallets_per_hour'))} pal/h, "
+        f"{_format('{}', circulation.get('required_equipment'))} équipements",
+        f"Investissement : {_format('{} k€', costs.get('total_investment'))}",
+        f"Coût par palette : {_format('{} €/an', costs.get('cost_per_pallet'))}",
+        "",
+        f"Conformité : {'conforme aux normes' if not warnings else f'{len(warnings)} non-conformité(s)'}",
+    ]
+    fig.text(0.05, 0.8, '\n'.join(lines), va='top', fontsize=13, linespacing=1.8)
+    pdf.savefig(fig)
+
+
+def _table_pages(pdf, title, columns, rows, fontsize=9):
+    """Tableau réparti sur autant de pages que nécessaire"""
+    for start in range(0, max(len(rows), 1), ROWS_PER_PAGE):
+        fig = _page(title if not start else f"{title} (suite)")
+        ax = fig.add_axes([0.05, 0.05, 0.9, 0.82])
+        _draw_table(ax, "", columns, rows[start:start + ROWS_PER_PAGE], fontsize)
+        pdf.savefig(fig)
+
+
+def _results_page(pdf, calculations):
+    """Capacité, circulation et coûts de l'étape 4 sur une page (quatre tableaux)"""
+    fig = _page("RÉSULTATS DU DIMENSIONNEMENT")
+    tables = (
+        ("Capacités de stockage", _rows(CAPACITY_ROWS, calculations.get('capacity', {}))),
+        ("Performance logistique", _rows(CIRCULATION_ROWS, calculations.get('circulation', {}))),
+        ("Investissement initial", _rows(INVESTMENT_ROWS, calculations.get('costs', {}))),
+        ("Coûts d'exploitation annuels", _rows(OPERATING_ROWS, calculations.get('costs', {}))),
+    )
+    for k, (title, rows) in enumerate(tables):
+        ax = fig.add_axes([0.05 + 0.47 * (k % 2), 0.5 - 0.42 * (k // 2), 0.42, 0.36])
+        _draw_table(ax, title, ["Indicateur", "Valeur"], rows, fontsize=10)
+    pdf.savefig(fig)
+
+
+def _warnings_page(pdf, warnings):
+    fig = _page("CONFORMITÉ AUX NORMES")
+    if warnings:
+        lines = []
+        for warning in warnings:
+            lines += textwrap.wrap(f"• {_clean(warning)}", WRAP, subsequent_indent='   ')
+        text, color = '\n'.join(lines), '#c0392b'
+    else:
+        text, color = "Aucune non-conformité détectée.", '#27ae60'
+    fig.text(0.05, 0.85, text, va='top', fontsize=11, linespacing=1.6, color=color)
+    pdf.savefig(fig)
+
+
+@profiled('build_report')
+def build_report(params, calculations, warnings, layout, title="Entrepôt"):
+    """Octets du rapport PDF : garde, paramètres, résultats de l'étape 4, normes et plan
+    
+    `layout` est l'implantation du plan de l'étape 5 (plan_layout), dessinée en entier.
+    """
+    buffer = BytesIO()
+    metadata = {'Title': f"Rapport de dimensionnement - {title}", 'Creator': "Warehouse Dimensioning Pro"}
+    with PdfPages(buffer, metadata=metadata) as pdf:
+        _cover_page(pdf, title, calculations, warnings)
+        parameters = [[name, _format('{}', value)] for name, value in sorted(_scalars(params).items())]
+        _table_pages(pdf, "PARAMÈTRES DU PROJET", ["Paramètre", "Valeur"], parameters)
+        _results_page(pdf, calculations)
+        zones = calculations.get('capacity', {}).get('zones')
+        if zones:
+            rows = [[_format('{}', zone.get(key)) for key in ZONE_COLUMNS] for zone in zones]
+            _table_pages(pdf, "IMPLANTATION PAR ZONES", list(ZONE_COLUMNS.values()), rows)
+        _warnings_page(pdf, warnings)
+        plan = build_plan_figure({**layout, 'view': None})
+        plan.set_size_inches(*PAGE_SIZE)
+        plan.tight_layout(rect=[0, 0, 0.85, 1])
+        pdf.savefig(plan)
+    return buffer.getvalue()
+
+
+def report_key(params, calculations, warnings, layout, title="Entrepôt"):
+    """Empreinte d'un rapport : tout ce qui y est imprimé, sauf la date d'édition"""
+    content = {
+        'title': title,
+        'params': _scalars(params),
+        'results': {name: _scalars(calculations.get(name, {})) for name in ('capacity', 'circulation', 'costs')},
+        'zones': [_scalars(zone) for zone in calculations.get('capacity', {}).get('zones', [])],
+        'warnings': list(warnings),
+        'layout': {k: layout.get(k) for k in LAYOUT_INPUTS if k != 'view'},
+    }
+    return params_key('report', content, tuple(content))
+
+
+def render_report(params, calculations, warnings, layout, cache=None, title="Entrepôt"):
+    """Rapport PDF, construit une seule fois par scénario (mêmes paramètres et résultats)"""
+    def draw():
+        return build_report(params, calculations, warnings, layout, title)
+    
+    if cache is None:
+        return draw()
+    return cache.get_or_compute(report_key(params, calculations, warnings, layout, title), draw)
@@ -0,0 +1,159 @@
+"""Analyse de risque Monte-Carlo : demande, remplissage, rotation et disponibilité des équipements"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from .calculator import WarehouseCalculator
+
+
+CHUNK_SIZE = 20000                  # Tirages évalués ensemble (mémoire bornée par tranche)
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Incertitudes par défaut : demande moyenne (part de total_pallets) et sa variation, écart type
+# du remplissage (points de %), étendue relative de la rotation, disponibilité des équipements
+UNCERTAINTIES = {
+    'demand_level': 1.0,
+    'demand_cv': 0.15,
+    'filling_sd': 5.0,
+    'rotation_spread': 0.25,
+    'availability': 0.90,
+    'availability_sd': 0.04,
+}
+
+# Indicateurs tirés à chaque échantillon
+METRICS = {
+    'demand': "Stock demandé (palettes)",
+    'daily_throughput': "Flux journalier (pal/j)",
+    'required_equipment': "Équipements nécessaires",
+    'cost_per_pallet': "Coût par palette (€/an)",
+}
+
+
+class RiskAnalysis:
+    """Tirages Monte-Carlo autour du dimensionnement de l'étape 4
+    
+    La géométrie reste celle du calcul (emplacements, coût des racks et de la surface,
+    capacité journalière d'un équipement) ; chaque tirage fait varier :
+    - le stock demandé : loi log-normale de moyenne demand_level × total_pallets et de coefficient demand_cv ;
+    - le taux de remplissage atteignable : loi normale autour de filling_rate, bornée à [50, 100] ;
+    - la rotation : loi triangulaire sur stock_rotation ± rotation_spread ;
+    - la disponibilité des équipements : loi bêta de moyenne availability.
+    
+    Les formules de calculate_circulation et calculate_costs sont évaluées en NumPy par
+    tranches de CHUNK_SIZE tirages ; chaque tranche a son propre flux aléatoire issu de
+    la graine, si bien que le résultat ne dépend que de la graine et du nombre de tirages.
+    """
+    
+    def __init__(self, params, capacity, circulation, **uncertainties):
+        unknown = set(uncertainties) - set(UNCERTAINTIES)
+        if unknown:
+            raise ValueError(f"Incertitudes inconnues : {', '.join(sorted(unknown))}")
+        self.params = params
+        self.capacity = capacity
+        self.circulation = circulation
+        self.uncertainties = {**UNCERTAINTIES, **uncertainties}
+    
+    def sample(self, rng, count):
+        """Tire `count` jeux d'hypothèses (stock demandé, remplissage, rotation, disponibilité)"""
+        u = self.uncertainties
+        mean_demand = max(1.0, u['demand_level'] * float(self.capacity.get('total_pallets', 0)))
+        sigma = np.sqrt(np.log1p(u['demand_cv'] ** 2))
+        demand = mean_demand * rng.lognormal(-sigma ** 2 / 2, sigma, count)
+        
+        filling = np.clip(rng.normal(self.params.get('filling_rate', 85.0), u['filling_sd'], count), 50.0, 100.0)
+        
+        rotation = self.params.get('stock_rotation', 30.0)
+        spread = min(max(u['rotation_spread'], 0.0), 0.95)
+        if spread > 0:
+            rotation = rng.triangular(rotation * (1 - spread), rotation, rotation * (1 + spread), count)
+        else:
+            rotation = np.full(count, rotation)
+        
+        # Loi bêta de moyenne m et d'écart type s : concentration m (1 - m) / s² - 1
+        m = min(max(u['availability'], 0.01), 0.999)
+        s = max(u['availability_sd'], 1e-6)
+        concentration = max(m * (1 - m) / s ** 2 - 1, 1e-3)
+        availability = rng.beta(m * concentration, (1 - m) * concentration, count)
+        return demand, filling, rotation, availability
+    
+    def evaluate(self, demand, filling, rotation, availability):
+        """Indicateurs de chaque tirage (mêmes formules que le calcul unitaire)"""
+        params, capacity, rates = self.params, self.capacity, WarehouseCalculator.COSTS
+        positions = capacity.get('total_positions', 0)
+        area = params['length'] * params['width']
+        
+        # Stock réellement logé : demande plafonnée aux emplacements utilisables
+        usable = positions * filling / 100.0
+        shortfall = demand > usable
+        stored = np.minimum(demand, usable)
+        
+        daily_throughput = demand / rotation
+        daily_capacity = self.circulation.get('daily_capacity', 0) * availability
+        with np.errstate(divide='ignore', invalid='ignore'):
+            required = np.where(daily_capacity > 0, np.maximum(1, np.ceil(daily_throughput / daily_capacity)), 1)
+        
+        unit_equipment = WarehouseCalculator.EQUIPMENT_COSTS.get(params.get('equipment_type', 'forklift'),
+                                                                 rates['default_equipment'])
+        fixed = positions * rates['rack_per_position'] + area * rates['area_per_m2']
+        investment = (fixed + unit_equipment * required) * (1 + rates['installation_rate'])
+        annual = (investment * rates['maintenance_rate']
+                  + required * rates['operators_per_equipment'] * rates['operator_salary']
+                  + area * rates['energy_per_m2'])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cost_per_pallet = np.where(stored > 0, annual / stored, 0.0)
+        
+        return {
+            'demand': demand,
+            'daily_throughput': daily_throughput,
+            'required_equipment': required.astype(np.int32),
+            'cost_per_pallet': cost_per_pallet,
+            'shortfall': shortfall,
+        }
+    
+    def run(self, samples=100000, seed=0, progress=None):
+        """Exécute `samples` tirages ; `progress(fraction)` est appelé après chaque tranche
+        
+        Retourne les percentiles de chaque indicateur, un résumé (probabilité de manque de
+        capacité, écart au calcul déterministe) et les tirages (float32) pour les graphiques.
+        """
+        start = time.perf_counter()
+        samples = int(samples)
+        if samples <= 0:
+            raise ValueError("Le nombre de tirages doit être positif")
+        chunks = -(-samples // CHUNK_SIZE)
+        streams = np.random.SeedSequence(seed).spawn(chunks)
+        
+        results = {name: np.empty(samples, dtype=np.float32) for name in METRICS}
+        shortfall = np.empty(samples, dtype=bool)
+        for k, stream in enumerate(streams):
+            lo, hi = k * CHUNK_SIZE, min(samples, (k + 1) * CHUNK_SIZE)
+            evaluated = self.evaluate(*self.sample(np.random.default_rng(stream), hi - lo))
+            for name in METRICS:
+                results[name][lo:hi] = evaluated[name]
+            shortfall[lo:hi] = evaluated['shortfall']
+            if progress is not None:
+                progress((k + 1) / chunks)
+        
+        percentiles = pd.DataFrame({
+            label: np.percentile(results[name], PERCENTILES) for name, label in METRICS.items()
+        }, index=[f"P{p}" for p in PERCENTILES])
+        
+        deterministic = self.circulation.get('required_equipment', 1)
+        equipment = results['required_equipment']
+        return {
+            'percentiles': percentiles,
+            'samples': pd.DataFrame(results),
+            'summary': {
+                'samples': samples,
+                'seed': seed,
+                'shortfall_probability': round(100.0 * float(shortfall.mean()), 2),
+                'equipment_p50': int(np.percentile(equipment, 50)),
+                'equipment_p95': int(np.ceil(np.percentile(equipment, 95))),
+                'equipment_deterministic': int(deterministic),
+                'equipment_exceeded': round(100.0 * float((equipment > deterministic).mean()), 2),
+                'cost_p50': round(float(np.percentile(results['cost_per_pallet'], 50)), 2),
+                'cost_p95': round(float(np.percentile(results['cost_per_pallet'], 95)), 2),
+                'elapsed': round(time.perf_counter() - start, 3),
+            },
+        }
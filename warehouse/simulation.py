@@ -0,0 +1,293 @@
+"""Simulation à événements discrets des opérations de manutention"""
+import heapq
+import time
+from collections import deque
+
+import numpy as np
+
+from .calculator import WarehouseCalculator
+from .distances import site_distances
+from .geometry import MANEUVER_DEPTH, QUAI_WIDTH, dock_positions, plan_geometry, site_layout
+
+
+LIFT_SPEED = 0.3        # Vitesse de levée / descente des fourches (m/s)
+LEVEL_HEIGHT = 0.3      # Hauteur de lisse ajoutée à chaque palette (m), comme pour les niveaux
+PROGRESS_EVENTS = 100000  # Événements entre deux appels de progress()
+
+# Étapes d'une mission : passage à quai, trajet dans le bâtiment, travail dans l'allée du rack
+DOCK, TRAVEL, AISLE = 0, 1, 2
+STEPS = {
+    True: (DOCK, TRAVEL, AISLE, TRAVEL),     # Mise en stock : quai puis rack
+    False: (TRAVEL, AISLE, TRAVEL, DOCK),    # Préparation : rack puis quai
+}
+
+
+class ForkliftSimulation:
+    """Chariots parcourant la grille de racks du plan, quais et allées de rangée en accès exclusif
+    
+    Les missions (mises en stock et prélèvements) arrivent selon un processus de Poisson
+    au débit journalier du calcul de circulation. Chaque chariot attend qu'un quai ou
+    qu'une allée de rangée se libère avant d'y entrer : la congestion allonge les cycles
+    et le débit réel s'écarte de l'estimation sur un cycle moyen.
+    
+    Toutes les missions sont tirées et leurs durées calculées en bloc avec NumPy ; la
+    boucle d'événements (tas binaire) ne manipule que des listes et des entiers.
+    """
+    
+    def __init__(self, params, capacity, vehicles=None, hours=None, demand_factor=1.0, seed=0,
+                 circulation=None, distances=None):
+        """`vehicles` : chariots simulés (par défaut required_equipment), `hours` : durée simulée
+        
+        `circulation` : calcul de circulation de référence (celui de l'étape 4), recalculé
+        sinon ; `distances` : table des distances du plan, celle du graphe des allées par
+        défaut (distance_model 'graph'), comme à l'étape 4. Avec une table, les missions
+        portent sur ses emplacements et ses allées de rangée (implantation multi-allées
+        si la capacité est détaillée par zone) ; sans table, sur la grille simplifiée.
+        """
+        self.params = params
+        self.capacity = capacity
+        
+        # Même plan qu'à l'étape 5, avec tous les quais (le dessin est limité à 6)
+        self.layout = site_layout(params, capacity)
+        self.geometry = plan_geometry(self.layout)
+        
+        if distances is None and params.get('distance_model', 'graph') == 'graph':
+            distances = site_distances(params, capacity)
+        self.distances = distances
+        self.circulation = circulation or WarehouseCalculator.calculate_circulation(params, capacity, distances)
+        
+        self.vehicles = int(vehicles or self.circulation.get('required_equipment', 1))
+        self.operating_hours = params.get('operating_hours', 16.0)
+        self.hours = float(hours or self.operating_hours)
+        self.demand_factor = demand_factor
+        self.seed = seed
+    
+    def missions(self):
+        """Tire les missions de la période et calcule leurs durées élémentaires (s)"""
+        layout, geometry = self.layout, self.geometry
+        rng = np.random.default_rng(self.seed)
+        
+        # Processus de Poisson au débit journalier réparti sur les heures d'exploitation
+        daily = self.capacity.get('total_pallets', 0) / self.params.get('stock_rotation', 30.0)
+        per_second = daily * self.demand_factor / (self.operating_hours * 3600.0)
+        horizon = self.hours * 3600.0
+        count = rng.poisson(per_second * horizon)
+        arrivals = np.sort(rng.uniform(0.0, horizon, count))
+        
+        racks_per_row, rows_per_side = layout['racks_per_row'], layout['rows_per_side']
+        levels = max(1, self.capacity.get('levels', 1))
+        side = rng.integers(0, 2, count)              # 0 : gauche de l'allée centrale, 1 : droite
+        column = rng.integers(0, racks_per_row, count)
+        row = rng.integers(0, rows_per_side, count)
+        level = rng.integers(0, levels, count)
+        docks = dock_positions(layout)
+        dock = rng.integers(0, len(docks), count)
+        putaway = rng.random(count) < 0.5
+        
+        # Allée desservant chaque rangée : bande libre au-dessus des racks de la rangée
+        pitch_x, pitch_y = geometry['pitch_x'], geometry['pitch_y']
+        aisle_y = geometry['origin_y'] + row * pitch_y + layout['rack_width'] + (pitch_y - layout['rack_width']) / 2
+        front_x = layout['length'] - QUAI_WIDTH - MANEUVER_DEPTH / 2
+        alley_x = geometry['alley_start'] + layout['main_aisle_width'] / 2
+        right_entry = geometry['origin_x']['right'] + racks_per_row * pitch_x
+        
+        # Côté droit : zone de manœuvre puis allée par son extrémité côté quais.
+        # Côté gauche : allées de rive (haut ou bas) jusqu'à l'allée centrale, puis allée de rangée.
+        dock_y = docks[dock]
+        perimeter = np.minimum(dock_y + aisle_y, 2 * layout['width'] - dock_y - aisle_y)
+        travel = np.where(side == 1,
+                          np.abs(dock_y - aisle_y) + (front_x - right_entry),
+                          perimeter + (front_x - alley_x))
+        rack_x = np.where(side == 1, geometry['origin_x']['right'], geometry['origin_x']['left']) \
+            + column * pitch_x + layout['rack_depth'] / 2
+        depth = np.where(side == 1, right_entry - rack_x, alley_x - rack_x)
+        
+        aisle = side * rows_per_side + row
+        
+        # Avec la table du graphe des allées : même plus court chemin que le calcul de circulation,
+        # réparti entre le trajet dans le bâtiment et l'allée de rangée par l'extrémité retenue
+        if self.distances is not None:
+            location = rng.integers(0, self.distances.locations, count)
+            depth = self.distances.aisle_depth(dock, location)
+            travel = self.distances.distance(dock, location) - depth
+            aisle = self.distances.location_aisle[location]
+        
+        speed = self.params.get('equipment_speed', 10.0) * 1000.0 / 3600.0
+        handling = 120.0 if self.params.get('equipment_type') == 'forklift' else 90.0
+        lift = level * (self.params.get('pallet_height', 1.2) + LEVEL_HEIGHT)
+        
+        return {
+            'arrival': arrivals,
+            'putaway': putaway,
+            'dock': dock,
+            'aisle': aisle,
+            'travel_time': np.maximum(travel, 0.0) / speed,
+            'aisle_time': 2 * np.maximum(depth, 0.0) / speed + 2 * lift / LIFT_SPEED + handling / 2,
+            'dock_time': np.full(count, handling / 2),
+        }
+    
+    def run(self, progress=None):
+        """Déroule la période simulée et retourne débit, utilisation et files d'attente
+        
+        `progress(fraction)` est appelé tous les PROGRESS_EVENTS événements avec la part
+        de la période déjà simulée.
+        """
+        start_clock = time.perf_counter()
+        missions = self.missions()
+        horizon = self.hours * 3600.0
+        vehicles = self.vehicles
+        
+        # Listes Python : accès scalaire bien plus rapide que l'indexation NumPy dans la boucle
+        arrival = missions['arrival'].tolist()
+        steps = [STEPS[p] for p in missions['putaway'].tolist()]
+        dock_of = missions['dock'].tolist()
+        aisle_of = missions['aisle'].tolist()
+        durations = list(zip(missions['dock_time'].tolist(), missions['travel_time'].tolist(),
+                             missions['aisle_time'].tolist()))
+        count = len(arrival)
+        
+        n_aisles = self.distances.aisles if self.distances is not None else 2 * self.layout['rows_per_side']
+        resource_busy = [False] * (self.layout['dock_doors'] + n_aisles)
+        resource_queue = [None] * len(resource_busy)
+        aisle_offset = self.layout['dock_doors']
+        
+        task_of = [-1] * vehicles
+        step_of = [0] * vehicles
+        started = [0.0] * vehicles
+        busy_time = [0.0] * vehicles
+        idle = list(range(vehicles - 1, -1, -1))
+        pending = deque()
+        assigned = np.full(count, np.nan)
+        finished = np.full(count, np.nan)
+        blocked = {DOCK: 0.0, AISLE: 0.0}
+        heap = []
+        seq = 0
+        events = 0
+        max_queue = 0
+        
+        def resource(task, kind):
+            return dock_of[task] if kind == DOCK else aisle_offset + aisle_of[task]
+        
+        def begin_step(v, now):
+            nonlocal seq
+            task = task_of[v]
+            kind = steps[task][step_of[v]]
+            if kind != TRAVEL:
+                r = resource(task, kind)
+                if resource_busy[r]:
+                    if resource_queue[r] is None:
+                        resource_queue[r] = deque()
+                    resource_queue[r].append((v, now))
+                    return
+                resource_busy[r] = True
+            seq += 1
+            heapq.heappush(heap, (now + durations[task][kind], seq, v))
+        
+        def assign(v, task, now):
+            task_of[v] = task
+            step_of[v] = 0
+            started[v] = now
+            assigned[task] = now
+            begin_step(v, now)
+        
+        next_arrival = 0
+        now = 0.0
+        next_report = PROGRESS_EVENTS
+        while True:
+            if progress is not None and events >= next_report:
+                progress(min(now / horizon, 1.0))
+                next_report += PROGRESS_EVENTS
+            # Prochain événement : arrivée de mission ou fin d'étape d'un chariot
+            if next_arrival < count and (not heap or arrival[next_arrival] <= heap[0][0]):
+                now = arrival[next_arrival]
+                if now > horizon:
+                    break
+                if idle:
+                    assign(idle.pop(), next_arrival, now)
+                else:
+                    pending.append(next_arrival)
+                    max_queue = max(max_queue, len(pending))
+                next_arrival += 1
+                events += 1
+                continue
+            if not heap or heap[0][0] > horizon:
+                break
+            
+            now, _, v = heapq.heappop(heap)
+            events += 1
+            task = task_of[v]
+            kind = steps[task][step_of[v]]
+            
+            # Libération du quai ou de l'allée : le premier chariot en attente y entre
+            if kind != TRAVEL:
+                r = resource(task, kind)
+                queue = resource_queue[r]
+                if queue:
+                    w, since = queue.popleft()
+                    blocked[kind] += now - since
+                    seq += 1
+                    heapq.heappush(heap, (now + durations[task_of[w]][kind], seq, w))
+                else:
+                    resource_busy[r] = False
+            
+            step_of[v] += 1
+            if step_of[v] < 4:
+                begin_step(v, now)
+                continue
+            
+            # Mission terminée : mission suivante en attente ou retour au repos
+            finished[task] = now
+            busy_time[v] += now - started[v]
+            task_of[v] = -1
+            if pending:
+                assign(v, pending.popleft(), now)
+            else:
+                idle.append(v)
+        
+        # Missions en cours à la fin de la période : temps d'occupation tronqué à l'horizon
+        for v in range(vehicles):
+            if task_of[v] >= 0:
+                busy_time[v] += horizon - started[v]
+        
+        return self._summary(missions, assigned, finished, busy_time, blocked, max_queue, events,
+                             time.perf_counter() - start_clock)
+    
+    def _summary(self, missions, assigned, finished, busy_time, blocked, max_queue, events, elapsed):
+        """Indicateurs de la période simulée"""
+        arrival = missions['arrival']
+        done = ~np.isnan(finished)
+        started = ~np.isnan(assigned)
+        waits = assigned[started] - arrival[started]
+        cycles = finished[done] - assigned[done]
+        completed = int(done.sum())
+        
+        # Missions terminées et file d'attente, heure par heure
+        hours = int(np.ceil(self.hours))
+        marks = np.arange(1, hours + 1) * 3600.0
+        hourly_completed = np.bincount((finished[done] // 3600.0).astype(np.int64), minlength=hours)[:hours]
+        queue = (np.searchsorted(arrival, marks, side='right')
+                 - np.searchsorted(np.sort(assigned[started]), marks, side='right'))
+        
+        static_rate = self.circulation.get('pallets_per_hour', 0.0) * self.vehicles
+        return {
+            'vehicles': self.vehicles,
+            'hours': self.hours,
+            'missions': len(arrival),
+            'completed': completed,
+            'backlog': len(arrival) - completed,
+            'demand_per_hour': round(len(arrival) / self.hours, 1),
+            'throughput': round(completed / self.hours, 1),
+            'static_throughput': round(static_rate, 1),
+            'utilization': round(100.0 * float(np.mean(busy_time)) / (self.hours * 3600.0), 1),
+            'vehicle_utilization': [round(100.0 * b / (self.hours * 3600.0), 1) for b in busy_time],
+            'mean_wait': round(float(waits.mean()) / 60.0, 2) if len(waits) else 0.0,
+            'p95_wait': round(float(np.percentile(waits, 95)) / 60.0, 2) if len(waits) else 0.0,
+            'max_queue': max_queue,
+            'mean_cycle': round(float(cycles.mean()) / 60.0, 2) if len(cycles) else 0.0,
+            'aisle_blocking': round(blocked[AISLE] / max(completed, 1), 1),
+            'dock_blocking': round(blocked[DOCK] / max(completed, 1), 1),
+            'hourly_completed': hourly_completed.tolist(),
+            'hourly_queue': queue.tolist(),
+            'events': events,
+            'elapsed': round(elapsed, 3),
+        }
@@ -0,0 +1,158 @@
+"""Affectation ABC des références (SKU) aux emplacements selon leur rotation"""
+import numpy as np
+import pandas as pd
+
+from .simulation import LEVEL_HEIGHT, LIFT_SPEED
+
+
+POSITIONS_PER_LEVEL = 2                   # Avant / arrière, comme dans calculate_storage_capacity
+ABC_THRESHOLDS = (('A', 80.0), ('B', 95.0), ('C', 100.0))   # Part cumulée des prélèvements (%)
+
+# Colonnes reconnues dans la liste de références
+SKU_COLUMNS = {
+    'sku': "Identifiant de la référence",
+    'daily_picks': "Prélèvements par jour",
+    'pallets': "Palettes en stock (facultatif)",
+    'units_per_pallet': "Prélèvements par palette (facultatif, palettes = picks × rotation / unités)",
+}
+
+
+class SlottingEngine:
+    """Classe les emplacements par coût d'accès et y range les références les plus rapides
+    
+    Le coût d'un emplacement est sa distance au quai le plus proche (DistanceTable) plus
+    la levée jusqu'à son niveau, convertie en mètres équivalents à la vitesse de
+    l'équipement. Les emplacements sont triés une fois ; les références, triées par
+    prélèvements par palette, reçoivent des plages consécutives de cet ordre. Tout est
+    en O(n log n), sans boucle Python sur les références ou les emplacements.
+    
+    Sur l'implantation multi-allées, chaque zone garde ses niveaux et ses emplacements
+    (capacity['zones']), répartis également entre les niveaux de ses racks : le slotting
+    dispose exactement des emplacements affichés à l'étape 4.
+    """
+    
+    def __init__(self, params, capacity, distances):
+        self.params = params
+        self.distances = distances
+        levels = max(1, int(capacity.get('levels', 1)))
+        # Grille simplifiée : une seule zone, POSITIONS_PER_LEVEL faces par niveau
+        zones = capacity.get('zones') or [{'levels': levels,
+                                           'positions': distances.locations * levels * POSITIONS_PER_LEVEL}]
+        zone_of = getattr(distances, 'location_zone', np.zeros(distances.locations, dtype=np.int64))
+        
+        # Emplacements dans l'ordre (lieu, niveau, face) : positions de chaque zone réparties
+        # en parts entières égales entre les (lieu, niveau) de ses racks
+        location = np.repeat(np.arange(distances.locations), levels)
+        level = np.tile(np.arange(levels), distances.locations)
+        zone = zone_of[location]
+        keep = level < np.array([z['levels'] for z in zones])[zone]
+        location, level, zone = location[keep], level[keep], zone[keep]
+        pairs = np.bincount(zone, minlength=len(zones))
+        by_zone = np.argsort(zone, kind='stable')
+        rank = np.empty(len(zone), dtype=np.int64)
+        rank[by_zone] = np.arange(len(zone)) - (np.cumsum(pairs) - pairs)[zone[by_zone]]
+        total, count = np.array([int(z['positions']) for z in zones])[zone], np.maximum(pairs[zone], 1)
+        faces = (rank + 1) * total // count - rank * total // count
+        self.position_location = np.repeat(location, faces)
+        self.position_level = np.repeat(level, faces)
+        
+        # Coût de chaque emplacement (m équivalents)
+        speed = params.get('equipment_speed', 10.0) * 1000.0 / 3600.0
+        lift = self.position_level * (params.get('pallet_height', 1.2) + LEVEL_HEIGHT) * speed / LIFT_SPEED
+        self.position_distance = distances.nearest[self.position_location]
+        self.position_cost = self.position_distance + lift
+        self.levels = levels
+        
+        # Index des emplacements du plus accessible au moins accessible
+        self.order = np.argsort(self.position_cost, kind='stable')
+    
+    @property
+    def positions(self):
+        return len(self.position_cost)
+    
+    def pallets_needed(self, skus):
+        """Palettes à ranger par référence (colonne pallets, sinon couverture de stock_rotation jours)"""
+        if 'pallets' in skus:
+            pallets = skus['pallets'].to_numpy(dtype=float)
+        elif 'units_per_pallet' in skus:
+            cover = skus['daily_picks'].to_numpy(dtype=float) * self.params.get('stock_rotation', 30.0)
+            pallets = np.ceil(cover / skus['units_per_pallet'].to_numpy(dtype=float))
+        else:
+            pallets = np.ones(len(skus))
+        return np.maximum(1, np.nan_to_num(pallets, nan=1.0)).astype(np.int64)
+    
+    def assign(self, skus):
+        """Affecte les références (DataFrame sku, daily_picks[, pallets | units_per_pallet])
+        
+        Retourne les références classées avec leur classe ABC, leurs emplacements et la
+        distance parcourue par prélèvement, ainsi qu'un résumé comparé au rangement aléatoire.
+        """
+        missing = [c for c in ('sku', 'daily_picks') if c not in skus]
+        if missing:
+            raise ValueError(f"Colonnes manquantes dans la liste de références : {', '.join(missing)}")
+        
+        picks = skus['daily_picks'].to_numpy(dtype=float)
+        pallets = self.pallets_needed(skus)
+        
+        # Plus de prélèvements par palette d'abord (indice COI inversé)
+        rank = np.lexsort((-picks, -(picks / pallets)))
+        picks, pallets = picks[rank], pallets[rank]
+        end = np.cumsum(pallets)
+        start = end - pallets
+        slotted = end <= self.positions
+        
+        # Distance de chaque référence : emplacements [start, end) de l'ordre d'accessibilité
+        sorted_distance = self.position_distance[self.order]
+        cumulative = np.concatenate([[0.0], np.cumsum(sorted_distance)])
+        stop = np.minimum(end, self.positions)
+        first = np.minimum(start, self.positions - 1)
+        mean_distance = np.where(slotted, (cumulative[stop] - cumulative[np.minimum(start, stop)])
+                                 / np.maximum(stop - start, 1), np.nan)
+        best_distance = np.where(slotted, sorted_distance[first], np.nan)
+        
+        # FIFO / FEFO : les palettes de la référence sont prélevées à tour de rôle ;
+        # LIFO : toujours la palette de façade, la mieux placée
+        lifo = str(self.params.get('flow_type', 'FIFO')).startswith('LIFO')
+        pick_distance = best_distance if lifo else mean_distance
+        
+        # Classes ABC sur la part cumulée des prélèvements, références triées par prélèvements
+        by_picks = np.argsort(-picks, kind='stable')
+        share = np.empty(len(picks))
+        share[by_picks] = 100.0 * np.cumsum(picks[by_picks]) / picks.sum() if picks.sum() > 0 else 100.0
+        abc = np.select([share <= limit for _, limit in ABC_THRESHOLDS[:-1]],
+                        [label for label, _ in ABC_THRESHOLDS[:-1]], ABC_THRESHOLDS[-1][0])
+        
+        # Premier emplacement de chaque référence : lieu (indice DistanceTable) et niveau
+        position = self.order[first]
+        
+        result = pd.DataFrame({
+            'sku': skus['sku'].to_numpy()[rank],
+            'daily_picks': picks,
+            'pallets': pallets,
+            'abc': abc,
+            'location': np.where(slotted, self.position_location[position], -1),
+            'level': np.where(slotted, self.position_level[position], -1),
+            'distance': np.round(pick_distance, 1),
+            'travel_per_pick': np.round(2 * pick_distance, 1),
+        })
+        
+        served = slotted & (picks > 0)
+        picks_served = picks[served].sum()
+        travel = float((2 * pick_distance[served] * picks[served]).sum() / picks_served) if picks_served else 0.0
+        baseline = 2 * float(self.distances.nearest.mean())
+        return {
+            'skus': result,
+            'summary': {
+                'skus': len(result),
+                'slotted': int(slotted.sum()),
+                'unslotted': int((~slotted).sum()),
+                'positions': self.positions,
+                'positions_used': int(min(end[-1], self.positions)) if len(end) else 0,
+                'daily_picks': float(picks.sum()),
+                'travel_per_pick': round(travel, 1),
+                'random_travel_per_pick': round(baseline, 1),
+                'gain': round(100.0 * (1 - travel / baseline), 1) if baseline > 0 and travel else 0.0,
+                'daily_travel_km': round(float(travel * picks_served) / 1000.0, 1),
+                'abc_counts': {label: int((abc == label).sum()) for label, _ in ABC_THRESHOLDS},
+            },
+        }
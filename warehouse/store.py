@@ -0,0 +1,202 @@
+"""Base de scénarios persistante (SQLite) : paramètres, résultats et indicateurs indexés"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .bulk import evaluate
+
+
+DEFAULT_PATH = os.environ.get('WAREHOUSE_DB', 'scenarios.db')
+BATCH_SIZE = 50000            # Lignes écrites par transaction
+CACHE_KB = 65536              # Cache de pages SQLite (Kio) pendant les écritures d'index
+
+# Indicateurs copiés en colonnes pour les requêtes
+METRICS = {
+    'total_area': 'REAL',
+    'total_positions': 'INTEGER',
+    'total_pallets': 'INTEGER',
+    'storage_ratio': 'REAL',
+    'required_equipment': 'INTEGER',
+    'total_investment': 'REAL',
+    'total_annual_cost': 'REAL',
+    'cost_per_pallet': 'REAL',
+    'compliant': 'INTEGER',
+}
+# Index : les paires servent les filtres croisés coût / capacité sans lire la table
+INDEXED = (('cost_per_pallet', 'total_pallets'), ('total_pallets', 'cost_per_pallet'),
+           ('total_investment',), ('required_equipment',))
+OPERATORS = ('<', '<=', '>', '>=', '=', '!=')
+
+
+def _json_default(value):
+    """Types NumPy et pandas rencontrés dans les paramètres et les résultats"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, pd.DataFrame):
+        return value.to_dict('records')
+    raise TypeError(f"Valeur non enregistrable : {type(value).__name__}")
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _scalar(value):
+    """Valeur liable par sqlite3 (les entiers et flottants NumPy ne le sont pas)"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class ScenarioStore:
+    """Scénarios enregistrés dans un fichier SQLite
+    
+    Une ligne par scénario : nom, date, paramètres et résultats complets en JSON, et les
+    indicateurs de METRICS en colonnes, indexés pour les filtres les plus courants
+    (INDEXED). Les écritures en masse passent par des transactions de BATCH_SIZE lignes,
+    en mode WAL : un balayage de paramètres s'enregistre sans être limité par le disque.
+    
+    Un lot ne garde que ses paramètres et ses indicateurs : ses résultats complets, qui
+    ne dépendent que des paramètres, sont recalculés par load(). Un lot au moins aussi
+    grand que la base est écrit sans index, reconstruits ensuite en une passe triée.
+    """
+    
+    def __init__(self, path=None):
+        self.path = str(path or DEFAULT_PATH)
+        # Connexion partagée entre les fils de Streamlit, accès sérialisés par le verrou
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(f'PRAGMA cache_size=-{CACHE_KB}')
+        columns = ', '.join(f'{name} {kind}' for name, kind in METRICS.items())
+        with self._connection:
+            self._connection.execute(
+                f'CREATE TABLE IF NOT EXISTS scenarios (id INTEGER PRIMARY KEY, name TEXT, created REAL, '
+                f'params TEXT, results TEXT, {columns})')
+        self._create_indexes()
+    
+    def _create_indexes(self, analyze=False):
+        """Crée les index manquants ; `analyze` met à jour les statistiques du planificateur"""
+        with self._connection:
+            for columns in INDEXED:
+                self._connection.execute(f'CREATE INDEX IF NOT EXISTS idx_{"_".join(columns)} '
+                                         f'ON scenarios ({", ".join(columns)})')
+        if analyze:
+            self._connection.execute('ANALYZE')
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM scenarios').fetchone()[0]
+    
+    def close(self):
+        with self._lock:
+            self._connection.execute('PRAGMA optimize')
+            self._connection.close()
+    
+    def save(self, name, params, calculations, warnings=None):
+        """Enregistre un scénario de l'application (calculs de l'étape 4) ; retourne son identifiant"""
+        flat = {**calculations.get('capacity', {}), **calculations.get('circulation', {}),
+                **calculations.get('costs', {})}
+        flat['compliant'] = not warnings
+        results = {**calculations, 'warnings': list(warnings or [])}
+        values = [_scalar(flat.get(m)) for m in METRICS]
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                f'INSERT INTO scenarios (name, created, params, results, {", ".join(METRICS)}) '
+                f'VALUES ({", ".join("?" * (4 + len(METRICS)))})',
+                [name, time.time(), _dumps(params), _dumps(results), *values])
+        return cursor.lastrowid
+    
+    def save_batch(self, configs, results, name=None):
+        """Enregistre un lot : configurations et leurs résultats (bulk.evaluate, même index)
+        
+        Une colonne `name` des configurations nomme chaque scénario, sinon `name`.
+        Retourne le nombre de lignes écrites.
+        """
+        created = time.time()
+        metrics = results.reindex(columns=list(METRICS)).astype(object)
+        metrics = metrics.where(metrics.notna(), None)
+        rebuild = len(configs) >= len(self)
+        
+        with self._lock:
+            if rebuild:
+                with self._connection:
+                    for columns in INDEXED:
+                        self._connection.execute(f'DROP INDEX IF EXISTS idx_{"_".join(columns)}')
+            try:
+                for start in range(0, len(configs), BATCH_SIZE):
+                    stop = start + BATCH_SIZE
+                    part = configs.iloc[start:stop]
+                    params = part.to_json(orient='records', lines=True, force_ascii=False).splitlines()
+                    names = part['name'].astype(str).tolist() if 'name' in part else [name] * len(part)
+                    rows = zip(names, [created] * len(part), params,
+                               *(metrics[m].iloc[start:stop].tolist() for m in METRICS))
+                    with self._connection:
+                        self._connection.executemany(
+                            f'INSERT INTO scenarios (name, created, params, {", ".join(METRICS)}) '
+                            f'VALUES ({", ".join("?" * (3 + len(METRICS)))})', rows)
+            finally:
+                if rebuild:
+                    self._create_indexes(analyze=True)
+        return len(configs)
+    
+    def query(self, filters=(), order_by=None, descending=False, limit=1000):
+        """Scénarios vérifiant tous les filtres (indicateur, opérateur, valeur), sans les JSON
+        
+        Exemple : query([('cost_per_pallet', '<', 150), ('total_pallets', '>', 5000)],
+        order_by='cost_per_pallet').
+        """
+        clauses, values = [], []
+        for metric, operator, value in filters:
+            if metric not in METRICS or operator not in OPERATORS:
+                raise ValueError(f"Filtre non pris en charge : {metric} {operator}")
+            clauses.append(f'{metric} {operator} ?')
+            values.append(value)
+        if order_by is not None and order_by not in METRICS:
+            raise ValueError(f"Tri non pris en charge : {order_by}")
+        
+        sql = f'SELECT id, name, created, {", ".join(METRICS)} FROM scenarios'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        if order_by:
+            sql += f' ORDER BY {order_by} {"DESC" if descending else "ASC"}'
+        if limit:
+            sql += ' LIMIT ?'
+            values.append(int(limit))
+        with self._lock:
+            frame = pd.read_sql_query(sql, self._connection, params=values)
+        frame['created'] = pd.to_datetime(frame['created'], unit='s')
+        frame['compliant'] = frame['compliant'].astype('boolean')
+        return frame
+    
+    def load(self, scenario_id):
+        """Nom, paramètres et résultats complets d'un scénario (recalculés pour un lot)"""
+        with self._lock:
+            row = self._connection.execute('SELECT name, params, results FROM scenarios WHERE id = ?',
+                                           (int(scenario_id),)).fetchone()
+        if row is None:
+            raise KeyError(f"Scénario introuvable : {scenario_id}")
+        params = json.loads(row[1])
+        if row[2] is not None:
+            results = json.loads(row[2])
+        else:
+            configs = pd.DataFrame([params])
+            results = evaluate(configs).drop(columns=configs.columns).iloc[0].to_dict()
+        return {'name': row[0], 'params': params, 'results': results}
+    
+    def delete(self, ids):
+        with self._lock, self._connection:
+            self._connection.executemany('DELETE FROM scenarios WHERE id = ?', [(int(i),) for i in ids])
+
@@ -0,0 +1,127 @@
+"""Balayage exhaustif de paramètres, réparti sur un pool de processus"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from .calculator import WarehouseCalculator
+from .optimizer import LayoutOptimizer
+
+
+# Balayage partagé en lecture seule par chaque processus (voir _init_worker)
+_WORKER_SWEEP = None
+
+
+def _init_worker(params, axes):
+    """Initialise un processus du pool : les entrées ne sont transmises qu'une fois"""
+    global _WORKER_SWEEP
+    _WORKER_SWEEP = ParameterSweep(params, axes)
+
+
+def _run_chunk(start, stop):
+    """Évalue une tranche [start, stop) du balayage dans un processus du pool"""
+    return _WORKER_SWEEP.evaluate_chunk(start, stop)
+
+
+class ParameterSweep:
+    """Produit cartésien de valeurs de paramètres évalué par tranches
+    
+    Les points ne sont jamais matérialisés en entier : chaque tranche est décodée à
+    partir de ses indices, évaluée avec le moteur vectorisé puis réduite à un résumé
+    (compteurs, extrêmes et front de Pareto). Les résumés sont fusionnés au fil de
+    l'eau, la mémoire ne dépend donc pas du nombre total de points.
+    """
+    
+    CHUNK_SIZE = 50000          # Points par tranche
+    IN_FLIGHT_PER_WORKER = 2    # Tranches soumises d'avance par processus
+    
+    def __init__(self, params, axes):
+        """`params` : configuration de base, `axes` : {paramètre: valeurs balayées}"""
+        self.params = {k: v for k, v in params.items() if k not in axes and np.isscalar(v)}
+        self.axes = {name: np.asarray(values) for name, values in axes.items()}
+        self.shape = tuple(len(values) for values in self.axes.values())
+    
+    def __len__(self):
+        return int(np.prod(self.shape, dtype=np.int64))
+    
+    def points(self, start, stop):
+        """Configurations complètes des points d'indices [start, stop)"""
+        indices = np.unravel_index(np.arange(start, stop), self.shape)
+        configs = pd.DataFrame({name: values[idx] for (name, values), idx in zip(self.axes.items(), indices)})
+        for name, value in self.params.items():
+            configs[name] = value
+        return configs
+    
+    def evaluate_chunk(self, start, stop):
+        """Évalue une tranche et la réduit à son résumé"""
+        configs = self.points(start, stop)
+        results = WarehouseCalculator.calculate_batch(configs)
+        checks = WarehouseCalculator.check_norms_batch(configs, results)
+        evaluated = pd.concat([configs[list(self.axes)], results, checks], axis=1)
+        compliant = evaluated[evaluated['compliant']]
+        return {
+            'points': len(evaluated),
+            'compliant': len(compliant),
+            'max_pallets': int(compliant['total_pallets'].max()) if len(compliant) else 0,
+            'min_cost_per_pallet': float(compliant['cost_per_pallet'].min()) if len(compliant) else None,
+            'front': LayoutOptimizer.pareto_front(evaluated),
+        }
+    
+    @staticmethod
+    def merge(summary, partial):
+        """Fusionne le résumé d'une tranche dans le résumé courant"""
+        if summary is None:
+            return partial
+        costs = [c for c in (summary['min_cost_per_pallet'], partial['min_cost_per_pallet']) if c is not None]
+        return {
+            'points': summary['points'] + partial['points'],
+            'compliant': summary['compliant'] + partial['compliant'],
+            'max_pallets': max(summary['max_pallets'], partial['max_pallets']),
+            'min_cost_per_pallet': min(costs) if costs else None,
+            'front': LayoutOptimizer.pareto_front(pd.concat([summary['front'], partial['front']], ignore_index=True)),
+        }
+    
+    def chunks(self, chunk_size=None):
+        """Bornes (start, stop) des tranches successives"""
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        total = len(self)
+        for start in range(0, total, chunk_size):
+            yield start, min(start + chunk_size, total)
+    
+    def run(self, workers=None, chunk_size=None):
+        """Évalue tout le balayage sur `workers` processus (1 : dans le processus courant)
+        
+        Retourne le résumé fusionné : nombre de points, points conformes, extrêmes et
+        front de Pareto palettes / coût par palette.
+        """
+        start_time = time.perf_counter()
+        workers = workers or os.cpu_count() or 1
+        chunks = self.chunks(chunk_size)
+        summary = None
+        
+        if workers == 1:
+            for start, stop in chunks:
+                summary = self.merge(summary, self.evaluate_chunk(start, stop))
+        else:
+            # spawn : le serveur Streamlit est multi-thread, fork y est risqué
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_worker, initargs=(self.params, self.axes)) as pool:
+                pending = set()
+                for start, stop in chunks:
+                    pending.add(pool.submit(_run_chunk, start, stop))
+                    if len(pending) >= workers * self.IN_FLIGHT_PER_WORKER:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            summary = self.merge(summary, future.result())
+                for future in pending:
+                    summary = self.merge(summary, future.result())
+        
+        summary = summary or self.merge(None, self.evaluate_chunk(0, 0))
+        summary['front'] = summary['front'].reset_index(drop=True)
+        summary['workers'] = workers
+        summary['elapsed'] = round(time.perf_counter() - start_time, 3)
+        return summary